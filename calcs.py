@@ -1,87 +1,620 @@
 # calcs.py
 import pandas as pd
-import datetime
+import calendar
+import io
+import multiprocessing
+import os
+import tempfile
+import warnings
 import numpy as np
+from functools import partial
 import streamlit as st
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from openpyxl import load_workbook
 
-@st.cache_data
-def get_sheets(file):
-    """Reads and preprocesses all relevant Excel sheets."""
-    sheets = pd.read_excel(
-        file,
-        sheet_name=["outages", "db", "pa", "rna", "tch"],
-        engine="openpyxl"
+import schema
+import storage
+from cube import outage_dates, outage_site_days
+from pa_store import PAStore
+from registry import Dataset, DatasetRegistry
+
+# Sheets read at ingestion, with the columns each one needs (None = all columns).
+# The "rna" and "tch" sheets are not used by any page and are skipped.
+SHEET_COLUMNS = {
+    "outages": None,
+    "db": [
+        "IHS Site ID", "Tenants On Site", "IHS Site Priority", "Zone", "Region",
+        "State", "EFS Name", "RTO Name", "Head, Field Service", "SBC",
+        "Tenant Name", "Tenant ID", "Site Address", "Site Operational Status",
+        "Latitude", "Longitude", "Project",
+    ],
+    "pa": None,
+}
+SHEETS = list(SHEET_COLUMNS)
+
+# Workbooks are parsed serially. Set PA_PARALLEL_INGEST=1 to parse the sheets
+# of workbooks over PA_PARALLEL_MIN_MB in worker processes instead; below that
+# (and on a single CPU) starting the pool costs more than it saves.
+PARALLEL_INGEST = os.environ.get("PA_PARALLEL_INGEST", "0") == "1"
+PARALLEL_MIN_BYTES = float(os.environ.get("PA_PARALLEL_MIN_MB", "20")) * 2**20
+INGEST_WORKERS = min(int(os.environ.get("PA_INGEST_WORKERS", len(SHEETS))), os.cpu_count() or 1)
+
+
+def ingest(file):
+    """
+    Cleans the workbook into a snapshot (unless one exists) and returns its key.
+
+    Snapshots are keyed by the file's content hash, so a repeat upload of the
+    same workbook (or a server restart) skips parsing; see get_dataset.
+    """
+    data = storage.file_bytes(file)
+    key = storage.content_hash(data)
+
+    if not storage.has_snapshot(key):
+        # Other server processes wait here and reuse this process's snapshot
+        with storage.snapshot_lock(key):
+            if not storage.has_snapshot(key):
+                _save_frames(key, clean_sheets(read_workbook(data)))
+
+    return key
+
+
+@st.cache_resource
+def dataset_registry():
+    """The process-wide DatasetRegistry every session gets its datasets from."""
+    return DatasetRegistry()
+
+
+def get_dataset(key):
+    """
+    Dataset of snapshot `key`, shared read-only by all sessions viewing it.
+
+    Pages call this on every run and keep the dataset for that run only; see
+    registry.DatasetRegistry.
+    """
+    return dataset_registry().get(key, load_dataset)
+
+
+def load_dataset(key):
+    """
+    Loads the snapshot `key` as a Dataset.
+
+    Outages are not loaded here: the aggregate engine (cube or DuckDB) is
+    built from the per-day aggregates saved with the snapshot, and the Dataset reads the year/month
+    partitions a date range touches on demand (see load_outages), so the
+    outage rows stay on disk.
+    """
+    frames = _load_frames(key)
+    return Dataset(
+        key, frames["pa_init"], frames["db"], frames["db_full"],
+        storage.load_partitions(key, "outage_site_days"), storage.load_partitions(key, "outage_dates"),
+        partial(load_outages, key),
+    )
+
+
+def load_outages(key, start=None, end=None, columns=None):
+    """
+    Outage rows of snapshot `key` with start <= Date <= end (inclusive; None = open).
+
+    Only the monthly partitions overlapping the range are read. With an open
+    range, rows without a date are included too.
+    """
+    months = storage.load_meta(key)["partitions"]["df_init"]
+    if start is not None:
+        months = [m for m in months if m != storage.NO_PARTITION and m >= pd.Timestamp(start).strftime("%Y-%m")]
+    if end is not None:
+        months = [m for m in months if m != storage.NO_PARTITION and m <= pd.Timestamp(end).strftime("%Y-%m")]
+
+    outages = storage.load_partitions(key, "df_init", months, columns)
+    if start is not None:
+        outages = outages[outages["Date"] >= pd.Timestamp(start)]
+    if end is not None:
+        outages = outages[outages["Date"] <= pd.Timestamp(end)]
+    return outages
+
+
+# Set PA_TRACE_MEMORY=1 to print the size of each table when a snapshot is saved
+TRACE_MEMORY = os.environ.get("PA_TRACE_MEMORY", "0") == "1"
+
+# Snapshot tables split into monthly partitions, by their date column
+PARTITIONED = {"df_init": "Date", "outage_site_days": "Date", "outage_dates": "Date"}
+
+
+def _save_frames(key, frames, meta=None, base=None):
+    """
+    Saves cleaned frames as snapshot `key`. With `base`, `frames` only holds
+    what changed (see storage.save_snapshot); the rest is linked from `base`.
+    """
+    # Declared column types (categoricals, small ints, Arrow strings), see schema.py
+    tables = {name: schema.enforce(frame, schema.TABLES[name]) for name, frame in frames.items() if name != "pa_init"}
+    if TRACE_MEMORY:
+        print(f"[memory] dataset {key}:\n{schema.memory_report(tables).to_string(index=False)}")
+
+    # The PA matrix is stored as a raw array so it can be memory-mapped as is
+    if "pa_init" in frames:
+        pa_store = frames["pa_init"]
+        # Day-major, so a date range maps to one contiguous block of the file
+        tables["pa_values"] = np.ascontiguousarray(pa_store.values.T)
+        tables["pa_sites"] = pd.DataFrame({"IHS Site ID": pa_store.sites})
+        tables["pa_dates"] = pd.DataFrame({"Date": pa_store.dates})
+
+    # Per-day outage aggregates for the aggregate engines (see cube.py), partitioned like
+    # the outages, so loading a dataset never reads the outage rows
+    meta = dict(meta or {})
+    if "df_init" in tables:
+        outages = tables["df_init"]
+        tables["outage_site_days"] = outage_site_days(outages)
+        tables["outage_dates"] = outage_dates(outages)
+        # Rows added by later updates are numbered from here, so they sort last
+        meta.setdefault("next_row", int(outages.index.max()) + 1 if len(outages) else 0)
+    storage.save_snapshot(key, tables, meta, partition_by=PARTITIONED, base=base)
+
+
+def _load_frames(key):
+    """Memory-mapped snapshot tables (all but the outage partitions), with the PA store."""
+    frames = storage.load_snapshot(key)
+    frames["pa_init"] = PAStore(
+        frames.pop("pa_values").T,
+        frames.pop("pa_sites")["IHS Site ID"],
+        frames.pop("pa_dates")["Date"],
     )
+    return frames
+
+
+def _sheet_rows(wb, sheet, usecols=None):
+    """
+    Streams one worksheet into a DataFrame, keeping only the projected columns.
+
+    usecols holds header names and/or 0-based column positions; names that are
+    not in the sheet are ignored. Trailing empty rows are dropped, like read_excel.
+    """
+    rows = wb[sheet].iter_rows(values_only=True)
+    header = next(rows, ())
+
+    if usecols is None:
+        positions = list(range(len(header)))
+    else:
+        wanted = set(usecols)
+        positions = [i for i, name in enumerate(header) if i in wanted or name in wanted]
+    names = [
+        header[i] if header[i] is not None else f"Unnamed: {i}" for i in positions
+    ]
+
+    records = []
+    for row in rows:
+        record = tuple(row[i] if i < len(row) else None for i in positions)
+        records.append(record)
+
+    while records and all(value is None for value in records[-1]):
+        records.pop()
+
+    return pd.DataFrame.from_records(records, columns=names)
+
+
+def _open_workbook(source):
+    """Opens workbook bytes or a workbook path read-only."""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return load_workbook(source, read_only=True, data_only=True)
+
+
+def read_sheet(path, sheet, usecols=None):
+    """Worker task: streams one sheet of the workbook at `path`."""
+    wb = _open_workbook(path)
+    try:
+        return _sheet_rows(wb, sheet, usecols)
+    finally:
+        wb.close()
+
+
+def read_workbook(data, parallel=None):
+    """
+    Reads the ingestion sheets from the workbook bytes.
+
+    Sheets are streamed with openpyxl in read-only mode and projected to
+    SHEET_COLUMNS while reading, so unused columns and sheets never reach memory.
+    `parallel` (default: see PARALLEL_INGEST) parses every sheet in its own
+    worker process, if the workbook is large enough and more than one CPU is
+    available. Falls back to a serial pass, with a RuntimeWarning, when the
+    pool cannot start.
+    """
+    if parallel is None:
+        parallel = PARALLEL_INGEST and len(data) >= PARALLEL_MIN_BYTES
+    if parallel and INGEST_WORKERS > 1:
+        try:
+            return _read_workbook_parallel(data)
+        except (OSError, BrokenProcessPool) as e:
+            warnings.warn(f"parallel ingestion failed, reading serially: {e}", RuntimeWarning, stacklevel=2)
+
+    wb = _open_workbook(data)
+    try:
+        return {sheet: _sheet_rows(wb, sheet, SHEET_COLUMNS[sheet]) for sheet in SHEETS}
+    finally:
+        wb.close()
+
+
+def _read_workbook_parallel(data):
+    # One task per sheet: openpyxl parses a whole sheet even to read a few of
+    # its columns, so splitting a sheet would only repeat that work. Workers
+    # open the workbook from a temporary file instead of each being sent the
+    # bytes, and are spawned (not forked) as the Streamlit server is threaded.
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "workbook.xlsx")
+        with open(path, "wb") as f:
+            f.write(data)
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(INGEST_WORKERS, len(SHEETS)), mp_context=context) as pool:
+            futures = {sheet: pool.submit(read_sheet, path, sheet, SHEET_COLUMNS[sheet]) for sheet in SHEETS}
+            return {sheet: future.result() for sheet, future in futures.items()}
+
+
+# Excel day zero as openpyxl sees it for small serials (it skips the fake 1900-02-29),
+# used for durations over 24h that come back as datetimes
+EXCEL_EPOCH = pd.Timestamp("1899-12-31")
 
-    # Extract sheets
-    df_init = sheets["outages"]
-    db_init = sheets["db"]
+
+def parse_durations(values):
+    """
+    Converts a column of mixed outage durations to timedelta64 in bulk.
+
+    Handles the cell types seen in real exports: datetime.time ("00:52:40"),
+    numeric day fractions (0.25 = 6h), "HH:MM:SS" strings, timedeltas and
+    datetimes anchored at the Excel epoch (durations over 24h). Anything
+    unparseable becomes NaT.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_timedelta64_dtype(values):
+        return values
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_timedelta(values, unit="D")
+
+    durations = pd.Series(pd.NaT, index=values.index, dtype="timedelta64[ns]")
+    text = values[values.notna()].astype(str)
+
+    # Most cells are clock times ("00:52:40"); a fixed-format parse is the fast path
+    clock = pd.to_datetime(text, format="%H:%M:%S", errors="coerce")
+    durations[text.index] = clock - clock.dt.normalize()
+    text = text[clock.isna()]
+
+    # Numbers (and numeric strings) are Excel day fractions
+    days = pd.to_numeric(text, errors="coerce")
+    durations[days.index] = pd.to_timedelta(days, unit="D")
+    text = text[days.isna()]
+
+    # Timedeltas, fractional seconds and "1 days 02:00:00" style strings
+    parsed = pd.to_timedelta(text, errors="coerce")
+    durations[text.index] = parsed
+    text = text[parsed.isna()]
+
+    # Whatever is left should be an Excel-epoch datetime
+    if not text.empty:
+        as_dates = pd.to_datetime(text, format="%Y-%m-%d %H:%M:%S", errors="coerce")
+        durations[text.index] = as_dates - EXCEL_EPOCH
+
+    return durations
+
+
+# Columns of the per-site table merged onto outages and PA
+DB_COLUMNS = [
+    "IHS Site ID", "Tenants On Site", "IHS Site Priority", "Zone", "Region",
+    "State", "EFS Name", "RTO Name", "Head, Field Service", "SBC"
+]
+
+# An outage row re-exported in a later delta repeats these values. Genuine
+# repeats share them too, so rows are matched by key and occurrence number
+OUTAGE_KEY = ["IHS Site ID", "Date", "Duration", "Root Cause Type"]
+
+# Columns each sheet of a delta workbook must have to be merged
+DELTA_COLUMNS = {
+    "outages": OUTAGE_KEY + ["Outage Count", "Year", "Week", "Month"],
+    "db": DB_COLUMNS + ["Tenant Name", "Tenant ID"],
+    "pa": ["Site ID"],
+}
+
+
+def clean_sheets(sheets):
+    """Cleans the outages, db and pa sheets read by read_workbook."""
+    db, db_full = clean_db(sheets["db"])
+    df_init = clean_outages(sheets["outages"], db)
+
+    # --- Clean PA ---
+    # Kept as a site x day float32 matrix; pages slice it and go long on demand
     pa_init = sheets["pa"]
-    rna_init = sheets["rna"]
-    tch_init = sheets["tch"]
+    pa_init.columns = pa_init.columns.astype(str)
+    pa_store = PAStore.from_wide(pa_init)
 
-    # Ensure all column names are strings
-    df_init.columns = df_init.columns.astype(str)
+    return {"df_init": df_init, "pa_init": pa_store, "db": db, "db_full": db_full}
+
+
+def clean_db(db_init):
+    """Returns (db, db_full): one row per site, and every tenant row with tenant_and_id."""
     db_init.columns = db_init.columns.astype(str)
-    pa_init.columns = pa_init.columns.astype(str)
 
-    # --- Clean DB ---
     db_full = db_init.copy()
+    db_full["tenant_and_id"] = db_full["Tenant Name"].astype(str) + "_" + db_full["Tenant ID"].astype(str)
+
+    return site_table(db_full), db_full
 
-    db_1 = db_full.copy()[[
-        "IHS Site ID", "Tenants On Site", "IHS Site Priority", "Zone", "Region",
-        "State", "EFS Name", "RTO Name", "Head, Field Service", "SBC"
-    ]]
 
+def site_table(db_full):
+    """
+    Site dimension: the first db row of every site, projected to DB_COLUMNS.
+
+    The index ("site_key") is the site's integer surrogate key, also carried on
+    outage rows, and the attribute columns are categorical. Pages resolve their
+    site filters against this small table first and then select fact rows by key.
+    """
+    db_1 = db_full[DB_COLUMNS]
     db = db_1.drop_duplicates(subset=["IHS Site ID"], keep="first").reset_index(drop=True)
-    db_full["tenant_and_id"] = db_full["Tenant Name"].astype(str) + "_" + db_full["Tenant ID"].astype(str)
 
-    # --- Clean Outages ---
+    attributes = DB_COLUMNS[1:]
+    db[attributes] = db[attributes].astype("category")
+    db.index = db.index.astype("int32").rename("site_key")
+    return db
+
+
+def clean_outages(df_init, db):
+    """Parses outage dates/durations and attaches the site attributes from db."""
+    df_init.columns = df_init.columns.astype(str)
+
     # Convert Date column to datetime
     df_init["Date"] = pd.to_datetime(df_init["Date"], errors="coerce")
-    
-    # Process Duration
-    df_init["Duration"] = df_init["Duration"].apply(
-        lambda x: datetime.timedelta(hours=x.hour, minutes=x.minute, seconds=x.second)
-        if isinstance(x, datetime.time)
-        else x
-    )
 
-    df_init["Duration_timedelta"] = pd.to_timedelta(df_init["Duration"], errors="coerce")
+    # Process Duration
+    df_init["Duration"] = parse_durations(df_init["Duration"])
+    df_init["Duration_timedelta"] = df_init["Duration"]
     df_init = df_init.drop(columns=["Tenants On Site"], errors="ignore")
 
-    df_init = pd.merge(df_init, db, on="IHS Site ID", how="left")
-    df_init = df_init[df_init["Year"] == datetime.date.today().year]
+    df_init = pd.merge(df_init, db.reset_index(), on="IHS Site ID", how="left")
+    df_init["site_key"] = df_init["site_key"].fillna(-1).astype("int32")
+    return df_init
 
-    # --- Clean PA ---
-    pa_init = pa_init.rename(columns={"Site ID": "IHS Site ID"})
-    
-    # Melt the dataframe - date columns become row values
-    pa_init = pa_init.melt(id_vars=["IHS Site ID"], var_name="Date", value_name="PA")
-    
-    # Convert the Date column (which contains former column headers) to datetime
-    # Try different approaches based on the data type
-    print("PA Date column type before conversion:")
-    print(pa_init["Date"].dtype)
-    if pd.api.types.is_datetime64_any_dtype(pa_init["Date"]):
-        # Already datetime from Excel
-        pa_init["Date"] = pd.to_datetime(pa_init["Date"])
+
+def _tenant_keys(db_full):
+    return db_full["IHS Site ID"].astype(str) + "|" + db_full["Tenant ID"].astype(str)
+
+
+def _outage_keys(outages):
+    """OUTAGE_KEY plus the occurrence number of the key (0 for its first row, 1 for a repeat, ...)."""
+    keys = outages[OUTAGE_KEY]
+    occurrence = keys.groupby(OUTAGE_KEY, dropna=False, sort=False, observed=True).cumcount()
+    return pd.MultiIndex.from_frame(keys.assign(occurrence=occurrence))
+
+
+def apply_delta(key, delta_file):
+    """
+    Merges a delta workbook into dataset snapshot `key` and returns the new key.
+
+    The delta holds any of the "outages", "db" and "pa" sheets with only new or
+    changed rows. The n-th delta row with an OUTAGE_KEY replaces the n-th
+    base row with that key, db rows are upserted on (IHS Site ID, Tenant ID)
+    and PA cells on (site, date), the delta winning in each case. Only the
+    delta is parsed, and only what it changes is rewritten (see _build_delta).
+    Raises ValueError when the delta has none of the sheets or lacks a column
+    they need.
+    """
+    data = storage.file_bytes(delta_file)
+    new_key = storage.content_hash(key.encode() + data)
+
+    if not storage.has_snapshot(new_key):
+        with storage.snapshot_lock(new_key):
+            if not storage.has_snapshot(new_key):
+                _build_delta(key, new_key, data)
+    return new_key
+
+
+def _build_delta(key, new_key, data):
+    """
+    Merges the delta workbook `data` into snapshot `key` and saves it as `new_key`.
+
+    New outage rows only rewrite the months they fall in (with those months'
+    per-day aggregates), PA rows only the PA matrix, and db rows the site
+    tables; every other table and month is linked from `key`. A db delta
+    rebuilds the site keys, so then every outage month is re-keyed too.
+    """
+    wb = _open_workbook(data)
+    try:
+        delta = {
+            sheet: _sheet_rows(wb, sheet, SHEET_COLUMNS[sheet])
+            for sheet in SHEETS if sheet in wb.sheetnames
+        }
+    finally:
+        wb.close()
+
+    if not delta:
+        raise ValueError(f"Delta file has none of the sheets {', '.join(SHEETS)}")
+    for sheet, frame in delta.items():
+        missing = [col for col in DELTA_COLUMNS[sheet] if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Delta sheet '{sheet}' is missing the column(s) {', '.join(missing)}")
+
+    meta = storage.load_meta(key)
+    base = _load_frames(key)
+    db = base["db"]
+    changed = {}
+    outage_months = set()
+    next_row = meta["next_row"]
+
+    # --- DB: upsert tenant rows; the site keys are rebuilt with the dimension ---
+    if "db" in delta:
+        _, delta_full = clean_db(delta["db"])
+        db_full = base["db_full"]
+        db_full = pd.concat(
+            [db_full[~_tenant_keys(db_full).isin(_tenant_keys(delta_full))], delta_full],
+            ignore_index=True,
+        )
+        db = site_table(db_full)
+        changed.update(db=db, db_full=db_full)
+        outage_months.update(meta["partitions"]["df_init"])
+
+    if "outages" in delta:
+        new_outages = clean_outages(delta["outages"], db)
+        outage_months.update(new_outages["Date"].dt.strftime("%Y-%m").fillna(storage.NO_PARTITION))
+
+    # --- Outages: the base rows of the touched months, re-keyed and/or merged with the delta ---
+    if outage_months:
+        df_init = storage.load_partitions(key, "df_init", sorted(outage_months & set(meta["partitions"]["df_init"])))
+
+        if "db" in delta:
+            site_columns = ["site_key"] + DB_COLUMNS[1:]
+            df_init = pd.merge(
+                df_init.drop(columns=site_columns), db.reset_index(), on="IHS Site ID", how="left"
+            ).set_axis(df_init.index)
+            df_init["site_key"] = df_init["site_key"].fillna(-1).astype("int32")
+
+        if "outages" in delta:
+            # Only the base rows re-exported in the delta are dropped: a delta
+            # row replaces one base copy of a repeated outage, not all of them
+            df_init = df_init[~_outage_keys(df_init).isin(_outage_keys(new_outages))]
+            new_outages.index = pd.RangeIndex(next_row, next_row + len(new_outages))
+            next_row += len(new_outages)
+            df_init = pd.concat([df_init, new_outages])
+
+        changed["df_init"] = df_init
+
+    # --- PA: new date columns / sites, delta cells override ---
+    if "pa" in delta:
+        pa_delta = delta["pa"]
+        pa_delta.columns = pa_delta.columns.astype(str)
+        changed["pa_init"] = base["pa_init"].combine(PAStore.from_wide(pa_delta))
+
+    _save_frames(new_key, changed, {"parent": key, "next_row": next_row}, base=key)
+
+
+# --- KPIs ---
+
+def _pct_change(current, previous):
+    """% change of an outage count; lower is better, so any rise from 0 counts as +100%."""
+    if previous > 0:
+        return ((current - previous) / previous) * 100
+    return 0 if current == 0 else 100
+
+
+# Year column each week numbering counts its weeks in
+WEEK_YEAR_COLUMNS = {"Week": "Year", "iso_week": "iso_year"}
+
+
+def outage_kpis(days, max_year, max_week, max_month, week_col="Week", week_year=None):
+    """
+    Weekly and monthly outage counts with their change vs the previous period.
+
+    `days` is AggregateCube.outage_days for the selected sites and dates,
+    which may span several years: the current week is max_week of week_year
+    (in the year column matching week_col; defaults to max_year) and the
+    current month is max_month of max_year. Week 1 is compared with the last
+    week of the previous year and January with December of the previous year.
+    """
+    week_year = max_year if week_year is None else week_year
+    counts = days["outage_count"]
+    year, month = days["Year"], days["Month"]
+    weeks_year, week = days[WEEK_YEAR_COLUMNS[week_col]], days[week_col]
+
+    current_week_count = counts[(weeks_year == week_year) & (week == max_week)].sum()
+    if max_week == 1:
+        prev_year = week_year - 1
+        prev_weeks = week[weeks_year == prev_year]
+        if not prev_weeks.empty:
+            prev_week_count = counts[(weeks_year == prev_year) & (week == prev_weeks.max())].sum()
+        else:
+            prev_week_count = 0
+    else:
+        prev_week_count = counts[(weeks_year == week_year) & (week == max_week - 1)].sum()
+
+    current_month_count = counts[(year == max_year) & (month == calendar.month_name[max_month])].sum()
+    if max_month == 1:
+        prev_month_mask = (year == max_year - 1) & (month == calendar.month_name[12])
     else:
-        # It's a string or object, parse it
-        # First try without format to let pandas infer
-        pa_init["Date"] = pd.to_datetime(pa_init["Date"], errors="coerce")
-        
-        # If all failed, try with explicit format
-        if pa_init["Date"].isna().all():
-            pa_init["Date"] = pd.to_datetime(pa_init["Date"], format="%d/%m/%Y", errors="coerce")
-
-    # Process PA values
-    pa_init["PA"] = pa_init["PA"].replace("-", np.nan)
-    pa_init["PA"] = pd.to_numeric(pa_init["PA"], errors="coerce").round(2)
-
-    # Downcast for memory efficiency
-    pa_init["IHS Site ID"] = pa_init["IHS Site ID"].astype("category")
-    pa_init["PA"] = pa_init["PA"].astype("float32")
-    # Keep Date as datetime64[ns], NOT category
-
-    return df_init, pa_init, db, db_full
+        prev_month_mask = (year == max_year) & (month == calendar.month_name[max_month - 1])
+    prev_month_count = counts[prev_month_mask].sum()
+
+    return {
+        "current_week_count": current_week_count,
+        "weekly_outage_gain": _pct_change(current_week_count, prev_week_count),
+        "current_month_count": current_month_count,
+        "monthly_outage_gain": _pct_change(current_month_count, prev_month_count),
+    }
+
+
+def pa_kpis(pa_days, decimals=None):
+    """
+    Average PA of the latest month and ISO week with their change vs the previous one.
+
+    `pa_days` is AggregateCube.pa_days for the selected sites and dates. With
+    `decimals` the averages are rounded before the change is computed.
+    """
+    def average(mask):
+        selected = pa_days[mask]
+        count = selected["pa_count"].sum()
+        return selected["pa_sum"].sum() / count if count > 0 else np.nan
+
+    def gain(current, previous):
+        if previous > 0 and not pd.isna(previous):
+            return ((current - previous) / previous) * 100
+        return 0
+
+    if pa_days.empty:
+        return {"monthly_avg_pa": np.nan, "monthly_pa_gain": 0,
+                "latest_week": np.nan, "weekly_avg_pa": np.nan, "weekly_pa_gain": 0}
+
+    year, month = pa_days["year"], pa_days["month"]
+    iso_year, iso_week = pa_days["iso_year"], pa_days["iso_week"]
+
+    # Month (January compares with December of the previous year)
+    latest_year = year.max()
+    latest_month = month[year == latest_year].max()
+    monthly_avg_pa = average((year == latest_year) & (month == latest_month))
+    if latest_month == 1:
+        prev_monthly_avg_pa = average((year == latest_year - 1) & (month == 12))
+    else:
+        prev_monthly_avg_pa = average((year == latest_year) & (month == latest_month - 1))
+
+    # ISO week (week 1 compares with the last week of the previous ISO year)
+    latest_iso_year = iso_year.max()
+    latest_week = iso_week[iso_year == latest_iso_year].max()
+    weekly_avg_pa = average((iso_year == latest_iso_year) & (iso_week == latest_week))
+    if latest_week == 1:
+        prev_iso_year = latest_iso_year - 1
+        prev_weeks = iso_week[iso_year == prev_iso_year]
+        prev_weekly_avg_pa = (
+            average((iso_year == prev_iso_year) & (iso_week == prev_weeks.max()))
+            if not prev_weeks.empty else np.nan
+        )
+    else:
+        prev_weekly_avg_pa = average((iso_year == latest_iso_year) & (iso_week == latest_week - 1))
+
+    if decimals is not None:
+        monthly_avg_pa = round(monthly_avg_pa, decimals)
+        weekly_avg_pa = round(weekly_avg_pa, decimals)
+
+    return {
+        "monthly_avg_pa": monthly_avg_pa,
+        "monthly_pa_gain": gain(monthly_avg_pa, prev_monthly_avg_pa),
+        "latest_week": latest_week,
+        "weekly_avg_pa": weekly_avg_pa,
+        "weekly_pa_gain": gain(weekly_avg_pa, prev_weekly_avg_pa),
+    }
+
+
+def weekly_outage_counts(days, week_col="Week"):
+    """Outage rows per (Year, Week) with a "2025-W07" label, for the weekly outage chart."""
+    weekly_counts = (
+        days.groupby(["Year", week_col])["rows"].sum()
+        .reset_index(name="Outage Count")
+        .rename(columns={week_col: "Week"})
+    )
+    weekly_counts["Week_Label"] = (
+        weekly_counts["Year"].astype(str) + '-W' + weekly_counts["Week"].astype(str).str.zfill(2)
+    )
+    return weekly_counts.sort_values(["Year", "Week"])
+
+
+def weekly_pa(pa_days):
+    """Average PA per ISO (Year, Week) with a "2025-W07" label, for the weekly PA chart."""
+    weekly = pa_days.groupby(["iso_year", "iso_week"])[["pa_sum", "pa_count"]].sum()
+    weekly["PA"] = weekly["pa_sum"] / weekly["pa_count"].where(weekly["pa_count"] > 0)
+    weekly = weekly.reset_index().rename(columns={"iso_year": "Year", "iso_week": "Week"})
+    weekly = weekly[["Year", "Week", "PA"]]
+    weekly["Week_Label"] = weekly["Year"].astype(str) + '-W' + weekly["Week"].astype(str).str.zfill(2)
+    return weekly.sort_values(["Year", "Week"])
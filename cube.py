@@ -0,0 +1,161 @@
+# cube.py
+import numpy as np
+import pandas as pd
+
+
+def _calendar(days):
+    """ISO year/week and calendar month of every day, as small ints."""
+    iso = days.isocalendar()
+    return pd.DataFrame({
+        "year": days.year.astype("int16"),
+        "month": days.month.astype("int8"),
+        "iso_year": iso["year"].to_numpy().astype("int16"),
+        "iso_week": iso["week"].to_numpy().astype("int8"),
+    }, index=days)
+
+
+def outage_site_days(outages):
+    """
+    Outage rows and summed "Outage Count" per (site_key, Date), sorted by site_key then Date.
+
+    Rows without a site key or a date are left out.
+    """
+    outages = outages[(outages["site_key"] >= 0) & outages["Date"].notna()]
+    return (
+        outages.groupby(["site_key", "Date"], sort=True)["Outage Count"]
+        .agg(rows="size", outage_count="sum")
+        .reset_index()
+        .astype({"site_key": "int32", "rows": "int32", "outage_count": "float64"})
+    )
+
+
+def outage_dates(outages):
+    """One row per outage date with the sheet's own Year/Week/Month (they are per-date values)."""
+    outages = outages[outages["Date"].notna()]
+    return outages.groupby("Date")[["Year", "Week", "Month"]].first().reset_index()
+
+
+def outage_calendar(site_days, outage_dates):
+    """
+    Calendar keys of every day with an outage entry: the sheet's Year/Week/Month
+    plus ISO year/week and month (see _calendar), indexed by Date.
+    """
+    days = pd.DatetimeIndex(np.sort(site_days["Date"].unique()), name="Date")
+    sheet_keys = outage_dates.set_index("Date")[["Year", "Week", "Month"]].reindex(days)
+    return pd.concat([sheet_keys, _calendar(days)], axis=1)
+
+
+def pa_calendar(pa_store):
+    """Calendar keys of every PA date."""
+    return _calendar(pa_store.dates)
+
+
+class AggregateCube:
+    """
+    Outage and PA measures per site and day, built once per dataset load from
+    the per-day aggregates stored with the snapshot (outage rows are not read).
+
+    Outages are kept sparse: one entry per site and day with an outage
+    (outage_site_days), sorted by site_key, with per-site offsets into the
+    entries (CSR layout). A site selection gathers its entries through the
+    offsets and sums them per day or per site with bincount, so memory grows
+    with the number of outage days, not sites x history. PA sums and counts
+    come straight from the PAStore matrix. Every day carries its calendar keys
+    (the sheet's Year/Week/Month for outages, ISO year/week and month for
+    both), so KPI cards and weekly charts reduce over the selected sites and
+    then group a few hundred day rows.
+    """
+
+    def __init__(self, site_days, outage_dates, pa_store, db):
+        self.n_sites = len(db)
+
+        self.outage_calendar = outage_calendar(site_days, outage_dates)
+        days = self.outage_calendar.index
+
+        order = np.argsort(site_days["site_key"].to_numpy(), kind="stable")
+        site_days = site_days.iloc[order]
+
+        self.site_keys = site_days["site_key"].to_numpy(dtype="int32")
+        self.day_positions = days.get_indexer(site_days["Date"]).astype("int32")
+        self.rows = site_days["rows"].to_numpy(dtype="int32")
+        self.outage_count = site_days["outage_count"].to_numpy(dtype="float64")
+        # Entries of site k are site_offsets[k]:site_offsets[k + 1]
+        self.site_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(self.site_keys, minlength=self.n_sites))]
+        ).astype("int64")
+
+        # PA rows by site_key; -1 where a site has no PA
+        self.pa_store = pa_store
+        self.pa_rows = pa_store.sites.get_indexer(db["IHS Site ID"])
+        self.pa_calendar = pa_calendar(pa_store)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in [
+            self.site_keys, self.day_positions, self.rows, self.outage_count, self.site_offsets, self.pa_rows,
+        ])
+
+    @staticmethod
+    def _day_range(days, start, end):
+        lo = 0 if start is None else days.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(days) if end is None else days.searchsorted(pd.Timestamp(end), side="right")
+        return lo, hi
+
+    def _entries(self, site_keys, lo, hi):
+        """Positions of the entries of site_keys whose day position is in [lo, hi)."""
+        site_keys = np.asarray(site_keys, dtype="int64")
+        starts = self.site_offsets[site_keys]
+        lengths = self.site_offsets[site_keys + 1] - starts
+        # The ranges starts[i]:starts[i] + lengths[i], concatenated without a loop
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        days = self.day_positions[entries]
+        return entries[(days >= lo) & (days < hi)]
+
+    def active_sites(self, start=None, end=None):
+        """Bitmap over site_key of the sites with at least one outage in the date range."""
+        lo, hi = self._day_range(self.outage_calendar.index, start, end)
+        in_range = (self.day_positions >= lo) & (self.day_positions < hi)
+        return np.bincount(self.site_keys[in_range], minlength=self.n_sites) > 0
+
+    def outage_days(self, site_keys, start=None, end=None):
+        """
+        Outage rows and "Outage Count" per day, summed over site_keys, with calendar keys.
+
+        Days on which none of the sites had an outage are left out, matching a
+        group-by over the raw outage rows.
+        """
+        lo, hi = self._day_range(self.outage_calendar.index, start, end)
+        entries = self._entries(site_keys, lo, hi)
+        day = self.day_positions[entries] - lo
+
+        days = self.outage_calendar.iloc[lo:hi].assign(
+            rows=np.bincount(day, weights=self.rows[entries], minlength=hi - lo).astype("int64"),
+            outage_count=np.bincount(day, weights=self.outage_count[entries], minlength=hi - lo).astype("float64"),
+        )
+        return days[days["rows"] > 0]
+
+    def outage_by_site(self, site_keys, start=None, end=None):
+        """Total "Outage Count" per site over the date range, for sites with at least one outage."""
+        lo, hi = self._day_range(self.outage_calendar.index, start, end)
+        entries = self._entries(site_keys, lo, hi)
+        site = self.site_keys[entries]
+        site_keys = np.asarray(site_keys, dtype="int64")
+
+        rows = np.bincount(site, weights=self.rows[entries], minlength=self.n_sites)[site_keys]
+        counts = np.bincount(site, weights=self.outage_count[entries], minlength=self.n_sites).astype("float64")
+        counts = counts[site_keys]
+        return pd.Series(counts[rows > 0], index=pd.Index(site_keys[rows > 0], name="site_key"))
+
+    def pa_days(self, site_keys, start=None, end=None):
+        """PA sum and non-missing count per day over site_keys, with calendar keys."""
+        lo, hi = self._day_range(self.pa_calendar.index, start, end)
+        rows = self.pa_rows[np.asarray(site_keys, dtype="int64")]
+        rows = rows[rows >= 0]
+        if len(rows) == 0:
+            return self.pa_calendar.iloc[0:0].assign(pa_sum=[], pa_count=[])
+
+        block = self.pa_store.values[rows, lo:hi]
+        return self.pa_calendar.iloc[lo:hi].assign(
+            pa_sum=np.nansum(block, axis=0, dtype="float64"),
+            pa_count=(~np.isnan(block)).sum(axis=0),
+        )
@@ -0,0 +1,174 @@
+# duckdb_backend.py
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional dependency, the cube is used without it
+    duckdb = None
+
+import storage
+from cube import outage_calendar, pa_calendar
+
+# Set PA_DUCKDB=1 (with the duckdb package installed, see requirements-duckdb.txt)
+# to answer the KPI and chart queries with DuckDB instead of the in-memory cube.
+# These are the Homepage and Site Info outage/PA aggregates (Dataset.engine);
+# the Map page does not use DuckDB, its counts come from site_rollup.SiteRollup
+ENABLED = os.environ.get("PA_DUCKDB", "0") == "1"
+DB_DIR = os.environ.get("PA_DUCKDB_DIR", os.path.join(".cache", "duckdb"))
+
+
+def available():
+    if ENABLED and duckdb is None:
+        print("Warning: PA_DUCKDB=1 but duckdb is not installed, using pandas")
+    return ENABLED and duckdb is not None
+
+
+class DuckEngine:
+    """
+    DuckDB implementation of the AggregateCube queries.
+
+    Outage (summed per site and day, see cube.outage_site_days) and PA facts
+    are written once per dataset to a local database file (DB_DIR/<key>.duckdb)
+    keyed by site_key and date; each query joins the selected site keys and
+    aggregates per day or per site in SQL. Results are laid out exactly like
+    the cube's (same calendar keys, columns and dtypes), so the pages and calcs
+    KPI helpers work unchanged. Only the calendars and a per-site PA flag stay
+    in memory.
+    """
+
+    def __init__(self, key, site_days, outage_dates, pa_store, db):
+        self.n_sites = len(db)
+        self.outage_calendar = outage_calendar(site_days, outage_dates)
+        self.pa_calendar = pa_calendar(pa_store)
+
+        # Site key of every PA row (-1 for PA sites missing from db)
+        pa_keys = pd.Index(db["IHS Site ID"]).get_indexer(pa_store.sites)
+        self.has_pa = np.zeros(self.n_sites, dtype=bool)
+        self.has_pa[pa_keys[pa_keys >= 0]] = True
+
+        path = os.path.join(DB_DIR, f"{key}.duckdb")
+        if not os.path.exists(path):
+            with storage.snapshot_lock(f"duckdb-{key}"):
+                if not os.path.exists(path):
+                    _build_database(path, site_days, pa_store, pa_keys)
+        self._con = duckdb.connect(path, read_only=True)
+
+    @property
+    def nbytes(self):
+        calendars = [self.outage_calendar, self.pa_calendar]
+        return sum(int(df.memory_usage(deep=True).sum()) for df in calendars) + self.has_pa.nbytes
+
+    def _query(self, sql, site_keys, start, end):
+        con = self._con.cursor()
+        try:
+            con.register("selected", pd.DataFrame({"site_key": np.asarray(site_keys, dtype="int32")}))
+            return con.execute(sql, [start, end]).df()
+        finally:
+            con.close()
+
+    @staticmethod
+    def _range(start, end):
+        return (
+            None if start is None else pd.Timestamp(start).to_pydatetime(),
+            None if end is None else pd.Timestamp(end).to_pydatetime(),
+        )
+
+    def active_sites(self, start=None, end=None):
+        result = self._query(
+            """
+            SELECT DISTINCT site_key FROM outages
+            WHERE ($1 IS NULL OR date >= $1) AND ($2 IS NULL OR date <= $2)
+            """,
+            [], *self._range(start, end),
+        )
+        active = np.zeros(self.n_sites, dtype=bool)
+        active[result["site_key"].to_numpy()] = True
+        return active
+
+    def outage_days(self, site_keys, start=None, end=None):
+        result = self._query(
+            """
+            SELECT date, sum(rows) AS rows, sum(outage_count) AS outage_count
+            FROM outages JOIN selected USING (site_key)
+            WHERE ($1 IS NULL OR date >= $1) AND ($2 IS NULL OR date <= $2)
+            GROUP BY date ORDER BY date
+            """,
+            site_keys, *self._range(start, end),
+        )
+        return self.outage_calendar.loc[pd.DatetimeIndex(result["date"], name="Date")].assign(
+            rows=result["rows"].to_numpy(dtype="int64"),
+            outage_count=result["outage_count"].to_numpy(dtype="float64"),
+        )
+
+    def outage_by_site(self, site_keys, start=None, end=None):
+        result = self._query(
+            """
+            SELECT site_key, sum(outage_count) AS outage_count
+            FROM outages JOIN selected USING (site_key)
+            WHERE ($1 IS NULL OR date >= $1) AND ($2 IS NULL OR date <= $2)
+            GROUP BY site_key ORDER BY site_key
+            """,
+            site_keys, *self._range(start, end),
+        )
+        return pd.Series(
+            result["outage_count"].to_numpy(dtype="float64"),
+            index=pd.Index(result["site_key"].to_numpy(dtype="int64"), name="site_key"),
+        )
+
+    def pa_days(self, site_keys, start=None, end=None):
+        days = self.pa_calendar
+        if start is not None:
+            days = days[days.index >= pd.Timestamp(start)]
+        if end is not None:
+            days = days[days.index <= pd.Timestamp(end)]
+
+        if not self.has_pa[np.asarray(site_keys, dtype="int64")].any():
+            return days.iloc[0:0].assign(pa_sum=[], pa_count=[])
+
+        result = self._query(
+            """
+            SELECT date, sum(pa) AS pa_sum, count(pa) AS pa_count
+            FROM pa JOIN selected USING (site_key)
+            WHERE ($1 IS NULL OR date >= $1) AND ($2 IS NULL OR date <= $2)
+            GROUP BY date
+            """,
+            site_keys, *self._range(start, end),
+        ).set_index("date")
+        result = result.reindex(days.index, fill_value=0)
+        return days.assign(
+            pa_sum=result["pa_sum"].to_numpy(dtype="float64"),
+            pa_count=result["pa_count"].to_numpy(dtype="int64"),
+        )
+
+
+def _build_database(path, site_days, pa_store, pa_keys):
+    """Writes the per-day outage and (long, non-missing) PA facts to a new DuckDB file."""
+    os.makedirs(DB_DIR, exist_ok=True)
+    tmp_path = os.path.join(DB_DIR, f".{uuid.uuid4().hex}.duckdb")
+
+    rows, cols = np.nonzero(~np.isnan(pa_store.values) & (pa_keys >= 0)[:, None])
+    pa_long = pd.DataFrame({
+        "site_key": pa_keys[rows].astype("int32"),
+        "date": pa_store.dates[cols],
+        "pa": pa_store.values[rows, cols].astype("float64"),
+    })
+    outage_facts = pd.DataFrame({
+        "site_key": site_days["site_key"].to_numpy(dtype="int32"),
+        "date": site_days["Date"].to_numpy(),
+        "rows": site_days["rows"].to_numpy(dtype="int32"),
+        "outage_count": site_days["outage_count"].to_numpy(dtype="float64"),
+    })
+
+    con = duckdb.connect(tmp_path)
+    try:
+        con.register("outage_facts", outage_facts)
+        con.register("pa_long", pa_long)
+        con.execute("CREATE TABLE outages AS SELECT * FROM outage_facts ORDER BY date, site_key")
+        con.execute("CREATE TABLE pa AS SELECT * FROM pa_long ORDER BY date, site_key")
+    finally:
+        con.close()
+    os.replace(tmp_path, path)
@@ -0,0 +1,87 @@
+# export.py
+import gzip
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+# Rows serialised at a time, so an export never holds the text of the whole
+# frame next to the frame itself
+CHUNK_ROWS = 50_000
+
+# Download format -> (file extension, MIME type)
+FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _chunks(df, chunk_rows=CHUNK_ROWS):
+    # At least one (possibly empty) chunk, so empty frames still get a header
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def write_csv(df, stream, chunk_rows=CHUNK_ROWS):
+    """Writes df as CSV (no index) to a binary stream, chunk_rows rows at a time."""
+    for i, chunk in enumerate(_chunks(df, chunk_rows)):
+        stream.write(chunk.to_csv(index=False, header=i == 0).encode())
+
+
+def write_parquet(df, stream, chunk_rows=CHUNK_ROWS):
+    """Writes df as Parquet (no index) to a binary stream, one row group per chunk."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(stream, schema) as writer:
+        for chunk in _chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def to_bytes(df, fmt):
+    """File contents of df in one of FORMATS."""
+    buffer = io.BytesIO()
+    if fmt == "Parquet":
+        write_parquet(df, buffer)
+    elif fmt == "CSV (gzip)":
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as stream:
+            write_csv(df, stream)
+    else:
+        write_csv(df, buffer)
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner="Preparing download...", max_entries=32)
+def export_file(name, state, fmt, _build):
+    """to_bytes(_build(), fmt), cached per file name, filter state and format."""
+    return to_bytes(_build(), fmt)
+
+
+@st.fragment
+def download_panel(label, file_name, state, build, key):
+    """
+    Format picker and download button for the frame returned by build().
+
+    Nothing is serialised until "Prepare" is clicked; the file is then built
+    once per (file_name, state, format) and served from the cache until the
+    filters change. As a fragment, none of these clicks rerun the page.
+    """
+    fmt = st.radio(
+        f"{label} format", list(FORMATS), horizontal=True,
+        key=f"{key}_format", label_visibility="collapsed",
+    )
+    if st.button(f"Prepare {label}", key=f"{key}_prepare"):
+        st.session_state[f"{key}_export"] = (state, fmt)
+    if st.session_state.get(f"{key}_export") != (state, fmt):
+        return
+
+    extension, mime = FORMATS[fmt]
+    st.download_button(
+        label=label,
+        data=export_file(file_name, state, fmt, build),
+        file_name=file_name + extension,
+        mime=mime,
+        icon="📥",
+        key=f"{key}_download",
+        on_click="ignore",
+    )
@@ -1,6 +1,136 @@
+import contextlib
+import os
+import time
+
+import numpy as np
 import pandas as pd
 
-def apply_filters(df, filters: dict):
+# Set PA_TRACE_TIMINGS=1 to print how long each page run and section takes
+TRACE_TIMINGS = os.environ.get("PA_TRACE_TIMINGS", "0") == "1"
+
+
+class FilterIndex:
+    """
+    Prebuilt row indexes over a DataFrame for fast, repeated filtering.
+
+    For every indexed column the row positions are grouped by value (sorted
+    positions per value), and the date column is kept sorted. A filter
+    combination then becomes a few array lookups and bitmap intersections,
+    and the DataFrame is materialised only once at the end (see apply_filters).
+    Build it once per dataset, not per rerun.
+    """
+
+    def __init__(self, df, columns, date_column=None):
+        self.df = df
+        self.columns = {}
+        for col in columns:
+            codes, uniques = pd.factorize(df[col])
+            order = np.argsort(codes, kind="stable")
+            # Rows of value k are order[bounds[k]:bounds[k + 1]] (missing values sort first)
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.columns[col] = (pd.Index(uniques), order, bounds)
+
+        self.date_column = date_column
+        if date_column is not None:
+            dates = df[date_column]
+            valid = np.flatnonzero(dates.notna().to_numpy())
+            order = valid[np.argsort(dates.to_numpy()[valid], kind="stable")]
+            self.date_order = order
+            self.sorted_dates = pd.DatetimeIndex(dates.to_numpy()[order])
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def nbytes(self):
+        """Memory held by the index arrays (not the indexed frame)."""
+        arrays = [array for _, order, bounds in self.columns.values() for array in (order, bounds)]
+        if self.date_column is not None:
+            arrays += [self.date_order, self.sorted_dates]
+        uniques = sum(int(values.memory_usage(deep=True)) for values, _, _ in self.columns.values())
+        return sum(array.nbytes for array in arrays) + uniques
+
+    def handles(self, col, val):
+        if col == self.date_column and isinstance(val, tuple) and len(val) == 2:
+            return True
+        return col in self.columns and not isinstance(val, str) and not _is_range(val)
+
+    def value_rows(self, col, values):
+        """Bitmap of rows whose `col` is one of `values`."""
+        uniques, order, bounds = self.columns[col]
+        codes = uniques.get_indexer(pd.Index(values).unique())
+        codes = codes[codes >= 0]
+
+        mask = np.zeros(len(self.df), dtype=bool)
+        if len(codes):
+            mask[np.concatenate([order[bounds[c]:bounds[c + 1]] for c in codes])] = True
+        return mask
+
+    def date_rows(self, start, end):
+        """Bitmap of rows with start <= date <= end."""
+        lo = self.sorted_dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = self.sorted_dates.searchsorted(pd.Timestamp(end), side="right")
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[self.date_order[lo:hi]] = True
+        return mask
+
+    def mask(self, col, val):
+        if col == self.date_column and isinstance(val, tuple):
+            return self.date_rows(*val)
+        if pd.api.types.is_list_like(val):
+            return self.value_rows(col, val)
+        return self.value_rows(col, [val])
+
+
+def _is_empty(val):
+    if val is None:
+        return True
+    if isinstance(val, str):
+        return val == ""
+    return pd.api.types.is_list_like(val) and len(val) == 0
+
+
+def _is_range(val):
+    return isinstance(val, (tuple, list)) and len(val) == 2 and all(isinstance(v, (int, float)) for v in val)
+
+
+def _column_mask(df, col, val):
+    """Boolean mask for one filter, evaluated directly on the column."""
+    if col == "Date" and isinstance(val, tuple) and len(val) == 2:
+        return ((df["Date"] >= val[0]) & (df["Date"] <= val[1])).to_numpy()
+    # Range filter (e.g. slider): (min, max)
+    elif _is_range(val):
+        return df[col].between(val[0], val[1]).to_numpy()
+
+    # List filter (e.g. multiselect)
+    elif pd.api.types.is_list_like(val):
+        return df[col].isin(val).to_numpy()
+
+    # Text filter
+    elif isinstance(val, str):
+        return df[col].str.contains(val, case=False, na=False).to_numpy()
+
+    # Exact match
+    else:
+        return (df[col] == val).to_numpy()
+
+
+def filter_mask(df, filters: dict, index=None):
+    """Combined row bitmap of all filters (see apply_filters), without materialising rows."""
+    mask = np.ones(len(df), dtype=bool)
+
+    for col, val in filters.items():
+        if _is_empty(val):
+            continue
+        if index is not None and index.handles(col, val):
+            mask &= index.mask(col, val)
+        else:
+            mask &= _column_mask(df, col, val)
+
+    return mask
+
+
+def apply_filters(df, filters: dict, index=None):
     """
     Applies multiple filters to a DataFrame.
     
@@ -10,34 +140,64 @@ def apply_filters(df, filters: dict):
                         - list/tuple for multi-select or range filters
                         - string for text contains
                         - single value for exact match
+        index (FilterIndex): Optional prebuilt index over df. Multi-select,
+                        exact-match and date filters on indexed columns are
+                        then answered from it instead of scanning the column.
                         
     Returns:
         pd.DataFrame: Filtered DataFrame.
     """
-    filtered_df = df.copy()
+    # Filters are combined as one bitmap so the rows are copied at most once
+    return frame_view(df, filter_mask(df, filters, index))
 
-    for col, val in filters.items():
-        if val is None or val == "" or val == []:
-            continue
-        if col == "Date" and isinstance(val, tuple) and len(val) == 2:
-            filtered_df = filtered_df[(filtered_df["Date"] >= val[0]) & (filtered_df["Date"] <= val[1])]
-        # Range filter (e.g. slider): (min, max)
-        elif isinstance(val, (tuple, list)) and len(val) == 2 and all(isinstance(v, (int, float)) for v in val):
-            filtered_df = filtered_df[filtered_df[col].between(val[0], val[1])]
 
-        # List filter (e.g. multiselect)
-        elif isinstance(val, (list, tuple)):
-            filtered_df = filtered_df[filtered_df[col].isin(val)]
+def filter_key(filters: dict):
+    """
+    Hashable key of a filter selection (same value rules as apply_filters).
+
+    Empty selections are dropped and list values become tuples, so selections
+    that filter the same rows get the same key. Cached functions take it
+    (with the dataset key) instead of the filtered frames, which st.cache_data
+    would otherwise hash on every call.
+    """
+    return tuple(
+        (col, tuple(val) if pd.api.types.is_list_like(val) else val)
+        for col, val in sorted(filters.items())
+        if not _is_empty(val)
+    )
 
-        # Text filter
-        elif isinstance(val, str):
-            filtered_df = filtered_df[filtered_df[col].str.contains(val, case=False, na=False)]
 
-        # Exact match
-        else:
-            filtered_df = filtered_df[filtered_df[col] == val]
+def frame_view(df, mask):
+    """
+    Rows of df selected by a boolean mask.
+
+    Selections that keep every row, or one contiguous block of rows, are
+    returned as views of df (copy-on-write, enabled by the app entry point,
+    keeps edits to them local); anything else is gathered once.
+    """
+    positions = np.flatnonzero(mask)
+    if len(positions) == 0:
+        return df.iloc[0:0]
+    lo, hi = positions[0], positions[-1] + 1
+    if hi - lo == len(positions):
+        return df.iloc[lo:hi]
+    return df.take(positions)
+
+
+def log_timing(label, started):
+    """Prints the time since `started` (a time.perf_counter() value), see TRACE_TIMINGS."""
+    if TRACE_TIMINGS:
+        print(f"[timing] {label}: {(time.perf_counter() - started) * 1000:.1f} ms")
+
 
-    return filtered_df
+@contextlib.contextmanager
+def timed(label):
+    """Times the enclosed block with log_timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        log_timing(label, started)
 
 
 
@@ -0,0 +1,111 @@
+# pa_store.py
+import numpy as np
+import pandas as pd
+
+
+class PAStore:
+    """
+    PA values kept as a dense float32 matrix of sites x days.
+
+    Rows follow `sites` (IHS Site IDs) and columns follow `dates` (sorted
+    daily timestamps). Date and site slices are array slices/takes, and the
+    long (site, date, PA) frame the pages work with is only built on demand.
+    """
+
+    def __init__(self, values, sites, dates):
+        self.values = np.asarray(values, dtype="float32")
+        self.sites = pd.Index(sites, name="IHS Site ID")
+        self.dates = pd.DatetimeIndex(dates, name="Date")
+
+    @classmethod
+    def from_wide(cls, pa_sheet):
+        """Builds the store from the raw "pa" sheet (Site ID + one column per day)."""
+        pa_sheet = pa_sheet.rename(columns={"Site ID": "IHS Site ID"})
+        pa_sheet = pa_sheet.dropna(subset=["IHS Site ID"])
+        pa_sheet = pa_sheet.drop_duplicates(subset=["IHS Site ID"], keep="first")
+
+        date_columns = pa_sheet.columns.drop("IHS Site ID")
+        headers = pd.Series(date_columns.to_numpy(dtype=object))
+
+        # Date headers are either real dates from Excel or strings to parse
+        dates = pd.to_datetime(headers, errors="coerce")
+        if dates.isna().all():
+            dates = pd.to_datetime(headers, format="%d/%m/%Y", errors="coerce")
+
+        valid = dates.notna().to_numpy()
+        # "-" marks a missing day and coerces to NaN
+        block = pa_sheet[date_columns[valid]].apply(pd.to_numeric, errors="coerce").round(2)
+
+        dates = pd.DatetimeIndex(dates[valid])
+        order = np.argsort(dates.to_numpy(), kind="stable")
+
+        return cls(
+            block.to_numpy(dtype="float32")[:, order],
+            pa_sheet["IHS Site ID"].astype(str),
+            dates[order],
+        )
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def __len__(self):
+        return self.values.size
+
+    @property
+    def empty(self):
+        return self.values.size == 0
+
+    def date_range(self):
+        """(min_date, max_date) as date objects, like helper_functions.get_valid_date_range."""
+        if self.empty:
+            raise ValueError("No valid dates found in PA data")
+        return self.dates[0].date(), self.dates[-1].date()
+
+    def slice_dates(self, start, end):
+        """Store restricted to start <= date <= end (inclusive). Shares memory with self."""
+        lo = self.dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = self.dates.searchsorted(pd.Timestamp(end), side="right")
+        return PAStore(self.values[:, lo:hi], self.sites, self.dates[lo:hi])
+
+    def slice_sites(self, sites):
+        """Store restricted to the given IHS Site IDs, keeping the store's site order."""
+        positions = np.flatnonzero(self.sites.isin(sites))
+        return PAStore(self.values[positions], self.sites[positions], self.dates)
+
+    def combine(self, other):
+        """
+        Union of two stores over sites and dates; cells present in `other` win.
+
+        Used to fold a daily delta (new date columns, new or corrected sites)
+        into the persisted store.
+        """
+        new_sites = other.sites[~other.sites.isin(self.sites)]
+        sites = self.sites.append(new_sites) if len(new_sites) else self.sites
+        dates = self.dates.union(other.dates)
+
+        values = np.full((len(sites), len(dates)), np.nan, dtype="float32")
+        values[np.ix_(sites.get_indexer(self.sites), dates.get_indexer(self.dates))] = self.values
+
+        rows = sites.get_indexer(other.sites)
+        cols = dates.get_indexer(other.dates)
+        block = values[np.ix_(rows, cols)]
+        values[np.ix_(rows, cols)] = np.where(np.isnan(other.values), block, other.values)
+
+        return PAStore(values, sites, dates)
+
+    def to_long(self):
+        """
+        Long frame with one row per site and day: IHS Site ID (category), Date, PA.
+
+        Rows are ordered date-major, the same as melting the wide sheet.
+        """
+        n_sites, n_dates = self.values.shape
+        categories = self.sites.sort_values()
+        codes = categories.get_indexer(self.sites)
+
+        return pd.DataFrame({
+            "IHS Site ID": pd.Categorical.from_codes(np.tile(codes, n_dates), categories),
+            "Date": np.repeat(self.dates.to_numpy(), n_sites),
+            "PA": self.values.T.ravel(),
+        })
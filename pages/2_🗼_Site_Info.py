@@ -1,16 +1,12 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import altair as alt
-import plotly.express as px
-import plotly.graph_objects as go
-import numpy as np
-import datetime
-import time
 import calendar
 # internal imports
 import calcs
-from helper_functions import human_format, apply_filters, get_valid_date_range
+import export
+from helper_functions import human_format, apply_filters
+
 
 airtel_css = """
     <style>
@@ -75,17 +71,16 @@ st.set_page_config(layout="wide", page_title="Site Information Dashboard")
 # ----------------------------
 # Load Data
 # ----------------------------
-df1 = st.session_state["df_init"]
-pa_df1 = st.session_state["pa_init"]
-db1 = st.session_state["db"]
-db_full1 = st.session_state["db_full"]
-
-df = df1.copy()
-db = db1.copy()
-pa_df = pa_df1.copy()
-db_full = db_full1.copy()
+dataset = calcs.get_dataset(st.session_state["dataset_key"])
+pa_store = dataset.pa_store
+db1 = dataset.db
+db_full1 = dataset.db_full
 
-pa_df = pd.merge(pa_df, db, on="IHS Site ID", how="left")
+# Dataset frames are read-only; filters below return views (copy-on-write)
+df = dataset.outage_dates
+db = db1
+db_full = db_full1
+site_tenants = dataset.site_tenants
 
 # Get the maximum date in the dataframe
 max_date = df['Date'].max()
@@ -94,6 +89,7 @@ max_date_dt = pd.to_datetime(max_date)
 # Extract year, week, and month from the maximum date
 max_year = max_date_dt.year
 max_week = max_date_dt.isocalendar().week
+max_iso_year = max_date_dt.isocalendar().year
 max_month = max_date_dt.month
 
 # Get minimum week from minimum date
@@ -101,49 +97,34 @@ min_date = df['Date'].min()
 min_date_dt = pd.to_datetime(min_date)
 min_week = min_date_dt.isocalendar().week
 
-# Filter DataFrame for the week containing the max date
-df['Datetime'] = pd.to_datetime(df['Date'])
-df['ISO_Year'] = df['Datetime'].dt.isocalendar().year
-df['Week'] = df['Datetime'].dt.isocalendar().week
-
-week_df = df[(df['ISO_Year'] == max_date_dt.isocalendar().year) & 
-             (df['Week'] == max_week)]
-max_wk_min_date = week_df['Date'].min()
-max_wk_max_date = week_df['Date'].max()
+engine = dataset.engine
 
-def is_week_complete(df_fxn):
+def is_week_complete(outage_days):
     """Check if the latest week has 7 days of data"""
-    df_fxn = df_fxn.copy()
-    df_fxn['Date'] = pd.to_datetime(df_fxn['Date'])
-    
-    # Get the latest date
-    latest_date = df_fxn['Date'].max()
-    latest_iso_year = latest_date.isocalendar().year
-    latest_week = latest_date.isocalendar().week
-    
-    # Filter for the latest week
-    latest_week_df = df_fxn[
-        (df_fxn['Date'].dt.isocalendar().year == latest_iso_year) & 
-        (df_fxn['Date'].dt.isocalendar().week == latest_week)
-    ]
-    
+    if outage_days.empty:
+        return False
+
+    # Get the latest date's ISO week
+    latest = outage_days.iloc[-1]
+
     # Count unique dates in the latest week
-    unique_days = latest_week_df['Date'].nunique()
-    
-    return unique_days == 7
+    latest_week_days = outage_days[
+        (outage_days["iso_year"] == latest["iso_year"]) &
+        (outage_days["iso_week"] == latest["iso_week"])
+    ]
+    return len(latest_week_days) == 7
 
 # ----------------------------
 # Sidebar: Filters
 # ----------------------------
 st.sidebar.header("Filters")
 
-# Zone Filter
-df = df[df["Zone"] == zone].copy()
-pa_df = pa_df[pa_df["Zone"] == zone].copy()
+# Zone Filter (outages are filtered by zone and date together below)
+zone_keys = db.index[db["Zone"] == zone]
 
 # Date range input
 try:
-    min_date, max_date = get_valid_date_range(pa_df, "Date")
+    min_date, max_date = pa_store.date_range()
 except ValueError as e:
     st.error(str(e))
     st.stop()
@@ -166,25 +147,16 @@ else:
 start_datetime = pd.to_datetime(start_date)
 end_datetime = pd.to_datetime(end_date)
 
-pa_df = pa_df[(pa_df["Date"] >= start_datetime) & 
-              (pa_df["Date"] <= end_datetime)].copy()
-df = df[(df["Date"] >= start_datetime) & 
-        (df["Date"] <= end_datetime)].copy()
-
-# Store original dataframes AFTER date filtering but BEFORE site filtering
-if 'df_original' not in st.session_state:
-    st.session_state.df_original = df.copy()
-if 'pa_df_original' not in st.session_state:
-    st.session_state.pa_df_original = pa_df.copy()
+# PA stays in the store until the site is chosen; site attributes are attached after that
+pa_scope = pa_store.slice_dates(start_datetime, end_datetime).slice_sites(db.loc[zone_keys, "IHS Site ID"])
+df = apply_filters(dataset.outages(start_datetime, end_datetime), {"site_key": zone_keys})
 
-# Update stored dataframes when date range changes
-current_date_range = (start_date, end_date)
+# Reset the site selection when date range (or the dataset, after a daily update) changes
+current_date_range = (start_date, end_date, st.session_state.get("dataset_key"))
 if 'stored_date_range' not in st.session_state:
     st.session_state.stored_date_range = current_date_range
     
 if st.session_state.stored_date_range != current_date_range:
-    st.session_state.df_original = df.copy()
-    st.session_state.pa_df_original = pa_df.copy()
     st.session_state.stored_date_range = current_date_range
     st.session_state.ihs_site_id = "Select Site"
     st.session_state.tenant_site_id = "Select Site"
@@ -198,54 +170,53 @@ if 'ihs_site_id' not in st.session_state:
         st.session_state.ihs_site_id = "Select Site"
     
 if 'tenant_site_id' not in st.session_state:
-    site_ids = df["IHS Site ID"].dropna().sort_values().unique().tolist()
-    db_filtered = db_full[db_full["IHS Site ID"].isin(site_ids)]
-    if st.session_state.ihs_site_id != "Select Site":
-        top_tenant = db_filtered.loc[db_filtered["IHS Site ID"] == st.session_state.ihs_site_id, "tenant_and_id"]
-        st.session_state.tenant_site_id = top_tenant.iloc[0] if not top_tenant.empty else "Select Site"
-    else:
-        st.session_state.tenant_site_id = "Select Site"
+    top_tenant = site_tenants.tenants(st.session_state.ihs_site_id, set(df["IHS Site ID"].dropna().unique()))
+    st.session_state.tenant_site_id = top_tenant[0] if top_tenant else "Select Site"
 
-# Use original dataframes for creating the lists
-df_work = st.session_state.df_original
-pa_df_work = st.session_state.pa_df_original
+# Outages AFTER date filtering but BEFORE site filtering, used for the lists.
+# Rebuilt from the shared dataset's indexes on every run rather than stashed per session.
+df_work = df
 
-# Prepare data
-site_ids = df_work["IHS Site ID"].dropna().sort_values().unique().tolist()
-db_filtered = db_full[db_full["IHS Site ID"].isin(site_ids)]
+# Prepare data: sites with outages in the range, and their tenants from the
+# dataset's site <-> tenant index (no db_full scan)
+site_ids = sorted(df_work["IHS Site ID"].dropna().unique())
+listed_sites = set(site_ids)
 
 site_list = ["Select Site"] + site_ids
-tenant_site_list = ["Select Site"] + db_filtered["tenant_and_id"].dropna().sort_values().unique().tolist()
-
-# Callback functions
+tenant_site_list = ["Select Site"] + site_tenants.tenant_options(site_ids)
+
+# Typeahead: narrow both lists to the sites matching an ID, address or
+# tenant search (best match first); the current selections stay listed
+site_search = st.sidebar.text_input("Find Site", placeholder="IHS ID, address, tenant", key="site_search")
+if site_search.strip():
+    matches = db_full.iloc[dataset.search_index.search(site_search)]
+    listed_tenants = set(tenant_site_list)
+    site_list = list(dict.fromkeys(
+        ["Select Site", st.session_state.ihs_site_id]
+        + [site for site in pd.unique(matches["IHS Site ID"]) if site in listed_sites]
+    ))
+    tenant_site_list = list(dict.fromkeys(
+        ["Select Site", st.session_state.tenant_site_id]
+        + [tenant for tenant in pd.unique(matches["tenant_and_id"].dropna()) if tenant in listed_tenants]
+    ))
+
+# Callback functions (index lookups, restricted to the listed sites)
 def on_ihs_change():
     site_id = st.session_state.ihs_selectbox
-    df_temp = st.session_state.df_original
-    site_ids_temp = df_temp["IHS Site ID"].dropna().sort_values().unique().tolist()
-    db_filtered_temp = db_full[db_full["IHS Site ID"].isin(site_ids_temp)]
     
     if site_id != "Select Site":
-        matching_tenants = db_filtered_temp.loc[db_filtered_temp["IHS Site ID"] == site_id, "tenant_and_id"].dropna()
-        if not matching_tenants.empty:
-            st.session_state.tenant_site_id = matching_tenants.iloc[0]
-        else:
-            st.session_state.tenant_site_id = "Select Site"
+        matching_tenants = site_tenants.tenants(site_id, listed_sites)
+        st.session_state.tenant_site_id = matching_tenants[0] if matching_tenants else "Select Site"
     else:
         st.session_state.tenant_site_id = "Select Site"
     st.session_state.ihs_site_id = site_id
 
 def on_tenant_change():
     tenant_id = st.session_state.tenant_selectbox
-    df_temp = st.session_state.df_original
-    site_ids_temp = df_temp["IHS Site ID"].dropna().sort_values().unique().tolist()
-    db_filtered_temp = db_full[db_full["IHS Site ID"].isin(site_ids_temp)]
     
     if tenant_id != "Select Site":
-        matching_ihs = db_filtered_temp.loc[db_filtered_temp["tenant_and_id"] == tenant_id, "IHS Site ID"].dropna()
-        if not matching_ihs.empty:
-            st.session_state.ihs_site_id = matching_ihs.iloc[0]
-        else:
-            st.session_state.ihs_site_id = "Select Site"
+        matching_ihs = site_tenants.site(tenant_id, listed_sites)
+        st.session_state.ihs_site_id = matching_ihs if matching_ihs is not None else "Select Site"
     else:
         st.session_state.ihs_site_id = "Select Site"
     st.session_state.tenant_site_id = tenant_id
@@ -276,20 +247,45 @@ final_site_id = st.session_state.ihs_site_id
 
 if final_site_id and final_site_id != "Select Site":
     if final_site_id in df_work["IHS Site ID"].values:
-        df = df_work[df_work["IHS Site ID"] == final_site_id].copy()
-        pa_df = pa_df_work[pa_df_work["IHS Site ID"] == final_site_id].copy()
+        df = df_work[df_work["IHS Site ID"] == final_site_id]
+        pa_df = pa_scope.slice_sites([final_site_id]).to_long()
         
         st.sidebar.success(f"IHS Site: {final_site_id}")
         st.sidebar.info(f"Tenant: {st.session_state.tenant_site_id}")
     else:
         st.sidebar.error(f"Site ID '{final_site_id}' not found in the selected date range.")
         df = df_work.iloc[0:0]
-        pa_df = pa_df_work.iloc[0:0]
+        pa_df = pa_scope.slice_sites([]).to_long()
 else:
     df = df_work
-    pa_df = pa_df_work
+    pa_df = pa_scope.to_long()
     st.sidebar.info("Please select a site to filter data.")
 
+pa_df = pd.merge(pa_df, db, on="IHS Site ID", how="left")
+
+# Sites behind the cards and charts: the selected one, or the whole zone
+if final_site_id and final_site_id != "Select Site":
+    site_keys = db.index[(db["IHS Site ID"] == final_site_id) & (db["Zone"] == zone)]
+    if final_site_id not in df_work["IHS Site ID"].values:
+        site_keys = site_keys[:0]
+else:
+    site_keys = zone_keys
+
+# ISO calendar columns for the displayed outage and PA rows
+df = df.assign(
+    Datetime=df["Date"],
+    ISO_Year=df["Date"].dt.isocalendar().year,
+    Week=df["Date"].dt.isocalendar().week,
+)
+pa_iso = pa_df["Date"].dt.isocalendar()
+pa_df = pa_df.assign(
+    Datetime=pa_df["Date"],
+    Year=pa_df["Date"].dt.year,
+    Month=pa_df["Date"].dt.month,
+    Week=pa_iso["week"],
+    ISO_Year=pa_iso["year"],
+)
+
 
 
 
@@ -338,11 +334,15 @@ else:
 # Calculate Gains/Percentage Changes
 # ----------------------------
 
+# All cards and charts are answered from the aggregate engine: per-day sums
+# over the selected site (or zone), grouped by the precomputed calendar keys
+outage_days = engine.outage_days(site_keys, start_datetime, end_datetime)
+pa_days = engine.pa_days(site_keys, start_datetime, end_datetime)
+
 # 1. OVERALL OUTAGE COUNT GAIN (compared to average of all sites)
 # Get all sites' outage counts
-all_sites_outage_counts = df_work.groupby("IHS Site ID")["Outage Count"].sum()
-avg_outage_all_sites = all_sites_outage_counts.mean()
-current_site_outage = sum(df["Outage Count"])
+avg_outage_all_sites = engine.outage_by_site(zone_keys, start_datetime, end_datetime).mean()
+current_site_outage = outage_days["outage_count"].sum()
 
 # Calculate percentage difference from average (lower is better, so negative is good)
 if avg_outage_all_sites > 0:
@@ -350,105 +350,19 @@ if avg_outage_all_sites > 0:
 else:
     overall_outage_gain = 0
 
-# 2. WEEKLY OUTAGE COUNT GAIN (compared to previous week)
-current_week_count = sum(df[df['Week'] == max_week]["Outage Count"])
-
-# Handle week 1 - get last week of previous year
-if max_week == 1:
-    prev_year = max_year - 1
-    prev_week_df = df[(df['Year'] == prev_year)]
-    if not prev_week_df.empty:
-        prev_week = prev_week_df['Week'].max()
-        prev_week_count = sum(df[(df['Year'] == prev_year) & (df['Week'] == prev_week)]["Outage Count"])
-    else:
-        prev_week_count = 0
-else:
-    prev_week = max_week - 1
-    prev_week_count = sum(df[(df['Year'] == max_year) & (df['Week'] == prev_week)]["Outage Count"])
-
-
-# Calculate percentage change (lower is better, so negative is good)
-if prev_week_count > 0:
-    weekly_outage_gain = ((current_week_count - prev_week_count) / prev_week_count) * 100
-else:
-    weekly_outage_gain = 0 if current_week_count == 0 else 100
-
-# 3. MONTHLY OUTAGE COUNT GAIN (compared to previous month)
-current_month_count = sum(df[df['Month'] == calendar.month_name[max_month]]["Outage Count"])
-
-# Handle January - get December of previous year
-if max_month == 1:
-    prev_year = max_year - 1
-    prev_month = 12
-    prev_month_count = sum(df[(df['Year'] == prev_year) & (df['Month'] == calendar.month_name[prev_month])]["Outage Count"])
-else:
-    prev_month = max_month - 1
-    prev_month_count = sum(df[(df['Year'] == max_year) & (df['Month'] == calendar.month_name[prev_month])]["Outage Count"])
-
-# Calculate percentage change (lower is better, so negative is good)
-if prev_month_count > 0:
-    monthly_outage_gain = ((current_month_count - prev_month_count) / prev_month_count) * 100
-else:
-    monthly_outage_gain = 0 if current_month_count == 0 else 100
-
-
-# 4. MONTHLY PA GAIN (compared to previous month)
-pa_df = pa_df.copy()  # Add this line
-pa_df.loc[:, 'Datetime'] = pd.to_datetime(pa_df['Date'], errors='coerce')
-pa_df.loc[:, 'Year'] = pa_df['Datetime'].dt.year
-pa_df.loc[:, 'Month'] = pa_df['Datetime'].dt.month
-
-latest_year = pa_df['Year'].max()
-latest_month = pa_df[pa_df['Year'] == latest_year]['Month'].max()
-latest_month_df = pa_df[(pa_df['Year'] == latest_year) & (pa_df['Month'] == latest_month)]
-monthly_avg_pa = pd.to_numeric(latest_month_df['PA'], errors='coerce').mean()
-
-# Handle January - get December of previous year
-if latest_month == 1:
-    prev_year_pa = latest_year - 1
-    prev_month_pa = 12
-    prev_month_df = pa_df[(pa_df['Year'] == prev_year_pa) & (pa_df['Month'] == prev_month_pa)]
-else:
-    prev_month_pa = latest_month - 1
-    prev_month_df = pa_df[(pa_df['Year'] == latest_year) & (pa_df['Month'] == prev_month_pa)]
-
-prev_monthly_avg_pa = pd.to_numeric(prev_month_df['PA'], errors='coerce').mean()
+# 2./3. WEEKLY and MONTHLY OUTAGE COUNT GAIN (compared to previous ISO week/month)
+outage_stats = calcs.outage_kpis(outage_days, max_year, max_week, max_month, week_col="iso_week", week_year=max_iso_year)
+current_month_count = outage_stats["current_month_count"]
+weekly_outage_gain = outage_stats["weekly_outage_gain"]
+monthly_outage_gain = outage_stats["monthly_outage_gain"]
 
-# Calculate percentage change (higher is better, so positive change is good)
-if prev_monthly_avg_pa > 0 and not pd.isna(prev_monthly_avg_pa):
-    monthly_pa_gain = ((monthly_avg_pa - prev_monthly_avg_pa) / prev_monthly_avg_pa) * 100
-else:
-    monthly_pa_gain = 0
-
-# 5. WEEKLY PA GAIN (compared to previous week)
-pa_df.loc[:, 'Week'] = pa_df['Datetime'].dt.isocalendar().week
-pa_df.loc[:, 'ISO_Year'] = pa_df['Datetime'].dt.isocalendar().year
-
-latest_iso_year = pa_df['ISO_Year'].max()
-latest_week = pa_df[pa_df['ISO_Year'] == latest_iso_year]['Week'].max()
-latest_week_df = pa_df[(pa_df['ISO_Year'] == latest_iso_year) & (pa_df['Week'] == latest_week)]
-weekly_avg_pa = pd.to_numeric(latest_week_df['PA'], errors='coerce').mean()
-
-# Handle week 1 - get last week of previous year
-if latest_week == 1:
-    prev_iso_year = latest_iso_year - 1
-    prev_week_pa_df = pa_df[pa_df['ISO_Year'] == prev_iso_year]
-    if not prev_week_pa_df.empty:
-        prev_week_pa = prev_week_pa_df['Week'].max()
-        prev_week_df_pa = pa_df[(pa_df['ISO_Year'] == prev_iso_year) & (pa_df['Week'] == prev_week_pa)]
-    else:
-        prev_week_df_pa = pd.DataFrame()
-else:
-    prev_week_pa = latest_week - 1
-    prev_week_df_pa = pa_df[(pa_df['ISO_Year'] == latest_iso_year) & (pa_df['Week'] == prev_week_pa)]
-
-prev_weekly_avg_pa = pd.to_numeric(prev_week_df_pa['PA'], errors='coerce').mean()
-
-# Calculate percentage change (higher is better, so positive change is good)
-if prev_weekly_avg_pa > 0 and not pd.isna(prev_weekly_avg_pa):
-    weekly_pa_gain = ((weekly_avg_pa - prev_weekly_avg_pa) / prev_weekly_avg_pa) * 100
-else:
-    weekly_pa_gain = 0
+# 4./5. MONTHLY and WEEKLY PA GAIN (compared to previous month/week)
+pa_stats = calcs.pa_kpis(pa_days)
+monthly_avg_pa = pa_stats["monthly_avg_pa"]
+monthly_pa_gain = pa_stats["monthly_pa_gain"]
+latest_week = pa_stats["latest_week"]
+weekly_avg_pa = pa_stats["weekly_avg_pa"]
+weekly_pa_gain = pa_stats["weekly_pa_gain"]
 
 
 
@@ -456,7 +370,7 @@ else:
 # ----------------------------
 # Layout Setup
 # ----------------------------
-matches = db_filtered.loc[db_filtered["IHS Site ID"] == final_site_id, "tenant_and_id"].dropna().tolist()
+matches = site_tenants.tenants(final_site_id, listed_sites)
 tenant_str = " - ".join(matches) if matches else "-"
 
 st.subheader(f"{final_site_id} - Tenants ({tenant_str})")
@@ -474,15 +388,15 @@ try:
         with st.container(border=True):
             st.metric(
                 label="Outage Count", 
-                value=human_format(sum(df["Outage Count"])), 
+                value=human_format(current_site_outage), 
                 delta=f"{overall_outage_gain:.2f}%" if overall_outage_gain != 0 else "Average",
                 delta_color="inverse"  # Red for positive (bad), green for negative (good)
             )
         
     with col2:
         with st.container(border=True):
-            week_count = sum(df[df['Week'] == max_week]["Outage Count"])
-            if is_week_complete(df) == False:
+            week_count = outage_stats["current_week_count"]
+            if is_week_complete(outage_days) == False:
                 st.metric(
                     label=f"⚠️ Week {max_week} Outage Count", 
                     value=human_format(week_count), 
@@ -528,11 +442,7 @@ try:
     chart_col1, chart_col2 = st.columns(2)
     
     with chart_col1:
-        weekly_counts = df.groupby(['Year', 'Week']).size().reset_index(name='Outage Count')
-        weekly_counts['Week_Label'] = (
-            weekly_counts['Year'].astype(str) + '-W' + weekly_counts['Week'].astype(str).str.zfill(2)
-        )
-        weekly_counts = weekly_counts.sort_values(['Year', 'Week'])
+        weekly_counts = calcs.weekly_outage_counts(outage_days, week_col="iso_week")
         
         bars = alt.Chart(weekly_counts).mark_bar().encode(
             x=alt.X('Week_Label:O', title='Week'),
@@ -560,15 +470,7 @@ try:
         st.altair_chart(chart, use_container_width=True)
     
     with chart_col2:
-        pa_df_chart = pa_df.copy()
-        pa_df_chart.loc[:, 'Datetime'] = pd.to_datetime(pa_df_chart['Date'])
-        pa_df_chart.loc[:, 'Year'] = pa_df_chart['Datetime'].dt.isocalendar().year
-        pa_df_chart.loc[:, 'Week'] = pa_df_chart['Datetime'].dt.isocalendar().week
-        pa_df_chart.loc[:, 'PA'] = pd.to_numeric(pa_df_chart['PA'], errors='coerce')
-        
-        weekly_pa = pa_df_chart.groupby(['Year', 'Week'])['PA'].mean().reset_index()
-        weekly_pa['Week_Label'] = weekly_pa['Year'].astype(str) + '-W' + weekly_pa['Week'].astype(str).str.zfill(2)
-        weekly_pa = weekly_pa.sort_values(['Year', 'Week'])
+        weekly_pa = calcs.weekly_pa(pa_days)
         
         min_pa = weekly_pa['PA'].min()
         top_y_label = 99.9
@@ -588,42 +490,31 @@ try:
 
      # Convert date format from timestamp to dd/mm/yy
     # Convert date format from timestamp to dd/mm/yy
-    df_display = df.copy()
-    pa_df_display = pa_df.copy()
+    df_display = df.drop(columns="site_key")
+    pa_df_display = pa_df.copy(deep=False)
     df_display.loc[:, 'Date'] = pd.to_datetime(df_display['Date']).dt.strftime('%Y-%m-%d')
     pa_df_display.loc[:, 'Date'] = pd.to_datetime(pa_df_display['Date']).dt.strftime('%d-%B-%Y')
 
     st.dataframe(df_display.sort_values(by=["Date", "Duration"], ascending=[False, False]))
     st.dataframe(pa_df_display[pa_df_display["PA"] != 100])
     
-    # Download buttons
-    st.subheader("Download CSV Files")
+    # Download buttons (files are only built when requested)
+    st.subheader("Download Data")
     col1, col2 = st.columns(2)
-    
+    export_state = (st.session_state["dataset_key"], zone, start_date, end_date, final_site_id)
 
-
-    
-    df_csv = df.to_csv(index=False)
-    pa_df_csv = pa_df.to_csv(index=False)
-    
     with col1:
-        st.download_button(
-            label="Download Outage DF",
-            data=df_csv,
-            file_name="outage_data.csv",
-            mime="text/csv",
-            icon="📥",
+        export.download_panel(
+            "Download Outage DF", "outage_data", export_state,
+            lambda df=df: df.drop(columns="site_key"), key="site_outages",
         )
-    
+
     with col2:
-        st.download_button(
-            label="Download PA DF",
-            data=pa_df_csv,
-            file_name="pa_data.csv",
-            mime="text/csv",
-            icon="📥",
+        export.download_panel(
+            "Download PA DF", "pa_data", export_state,
+            lambda pa_df=pa_df: pa_df, key="site_pa",
         )
 
 except IndexError:
     st.warning(f"Site ID '{final_site_id}' not found in DataFrame.")
-    pa_df = pa_df[pa_df["IHS Site ID"] == final_site_id]
\ No newline at end of file
+    pa_df = pa_df[pa_df["IHS Site ID"] == final_site_id]
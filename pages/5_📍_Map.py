@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import folium
 from streamlit_folium import st_folium
-from folium.plugins import MarkerCluster
 from datetime import datetime
 import numpy as np
 
+import calcs
+import export
+import site_map
+from helper_functions import apply_filters, filter_key
+
 # -------------------------------------------------
 # Page config (MUST be first)
 # -------------------------------------------------
@@ -50,11 +53,12 @@ else:
 # -------------------------------------------------
 # Data Check
 # -------------------------------------------------
-if "db_full" not in st.session_state:
+if "dataset_key" not in st.session_state:
     st.error("⚠️ Data not loaded. Please upload a file on the homepage first.")
     st.info("👉 Redirecting to homepage...")
     st.switch_page("🏠 Homepage.py")
 
+
 # -------------------------------------------------
 # Title
 # -------------------------------------------------
@@ -62,38 +66,15 @@ st.title("Sites Operational Dashboard")
 st.markdown("**Multi-Zone View** | Real-time site status & geospatial insights")
 
 # -------------------------------------------------
-# Cached Data Processing Function
+# Map Data
 # -------------------------------------------------
-@st.cache_data
-def process_db_data(db_full_data):
-    """Process and clean database - cached for performance"""
-    db_full = db_full_data.copy()
-    
-    # Check required columns
-    required_cols = [
-        "Zone", "IHS Site ID", "Tenant ID", "Tenant Name", "Site Address",
-        "Site Operational Status", "Region", "State", "EFS Name",
-        "RTO Name", "SBC", "Latitude", "Longitude", "Project"
-    ]
-    missing = [c for c in required_cols if c not in db_full.columns]
-    if missing:
-        return None, missing
-    
-    # Clean data
-    db_full = db_full[db_full["Project"].str.strip() != "GICL"].copy()
-    db_full["Latitude"] = pd.to_numeric(db_full["Latitude"], errors="coerce")
-    db_full["Longitude"] = pd.to_numeric(db_full["Longitude"], errors="coerce")
-    
-    for col in ["IHS Site ID", "Tenant ID", "Tenant Name", "Zone", "Region", "State"]:
-        if col in db_full.columns:
-            db_full[col] = db_full[col].astype(str).str.strip()
-    
-    db_full = db_full[~db_full["IHS Site ID"].isin(["", "nan", "None", "<NA>"])]
-    
-    return db_full, None
-
-# Process data with caching
-db_full, missing_cols = process_db_data(st.session_state["db_full"])
+# The cleaned sites, spatial grid, filter index, rollup and built maps live on
+# the shared Dataset (built on first use), so the registry counts them against
+# its memory limit and frees them with the dataset
+dataset_key = st.session_state["dataset_key"]
+dataset = calcs.get_dataset(dataset_key)
+site_data = dataset.map_data
+db_full, spatial_grid, missing_cols = site_data.db_full, site_data.spatial_grid, site_data.missing
 
 if db_full is None:
     st.error(f"Missing columns: {', '.join(missing_cols)}")
@@ -139,62 +120,36 @@ sel_rto = multiselect_filter("RTO Name", "RTO Name", "rto_filter")
 sel_sbc = multiselect_filter("SBC", "SBC", "sbc_filter")
 
 # -------------------------------------------------
-# Apply Filters (Cached)
+# Apply Filters (Indexed)
 # -------------------------------------------------
-@st.cache_data
-def apply_filters(df, zone, tenant, region, state, status, efs, rto, sbc):
-    """Apply all filters - cached for performance"""
-    filtered = df.copy()
-    
-    filter_dict = {
-        "Zone": zone,
-        "Tenant Name": tenant,
-        "Region": region,
-        "State": state,
-        "Site Operational Status": status,
-        "EFS Name": efs,
-        "RTO Name": rto,
-        "SBC": sbc,
-    }
-    
-    for col, vals in filter_dict.items():
-        if vals:
-            filtered = filtered[filtered[col].isin(vals)]
-    
-    return filtered
-
-filtered = apply_filters(
-    db_full, 
-    tuple(sel_zone), 
-    tuple(sel_tenant), 
-    tuple(sel_region), 
-    tuple(sel_state),
-    tuple(sel_status), 
-    tuple(sel_efs), 
-    tuple(sel_rto), 
-    tuple(sel_sbc)
-)
+FILTER_COLUMNS = {
+    "Zone": sel_zone,
+    "Tenant Name": sel_tenant,
+    "Region": sel_region,
+    "State": sel_state,
+    "Site Operational Status": sel_status,
+    "EFS Name": sel_efs,
+    "RTO Name": sel_rto,
+    "SBC": sel_sbc,
+}
+
+# Hashable filter state: cached builders and exports are keyed on
+# (dataset_key, filter_state), never on the filtered frames
+filter_state = filter_key(FILTER_COLUMNS)
+
+# Empty selections are skipped; the rest are intersected and materialised once
+filtered = apply_filters(db_full, FILTER_COLUMNS, index=site_data.filter_index)
 
 if filtered.empty:
     st.warning("No sites match the current filters.")
     st.stop()
 
 # -------------------------------------------------
-# KPI Calculations (Cached)
+# KPI Calculations (Rollup)
 # -------------------------------------------------
-@st.cache_data
-def calculate_kpis(df):
-    """Calculate KPIs - cached for performance"""
-    unique_sites = df.drop_duplicates("IHS Site ID")
-    total_sites = len(unique_sites)
-    
-    mtn_sites = len(df[df["Tenant Name"] == "MTN NG"])
-    airtel_sites = len(df[df["Tenant Name"] == "Airtel NG"])
-    operational_sites = len(unique_sites[unique_sites["Site Operational Status"] == "On Air"])
-    
-    return total_sites, mtn_sites, airtel_sites, operational_sites
+site_rollup = site_data.rollup
 
-total_sites, mtn_sites, airtel_sites, operational_sites = calculate_kpis(filtered)
+total_sites, mtn_sites, airtel_sites, operational_sites = site_rollup.kpis(FILTER_COLUMNS)
 
 # -------------------------------------------------
 # KPI Cards
@@ -205,6 +160,50 @@ with c2: st.metric("MTN Sites", f"{mtn_sites:,}", delta=f"{mtn_sites/total_sites
 with c3: st.metric("Airtel Sites", f"{airtel_sites:,}", delta=f"{airtel_sites/total_sites*100:.1f}%" if total_sites else "0%")
 with c4: st.metric("On Air Sites", f"{operational_sites:,}", delta=f"{operational_sites/total_sites*100:.1f}%" if total_sites else "0%")
 
+# -------------------------------------------------
+# Viewport Map
+# -------------------------------------------------
+# Selections with more sites than this open the map in viewport mode
+VIEWPORT_MIN_SITES = 2000
+
+@st.fragment
+def viewport_map(state, sites, tenants, zoom_start):
+    """
+    Map that only holds the sites inside the current view. Panning or zooming
+    reruns just this fragment: the visible sites are looked up in the spatial
+    grid and swapped in as a feature group, without reloading the map.
+    """
+    view = st.session_state.get("map_view")
+    if view is None or view[0] != state:
+        # First draw for this selection: the whole selection at the start zoom
+        visible, zoom = sites, zoom_start
+    else:
+        (south, west, north, east), zoom = view[1:]
+        in_view = spatial_grid.mask(south, west, north, east)[db_full.index.get_indexer(sites.index)]
+        visible = sites[in_view]
+
+    result = st_folium(
+        site_map.base_map(sites, zoom_start),
+        width=None,
+        height=600,
+        feature_group_to_add=site_map.viewport_layer(visible, tenants, zoom),
+        returned_objects=["bounds", "zoom"],
+        key="site_map_viewport"
+    )
+    st.caption(f"**{len(visible):,}** of {len(sites):,} site(s) in view")
+
+    bounds = (result or {}).get("bounds") or {}
+    south_west, north_east = bounds.get("_southWest") or {}, bounds.get("_northEast") or {}
+    if south_west.get("lat") is not None and north_east.get("lat") is not None:
+        new_view = (
+            state,
+            (south_west["lat"], south_west["lng"], north_east["lat"], north_east["lng"]),
+            result.get("zoom") or zoom,
+        )
+        if new_view != view:
+            st.session_state.map_view = new_view
+            st.rerun(scope="fragment")
+
 # -------------------------------------------------
 # Tabs
 # -------------------------------------------------
@@ -212,13 +211,10 @@ tab1, tab2, tab3 = st.tabs(["Site Analytics", "Geospatial View", "Zone Compariso
 
 # ---------- ANALYTICS TAB ----------
 with tab1:
-    unique_sites = filtered.drop_duplicates("IHS Site ID")
-    
     colA, colB = st.columns([2, 1])
     with colA:
         st.subheader("Site Status (Unique Sites)")
-        status_counts = unique_sites["Site Operational Status"].value_counts().reset_index()
-        status_counts.columns = ["Status", "Count"]
+        status_counts = site_rollup.status_counts(FILTER_COLUMNS)
         fig_pie = px.pie(
             status_counts, 
             values="Count", 
@@ -230,8 +226,7 @@ with tab1:
 
     with colB:
         st.subheader("Tenant Breakdown")
-        tenant_counts = filtered["Tenant Name"].value_counts().reset_index()
-        tenant_counts.columns = ["Tenant", "Records"]
+        tenant_counts = site_rollup.tenant_counts(FILTER_COLUMNS)
         fig_bar = px.bar(tenant_counts, x="Tenant", y="Records", text="Records")
         fig_bar.update_traces(textposition="outside")
         st.plotly_chart(fig_bar, use_container_width=True, key="tenant_bar")
@@ -246,30 +241,19 @@ with tab1:
     st.subheader("Download Filtered Tenant Data")
     
     col_d1, col_d2 = st.columns(2)
-    
-    with col_d1:
-        mtn_data = filtered[filtered["Tenant Name"] == "MTN NG"]
-        if not mtn_data.empty:
-            csv_mtn = mtn_data.to_csv(index=False)
-            st.download_button(
-                label="📥 Download MTN Sites (CSV)",
-                data=csv_mtn,
-                file_name=f"MTN_Sites_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv",
-                key="download_mtn"
-            )
-    
-    with col_d2:
-        airtel_data = filtered[filtered["Tenant Name"] == "Airtel NG"]
-        if not airtel_data.empty:
-            csv_airtel = airtel_data.to_csv(index=False)
-            st.download_button(
-                label="📥 Download Airtel Sites (CSV)",
-                data=csv_airtel,
-                file_name=f"Airtel_Sites_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv",
-                key="download_airtel"
-            )
+    # Files are only built when requested, once per filter selection and format
+    export_state = (dataset_key, filter_state)
+    stamp = datetime.now().strftime('%Y%m%d')
+
+    for col, tenant, name in [(col_d1, "MTN NG", "MTN"), (col_d2, "Airtel NG", "Airtel")]:
+        is_tenant = filtered["Tenant Name"] == tenant
+        if is_tenant.any():
+            with col:
+                export.download_panel(
+                    f"Download {name} Sites", f"{name}_Sites_{stamp}", export_state,
+                    lambda frame=filtered, is_tenant=is_tenant: frame[is_tenant],
+                    key=f"download_{name.lower()}",
+                )
 
 # ---------- MAP TAB ----------
 with tab2:
@@ -280,7 +264,6 @@ with tab2:
         filtered.dropna(subset=["Latitude", "Longitude"])
         .sort_values("IHS Site ID")
         .drop_duplicates("IHS Site ID")
-        .copy()
     )
     
     if map_data.empty:
@@ -310,14 +293,14 @@ with tab2:
         # Use the stored search term
         active_search = st.session_state.last_search_term
         
-        # Filter based on search
+        # Filter based on search: sites with a matching ID, address, tenant
+        # name or tenant ID (any of their tenants), best match first
         if active_search:
-            mask = (
-                map_data["IHS Site ID"].str.lower().str.contains(active_search, na=False) |
-                map_data["Site Address"].str.lower().str.contains(active_search, na=False) |
-                map_data["Tenant Name"].str.lower().str.contains(active_search, na=False)
-            )
-            display_data = map_data[mask].copy()
+            rows = dataset.search_index.search(active_search)
+            found = pd.Index(pd.unique(dataset.db_full["IHS Site ID"].iloc[rows].astype(str).str.strip()))
+            match_rank = found.get_indexer(map_data["IHS Site ID"])
+            display_data = map_data[match_rank >= 0]
+            display_data = display_data.iloc[np.argsort(match_rank[match_rank >= 0], kind="stable")]
             if display_data.empty:
                 st.info(f"No sites found for **'{active_search}'**")
                 display_data = map_data  
@@ -327,74 +310,38 @@ with tab2:
             display_data = map_data
             st.caption(f"Use search to find specific sites.")
         
-        # Create map - only if needed
-        @st.cache_data
-        def create_folium_map(df, center_lat, center_lon, zoom):
-            """Create folium map - cached"""
-            m = folium.Map(
-                location=[center_lat, center_lon],
-                zoom_start=zoom,
-                tiles="CartoDB positron"
-            )
-            return m
-        
-        # Center map
-        center_lat = display_data["Latitude"].mean()
-        center_lon = display_data["Longitude"].mean()
-        zoom_level = 10 if active_search else 8
-        
-        # Create base map (cached)
-        m = create_folium_map(display_data, center_lat, center_lon, zoom_level)
-        
-        # Add marker cluster
-        marker_cluster = MarkerCluster().add_to(m)
-        
-        status_color = {
-            "On Air": "green",
-            "Down": "red",
-            "Partial": "orange",
-            "Under Maintenance": "gray"
-        }
-        
-        # Add markers
-        for _, row in display_data.iterrows():
-            site_tenants = filtered[
-                filtered["IHS Site ID"] == row["IHS Site ID"]
-            ]["Tenant Name"].unique()
-            tenants_list = ", ".join(site_tenants)
-            
-            popup_html = f"""
-            <div style="font-size: 12px; width: 220px;">
-                <b>{row['IHS Site ID']}</b><br>
-                <b>Tenants:</b> {tenants_list}<br>
-                <b>Address:</b> {str(row['Site Address'])[:50]}...<br>
-                <b>Status:</b> <strong>{row['Site Operational Status']}</strong><br>
-                <a href="https://www.google.com/maps/dir/?api=1&destination={row['Latitude']},{row['Longitude']}"
-                    target="_blank" style="color:#1a73e8;">Get Directions</a>
-            </div>
-            """
-            
-            color = status_color.get(row["Site Operational Status"], "blue")
-            
-            folium.CircleMarker(
-                location=[row["Latitude"], row["Longitude"]],
-                radius=8,
-                color=color,
-                fill=True,
-                fill_color=color,
-                fill_opacity=0.7,
-                popup=folium.Popup(popup_html, max_width=300),
-                tooltip=f"{row['IHS Site ID']} | {tenants_list}"
-            ).add_to(marker_cluster)
-        
-        # CRITICAL: Use returned_objects=[] to prevent rerun
-        st_folium(
-            m, 
-            width=None,
-            height=600,
-            returned_objects=[],  # This prevents the map from triggering reruns
-            key="site_map_display"
+        # Large selections default to viewport mode: only the sites inside the
+        # visible bounds are sent, as clusters until zoomed in
+        viewport_mode = st.toggle(
+            "Only load sites in view",
+            value=len(display_data) > VIEWPORT_MIN_SITES,
+            key="map_viewport_mode",
         )
+
+        if viewport_mode:
+            viewport_map(
+                (dataset_key, filter_state, active_search), display_data,
+                site_map.site_tenants(filtered), 10 if active_search else 8,
+            )
+        else:
+            # Populated map, built once per dataset, filter selection and search.
+            # Reruns and tab switches reuse the same object, so the generated
+            # script is identical and the browser keeps the map it already has.
+            # Markers are built column-wise (tenants per site from one group-by)
+            # and rendered by the browser as a single clustered layer
+            m = site_data.site_map(
+                (filter_state, active_search), display_data,
+                site_map.site_tenants(filtered), 10 if active_search else 8,
+            )
+
+            # CRITICAL: Use returned_objects=[] to prevent rerun
+            st_folium(
+                m, 
+                width=None,
+                height=600,
+                returned_objects=[],  # This prevents the map from triggering reruns
+                key="site_map_display"
+            )
         
         # Show table below map for better UX
         st.subheader("Sites on Map")
@@ -408,17 +355,7 @@ with tab2:
 with tab3:
     st.subheader("Zone Comparison Dashboard")
     
-    zone_summary = (
-        db_full.drop_duplicates("IHS Site ID")
-        .groupby("Zone")
-        .agg(
-            Total_Sites=("IHS Site ID", "count"),
-            On_Air_Sites=("Site Operational Status", lambda x: (x == "On Air").sum()),
-            MTN_Sites=("Tenant Name", lambda x: (x == "MTN NG").sum()),
-            Airtel_Sites=("Tenant Name", lambda x: (x == "Airtel NG").sum())
-        )
-        .reset_index()
-    )
+    zone_summary = site_rollup.zone_summary()
     zone_summary["Operational %"] = (zone_summary["On_Air_Sites"] / zone_summary["Total_Sites"] * 100).round(1)
     st.dataframe(zone_summary, use_container_width=True)
     
@@ -434,4 +371,4 @@ with tab3:
 # Footer
 # -------------------------------------------------
 st.markdown("---")
-st.caption(f"Data refreshed: {datetime.now().strftime('%Y-%m-%d %H:%M')} • Built with Streamlit • @NozieMezie")
\ No newline at end of file
+st.caption(f"Data refreshed: {datetime.now().strftime('%Y-%m-%d %H:%M')} • Built with Streamlit • @NozieMezie")
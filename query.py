@@ -0,0 +1,107 @@
+# query.py
+import numpy as np
+import pandas as pd
+
+from helper_functions import filter_key, filter_mask
+
+
+class Query:
+    """
+    Deferred filter/aggregate pipeline over a registry Dataset.
+
+    Pages compose a query with between() (date range), where() (site
+    filters, same value rules as helper_functions.apply_filters) and
+    select() (outage columns), and nothing is read until a result is asked
+    for. Then:
+    - site filters are resolved once on the site dimension through its
+      FilterIndex, and the facts are selected by site key;
+    - the date range is pushed down to the month partitions, the PA store and
+      the aggregate engine, so rows outside it are never read;
+    - only the selected outage columns (plus the keys needed to filter) are
+      read from the partitions;
+    - KPI inputs come from the aggregate engine (the cube, or DuckDB), so
+      they never touch outage rows.
+
+    Queries are immutable; every builder call returns a new one.
+    """
+
+    def __init__(self, dataset, start=None, end=None, filters=None, columns=None):
+        self.dataset = dataset
+        self.start = start
+        self.end = end
+        self.filters = dict(filters or {})
+        self.columns = columns
+        self._site_rows = None
+
+    @property
+    def key(self):
+        """Hashable handle of the query: dataset content hash, date range, filter key and columns."""
+        columns = None if self.columns is None else tuple(self.columns)
+        return (self.dataset.key, self.start, self.end, filter_key(self.filters), columns)
+
+    def _replace(self, **changes):
+        params = dict(start=self.start, end=self.end, filters=self.filters, columns=self.columns)
+        params.update(changes)
+        return Query(self.dataset, **params)
+
+    # ---- Builders ----
+    def between(self, start, end):
+        return self._replace(start=pd.Timestamp(start), end=pd.Timestamp(end))
+
+    def where(self, col, value):
+        return self._replace(filters={**self.filters, col: value})
+
+    def select(self, columns):
+        return self._replace(columns=list(columns))
+
+    # ---- Sites ----
+    def site_rows(self):
+        """Bitmap over the site dimension of the sites matching the filters."""
+        if self._site_rows is None:
+            self._site_rows = filter_mask(self.dataset.db, self.filters, self.dataset.site_index)
+        return self._site_rows
+
+    def site_keys(self):
+        return self.dataset.db.index.to_numpy()[self.site_rows()]
+
+    def sites(self):
+        """Matching rows of the site dimension (db)."""
+        return self.dataset.db[self.site_rows()]
+
+    def options(self, col):
+        """Sorted values of `col` among matching sites with an outage in the date range."""
+        db = self.dataset.db
+        rows = self.site_rows() & self.dataset.engine.active_sites(self.start, self.end)
+        return db.loc[rows, col].dropna().sort_values().unique().tolist()
+
+    # ---- Facts ----
+    def outages(self):
+        """Outage rows of the matching sites in the date range, projected to the selected columns."""
+        columns = None
+        if self.columns is not None:
+            columns = list(dict.fromkeys([*self.columns, "Date", "site_key"]))
+        outages = self.dataset.outages(self.start, self.end, columns)
+
+        keep = np.isin(outages["site_key"].to_numpy(), self.site_keys())
+        outages = outages[keep]
+        if self.columns is not None:
+            outages = outages[self.columns]
+        return outages
+
+    def pa(self):
+        """Long PA rows (site, date, PA) of the matching sites in the date range, with site attributes."""
+        store = self.dataset.pa_store
+        if self.start is not None:
+            store = store.slice_dates(self.start, self.end)
+        pa_df = store.slice_sites(self.sites()["IHS Site ID"]).to_long()
+        return pd.merge(pa_df, self.dataset.db, on="IHS Site ID", how="left")
+
+    # ---- Aggregates ----
+    def outage_days(self):
+        return self.dataset.engine.outage_days(self.site_keys(), self.start, self.end)
+
+    def outage_by_site(self):
+        return self.dataset.engine.outage_by_site(self.site_keys(), self.start, self.end)
+
+    def pa_days(self):
+        return self.dataset.engine.pa_days(self.site_keys(), self.start, self.end)
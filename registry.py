@@ -0,0 +1,198 @@
+# registry.py
+import os
+import threading
+from collections import OrderedDict
+
+import duckdb_backend
+from cube import AggregateCube
+from helper_functions import FilterIndex
+from search import SiteSearchIndex
+from site_map import MapData
+from site_tenants import SiteTenantIndex
+
+# Loaded datasets are evicted (least recently used first) once together they
+# take more than this much memory
+REGISTRY_MAX_BYTES = int(os.environ.get("PA_REGISTRY_MAX_MB", "2048")) * 2**20
+
+
+class Dataset:
+    """
+    One loaded dataset with everything the pages derive from it.
+
+    Instances are shared by all sessions viewing the same snapshot and must be
+    treated as read-only (pandas copy-on-write keeps page-level edits local).
+    """
+
+    # Date ranges whose outage rows are kept loaded
+    OUTAGE_RANGES = 4
+
+    def __init__(self, key, pa_store, db, db_full, site_days, outage_dates, load_outages):
+        self.key = key
+        self.pa_store = pa_store
+        self.db = db
+        self.db_full = db_full
+        self._load_outages = load_outages
+        self._outages = OrderedDict()
+        self._outage_bytes = {}
+        self._lock = threading.Lock()
+        # Called (by the registry) whenever the cached outage ranges, the
+        # search index or the Map page data change the dataset's size
+        self.on_resize = None
+
+        # Sheet Year/Week/Month of every outage date, for the "latest week" headers
+        self.outage_dates = outage_dates
+
+        # What KPI/chart queries run on: DuckDB when enabled, the in-memory cube
+        # otherwise (only one is built). Both start from the per-day aggregates
+        # saved with the snapshot, so no outage rows are read until a page
+        # asks for a date range.
+        if duckdb_backend.available():
+            self.engine = duckdb_backend.DuckEngine(key, site_days, outage_dates, pa_store, db)
+        else:
+            self.engine = AggregateCube(site_days, outage_dates, pa_store, db)
+
+        # Row index for the sidebar filters
+        self.site_index = FilterIndex(db, ["Zone", "Region", "State", "RTO Name", "EFS Name", "SBC"])
+        # IHS Site ID <-> tenant_and_id, for the Site Info selectboxes
+        self.site_tenants = SiteTenantIndex(db_full)
+        self._search_index = None
+        self._map_data = None
+
+        self._base_nbytes = (
+            sum(int(df.memory_usage(deep=True).sum()) for df in [outage_dates, db, db_full])
+            + pa_store.nbytes
+            + self.engine.nbytes
+            + self.site_index.nbytes
+        )
+
+    @property
+    def search_index(self):
+        """Text search over the db_full rows (Map search, Site Info typeahead), built on first use."""
+        with self._lock:
+            built = self._search_index is None
+            if built:
+                self._search_index = SiteSearchIndex(self.db_full)
+            search_index = self._search_index
+        if built:
+            self._resized()
+        return search_index
+
+    @property
+    def map_data(self):
+        """The Map page's cleaned sites, spatial grid, filter index, rollup and maps, built on first use."""
+        with self._lock:
+            built = self._map_data is None
+            if built:
+                self._map_data = MapData(self.db_full, on_resize=self._resized)
+            map_data = self._map_data
+        if built:
+            self._resized()
+        return map_data
+
+    def outages(self, start, end, columns=None):
+        """
+        Outage rows with start <= Date <= end, read from the partitions the range touches.
+
+        `columns` limits the columns read (it must include "Date").
+        """
+        range_key = (start, end, None if columns is None else tuple(columns))
+        with self._lock:
+            if range_key in self._outages:
+                self._outages.move_to_end(range_key)
+                return self._outages[range_key]
+
+        outages = self._load_outages(start, end, columns)
+        size = int(outages.memory_usage(deep=True).sum())
+        with self._lock:
+            self._outages[range_key] = outages
+            self._outage_bytes[range_key] = size
+            while len(self._outages) > self.OUTAGE_RANGES:
+                dropped, _ = self._outages.popitem(last=False)
+                del self._outage_bytes[dropped]
+        self._resized()
+        return outages
+
+    @property
+    def nbytes(self):
+        """Memory held by the dataset, including what its pages have built and cached on it."""
+        with self._lock:
+            cached = sum(self._outage_bytes.values())
+            if self._search_index is not None:
+                cached += self._search_index.nbytes
+            map_data = self._map_data
+        if map_data is not None:
+            cached += map_data.nbytes
+        return self._base_nbytes + cached
+
+    def _resized(self):
+        on_resize = self.on_resize
+        if on_resize is not None:
+            on_resize()
+
+
+class DatasetRegistry:
+    """
+    Process-wide cache of loaded datasets keyed by content hash.
+
+    Sessions ask for a dataset on every script run and keep it only for that
+    run, so the registry holds the datasets themselves. Once their total size
+    goes over max_bytes, the least recently used ones are evicted (never the
+    most recent one). Sizes are re-measured whenever a dataset's outage-range
+    cache or search index grows, not only at load.
+    """
+
+    def __init__(self, max_bytes=REGISTRY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._datasets = OrderedDict()  # key -> Dataset, least recently used first
+        self._loading = {}  # key -> Lock, so a dataset is only loaded once
+
+    def get(self, key, loader):
+        """Returns the dataset `key`, loading it with loader(key) if needed."""
+        with self._lock:
+            dataset = self._touch(key)
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        if dataset is not None:
+            return dataset
+
+        with load_lock:
+            with self._lock:
+                dataset = self._touch(key)
+            if dataset is None:
+                dataset = loader(key)
+                dataset.on_resize = self._resized
+                with self._lock:
+                    self._datasets[key] = dataset
+                    self._evict()
+                    self._loading.pop(key, None)
+        return dataset
+
+    @property
+    def nbytes(self):
+        return sum(dataset.nbytes for dataset in list(self._datasets.values()))
+
+    def stats(self):
+        """(key, MB) per loaded dataset, least recently used first."""
+        with self._lock:
+            return [(key, dataset.nbytes / 2**20) for key, dataset in self._datasets.items()]
+
+    def _resized(self):
+        with self._lock:
+            self._evict()
+
+    def _touch(self, key):
+        dataset = self._datasets.get(key)
+        if dataset is not None:
+            self._datasets.move_to_end(key)
+        return dataset
+
+    def _evict(self):
+        # Pages still running on an evicted dataset keep their own reference;
+        # their next run loads it again
+        while len(self._datasets) > 1 and self.nbytes > self.max_bytes:
+            _, dataset = self._datasets.popitem(last=False)
+            dataset.on_resize = None
+
+        if self.nbytes > self.max_bytes:
+            print(f"Warning: {self.nbytes / 2**20:.0f} MB of datasets in use, above the "
+                  f"{self.max_bytes / 2**20:.0f} MB registry limit")
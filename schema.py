@@ -0,0 +1,99 @@
+# schema.py
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Column types of the cleaned tables, enforced before a snapshot is saved.
+# Columns a sheet does not have are skipped; columns not listed keep their type.
+
+# Arrow-backed strings for IDs and free text; missing values stay NaN, so
+# comparisons and isin still return plain numpy bools
+ID = pd.StringDtype("pyarrow", na_value=np.nan)
+# Low-cardinality dimensions
+CATEGORY = "category"
+# Smallest integer type that holds the values (float32 if some are missing)
+INT = "int"
+
+SITE_ATTRIBUTES = {
+    "Tenants On Site": CATEGORY,
+    "IHS Site Priority": CATEGORY,
+    "Zone": CATEGORY,
+    "Region": CATEGORY,
+    "State": CATEGORY,
+    "EFS Name": CATEGORY,
+    "RTO Name": CATEGORY,
+    "Head, Field Service": CATEGORY,
+    "SBC": CATEGORY,
+}
+
+OUTAGES = {
+    "IHS Site ID": ID,
+    "Outage Count": INT,
+    "Root Cause Type": CATEGORY,
+    "Root Cause Analysis": ID,
+    "Quarter": CATEGORY,
+    "Year": INT,
+    "Month": CATEGORY,
+    "Day of Week": INT,
+    "Week": INT,
+    "Day": INT,
+    "site_key": "int32",
+    **SITE_ATTRIBUTES,
+}
+
+SITES = {
+    "IHS Site ID": ID,
+    **SITE_ATTRIBUTES,
+}
+
+TENANTS = {
+    "IHS Site ID": ID,
+    **SITE_ATTRIBUTES,
+    "Tenant Name": CATEGORY,
+    "Tenant ID": ID,
+    "Site Address": ID,
+    "Site Operational Status": CATEGORY,
+    "Project": CATEGORY,
+    "tenant_and_id": ID,
+}
+
+TABLES = {"df_init": OUTAGES, "db": SITES, "db_full": TENANTS}
+
+
+def _smallest_int(values):
+    if values.isna().any():
+        return values.astype("float32")
+    return pd.to_numeric(values, downcast="integer")
+
+
+def enforce(df, schema):
+    """
+    Returns df with its columns cast to the types declared in schema.
+
+    A column that cannot be cast keeps its type, with a UserWarning.
+    """
+    columns = {}
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        try:
+            if dtype == INT:
+                columns[col] = _smallest_int(pd.to_numeric(df[col]))
+            else:
+                columns[col] = df[col].astype(dtype)
+        except (TypeError, ValueError) as e:
+            warnings.warn(f"keeping column '{col}' as {df[col].dtype}: {e}", stacklevel=2)
+    return df.assign(**columns)
+
+
+def memory_report(frames):
+    """Rows, columns and resident size (deep) of each DataFrame in frames."""
+    return pd.DataFrame(
+        [
+            (name, len(df), len(df.columns), df.memory_usage(deep=True).sum() / 2**20)
+            for name, df in frames.items()
+            if isinstance(df, pd.DataFrame)
+        ],
+        columns=["Table", "Rows", "Columns", "MB"],
+    ).round({"MB": 2})
@@ -0,0 +1,174 @@
+# search.py
+import difflib
+import re
+import sys
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+SEARCH_COLUMNS = ["IHS Site ID", "Site Address", "Tenant Name", "Tenant ID"]
+
+# Rank of a match, best first
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+# Fuzzy matching (only used when nothing contains the query): words within
+# this edit similarity (difflib ratio) of a query word count as a match; only
+# the words sharing the most trigrams with it are compared
+MIN_SIMILARITY = 0.75
+FUZZY_CANDIDATES = 50
+
+_EMPTY = np.empty(0, dtype="int64")
+
+
+def normalize(text):
+    """Lowercase with runs of whitespace collapsed to one space."""
+    return re.sub(r"\s+", " ", str(text).lower()).strip()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _postings(items, grams_of):
+    """Trigram -> ids of the items containing it."""
+    postings = defaultdict(list)
+    for item_id, item in enumerate(items):
+        for gram in grams_of(item):
+            postings[gram].append(item_id)
+    return {gram: np.array(ids, dtype="int64") for gram, ids in postings.items()}
+
+
+def _group(ids, items, n):
+    """items grouped by ids as (sorted items, offsets): group i is items[offsets[i]:offsets[i + 1]]."""
+    order = np.argsort(ids, kind="stable")
+    return items[order], np.concatenate([[0], np.cumsum(np.bincount(ids, minlength=n))])
+
+
+def _shared(postings, grams, n):
+    """Number of grams each of the n items shares with `grams`."""
+    lists = [postings.get(gram, _EMPTY) for gram in grams]
+    return np.bincount(np.concatenate(lists) if lists else _EMPTY, minlength=n)
+
+
+class SiteSearchIndex:
+    """
+    Ranked text search over the rows of a frame (e.g. db_full).
+
+    Every distinct normalised value of the indexed columns is stored once,
+    with the rows it occurs in and the postings of its character trigrams.
+    Values holding all of the query's trigrams are the substring candidates
+    (confirmed with `in`), so a query never scans the rows; queries shorter
+    than a trigram scan the distinct values instead. Matches rank exact <
+    prefix < word prefix < substring, then shorter values first.
+
+    When nothing contains the query, values with a close word (typo) for
+    every query word are returned as fuzzy matches, found through trigram
+    postings over the distinct words.
+    """
+
+    def __init__(self, df, columns=SEARCH_COLUMNS):
+        columns = [col for col in columns if col in df.columns]
+        values, rows = [], []
+        for col in columns:
+            present = df[col].notna().to_numpy()
+            text = df[col][present].astype(str).str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+            values.append(text.to_numpy(dtype=object))
+            rows.append(np.flatnonzero(present))
+        values = np.concatenate(values) if values else np.empty(0, dtype=object)
+        rows = np.concatenate(rows) if rows else _EMPTY
+
+        # Distinct values and the rows of each
+        value_ids, self.values = pd.factorize(values)
+        self.value_rows, self.value_offsets = _group(value_ids, rows, len(self.values))
+        self.postings = _postings(self.values, trigrams)
+
+        # Distinct words and the values containing each, for fuzzy matches
+        word_ids, word_values = [], []
+        words = {}
+        for value_id, value in enumerate(self.values):
+            for word in set(re.findall(r"\w+", value)):
+                word_ids.append(words.setdefault(word, len(words)))
+                word_values.append(value_id)
+        self.words = np.array(list(words), dtype=object)
+        self.word_values, self.word_offsets = _group(
+            np.array(word_ids, dtype="int64"), np.array(word_values, dtype="int64"), len(self.words)
+        )
+        # Padded, so short words and first letters still share trigrams
+        self.word_postings = _postings(self.words, lambda word: trigrams(f"  {word} "))
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index: its arrays, postings and distinct strings."""
+        arrays = [
+            self.value_rows, self.value_offsets, self.word_values, self.word_offsets,
+            *self.postings.values(), *self.word_postings.values(),
+        ]
+        strings = [*self.values, *self.words]
+        return sum(array.nbytes for array in arrays) + sum(sys.getsizeof(text) for text in strings)
+
+    @staticmethod
+    def _ranker(query):
+        word_start = re.compile(r"\b" + re.escape(query))
+
+        def rank(value):
+            if value == query:
+                return EXACT
+            if value.startswith(query):
+                return PREFIX
+            if word_start.search(value):
+                return WORD_PREFIX
+            return SUBSTRING
+        return rank
+
+    def _close_words(self, word):
+        """(word id, similarity) of the indexed words close to `word`."""
+        shared = _shared(self.word_postings, trigrams(f"  {word} "), len(self.words))
+        candidates = np.flatnonzero(shared)
+        candidates = candidates[np.argsort(-shared[candidates], kind="stable")[:FUZZY_CANDIDATES]]
+        for word_id in candidates:
+            similarity = difflib.SequenceMatcher(None, word, self.words[word_id]).ratio()
+            if similarity >= MIN_SIMILARITY:
+                yield word_id, similarity
+
+    def _fuzzy(self, query):
+        # value id -> lowest (over the query words) best word similarity
+        scores = None
+        for word in re.findall(r"\w+", query):
+            best = {}
+            for word_id, similarity in self._close_words(word):
+                for value_id in self.word_values[self.word_offsets[word_id]:self.word_offsets[word_id + 1]]:
+                    best[value_id] = max(best.get(value_id, 0), similarity)
+            scores = best if scores is None else {v: min(s, best[v]) for v, s in scores.items() if v in best}
+        return [(FUZZY, -similarity, len(self.values[v]), v) for v, similarity in (scores or {}).items()]
+
+    def matches(self, query, fuzzy=True):
+        """Ids of the values matching query, best first."""
+        query = normalize(query)
+        if not query:
+            return []
+
+        grams = trigrams(query)
+        if grams:
+            candidates = np.flatnonzero(_shared(self.postings, grams, len(self.values)) == len(grams))
+        else:
+            candidates = range(len(self.values))
+        rank = self._ranker(query)
+        values = self.values
+        # (rank, -similarity, length, value id), so sorting puts the best first
+        found = [(rank(values[i]), -1.0, len(values[i]), i) for i in candidates if query in values[i]]
+        if not found and fuzzy:
+            found = self._fuzzy(query)
+
+        found.sort()
+        return [value_id for _, _, _, value_id in found]
+
+    def search(self, query, limit=None, fuzzy=True):
+        """Positions of the rows matching query, best match first (each row once)."""
+        matches = self.matches(query, fuzzy=fuzzy)
+        if not matches:
+            return _EMPTY
+        rows = pd.unique(np.concatenate([
+            self.value_rows[self.value_offsets[i]:self.value_offsets[i + 1]] for i in matches
+        ]))
+        return rows if limit is None else rows[:limit]
@@ -0,0 +1,285 @@
+# site_map.py
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+import folium
+import numpy as np
+import pandas as pd
+from folium.plugins import FastMarkerCluster
+
+from helper_functions import FilterIndex
+from site_rollup import SiteRollup
+
+# db_full columns the Map page needs
+REQUIRED_COLUMNS = [
+    "Zone", "IHS Site ID", "Tenant ID", "Tenant Name", "Site Address",
+    "Site Operational Status", "Region", "State", "EFS Name",
+    "RTO Name", "SBC", "Latitude", "Longitude", "Project"
+]
+
+# Columns of the Map page's sidebar filters
+FILTER_COLUMNS = ["Zone", "Tenant Name", "Region", "State", "Site Operational Status", "EFS Name", "RTO Name", "SBC"]
+
+# Populated maps kept per dataset (one per filter selection and search)
+MAP_CACHE = 16
+
+STATUS_COLOR = {
+    "On Air": "green",
+    "Down": "red",
+    "Partial": "orange",
+    "Under Maintenance": "gray"
+}
+
+# Viewport mode: individual markers are only sent from this zoom level on,
+# and only when the view holds at most this many sites (clusters otherwise)
+MARKER_MIN_ZOOM = 10
+MAX_VIEWPORT_MARKERS = 1000
+CLUSTER_GRID = 16
+
+# Builds one circle marker in the browser from a compact marker_rows() row:
+# [lat, lon, site id, tenants, address, status]. Popup and tooltip HTML are
+# assembled here, so it is not repeated for every site in the page payload.
+MARKER_CALLBACK = """
+var statusColor = %s;
+var callback = function (row) {
+    var color = statusColor[row[5]] || "blue";
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 8, color: color, fill: true, fillColor: color, fillOpacity: 0.7
+    });
+    marker.bindPopup(
+        '<div style="font-size: 12px; width: 220px;">'
+        + '<b>' + row[2] + '</b><br>'
+        + '<b>Tenants:</b> ' + row[3] + '<br>'
+        + '<b>Address:</b> ' + row[4] + '...<br>'
+        + '<b>Status:</b> <strong>' + row[5] + '</strong><br>'
+        + '<a href="https://www.google.com/maps/dir/?api=1&destination=' + row[0] + ',' + row[1] + '"'
+        + ' target="_blank" style="color:#1a73e8;">Get Directions</a>'
+        + '</div>',
+        {maxWidth: 300}
+    );
+    marker.bindTooltip(row[2] + ' | ' + row[3]);
+    return marker;
+};
+""" % json.dumps(STATUS_COLOR)
+
+
+def site_tenants(tenants):
+    """Comma-separated tenant names of every IHS Site ID (in order of first appearance)."""
+    pairs = tenants[["IHS Site ID", "Tenant Name"]].dropna().drop_duplicates()
+    return pairs.groupby("IHS Site ID", sort=False, observed=True)["Tenant Name"].agg(", ".join)
+
+
+def marker_rows(sites, tenants):
+    """
+    [lat, lon, site id, tenants, address, status] of every site, built column-wise.
+
+    `sites` has one row per site; `tenants` maps IHS Site ID to its tenant
+    names (site_tenants).
+    """
+    site_id = sites["IHS Site ID"].astype(str)
+    return [
+        list(row)
+        for row in zip(
+            sites["Latitude"].tolist(),
+            sites["Longitude"].tolist(),
+            site_id.tolist(),
+            site_id.map(tenants).fillna("").tolist(),
+            sites["Site Address"].astype(str).str[:50].tolist(),
+            sites["Site Operational Status"].astype(str).tolist(),
+        )
+    ]
+
+
+def add_markers(m, sites, tenants):
+    """Adds every site to map m as one clustered layer rendered in the browser."""
+    return FastMarkerCluster(marker_rows(sites, tenants), callback=MARKER_CALLBACK).add_to(m)
+
+
+def base_map(sites, zoom):
+    """Empty map centred on `sites`."""
+    return folium.Map(
+        location=[sites["Latitude"].mean(), sites["Longitude"].mean()],
+        zoom_start=zoom,
+        tiles="CartoDB positron"
+    )
+
+
+def build_map(sites, tenants, zoom):
+    """Map centred on `sites` with all of them as markers."""
+    m = base_map(sites, zoom)
+    add_markers(m, sites, tenants)
+    return m
+
+
+class SpatialGrid:
+    """
+    Uniform latitude/longitude grid over site coordinates, for viewport queries.
+
+    Rows with coordinates are bucketed into square cells of cell_deg degrees
+    and kept sorted by cell id (row-major over the grid), so the cells of one
+    grid row that overlap a bounding box are one contiguous slice, found with
+    searchsorted. A box query therefore only touches the rows of the cells it
+    overlaps, whatever the size of the estate.
+    """
+
+    def __init__(self, lat, lon, cell_deg=0.1):
+        self.cell_deg = cell_deg
+        self.lat = np.asarray(lat, dtype="float64")
+        self.lon = np.asarray(lon, dtype="float64")
+
+        rows = np.flatnonzero(~(np.isnan(self.lat) | np.isnan(self.lon)))
+        y = np.floor(self.lat[rows] / cell_deg).astype("int64")
+        x = np.floor(self.lon[rows] / cell_deg).astype("int64")
+        self.y0 = y.min() if len(rows) else 0
+        self.x0 = x.min() if len(rows) else 0
+        self.height = (y.max() - self.y0 + 1) if len(rows) else 0
+        self.width = (x.max() - self.x0 + 1) if len(rows) else 0
+
+        cells = (y - self.y0) * self.width + (x - self.x0)
+        order = np.argsort(cells, kind="stable")
+        self.rows = rows[order]
+        self.cells = cells[order]
+
+    @property
+    def nbytes(self):
+        return self.lat.nbytes + self.lon.nbytes + self.rows.nbytes + self.cells.nbytes
+
+    def rows_in(self, south, west, north, east):
+        """Sorted positions of the rows with south <= lat <= north and west <= lon <= east."""
+        if not len(self.rows):
+            return self.rows
+        y_lo = max(int(np.floor(south / self.cell_deg)) - self.y0, 0)
+        y_hi = min(int(np.floor(north / self.cell_deg)) - self.y0, self.height - 1)
+        x_lo = max(int(np.floor(west / self.cell_deg)) - self.x0, 0)
+        x_hi = min(int(np.floor(east / self.cell_deg)) - self.x0, self.width - 1)
+        if y_lo > y_hi or x_lo > x_hi:
+            return self.rows[:0]
+
+        starts = np.arange(y_lo, y_hi + 1) * self.width
+        lo = np.searchsorted(self.cells, starts + x_lo, side="left")
+        hi = np.searchsorted(self.cells, starts + x_hi, side="right")
+        rows = np.concatenate([self.rows[a:b] for a, b in zip(lo, hi)])
+
+        lat, lon = self.lat[rows], self.lon[rows]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(rows[inside])
+
+    def mask(self, south, west, north, east):
+        """rows_in() as a boolean mask over all rows."""
+        mask = np.zeros(len(self.lat), dtype=bool)
+        mask[self.rows_in(south, west, north, east)] = True
+        return mask
+
+
+def cluster_sites(sites, cell_deg):
+    """Site count and mean position per cell_deg x cell_deg cell (server-side clusters)."""
+    cell_lat = np.floor(sites["Latitude"].to_numpy() / cell_deg)
+    cell_lon = np.floor(sites["Longitude"].to_numpy() / cell_deg)
+    return (
+        sites.groupby([cell_lat, cell_lon], sort=False)
+        .agg(Latitude=("Latitude", "mean"), Longitude=("Longitude", "mean"), Sites=("IHS Site ID", "size"))
+        .reset_index(drop=True)
+    )
+
+
+def viewport_layer(sites, tenants, zoom):
+    """
+    FeatureGroup with what the current view shows of `sites` (already limited
+    to the visible bounds): markers when zoomed in far enough and there are at
+    most MAX_VIEWPORT_MARKERS of them, otherwise one circle per grid cell
+    (sized to the spread of the sites) labelled with its site count.
+    """
+    layer = folium.FeatureGroup(name="Sites")
+    if zoom >= MARKER_MIN_ZOOM and len(sites) <= MAX_VIEWPORT_MARKERS:
+        FastMarkerCluster(marker_rows(sites, tenants), callback=MARKER_CALLBACK).add_to(layer)
+        return layer
+
+    # At most CLUSTER_GRID x CLUSTER_GRID cells over the shown sites
+    span = max(np.ptp(sites["Latitude"].to_numpy()), np.ptp(sites["Longitude"].to_numpy())) if len(sites) else 0
+    for cluster in cluster_sites(sites, max(span, 1e-6) / CLUSTER_GRID).itertuples(index=False):
+        folium.CircleMarker(
+            location=[cluster.Latitude, cluster.Longitude],
+            radius=6 + 3 * np.log10(cluster.Sites),
+            color="#1a73e8",
+            fill=True,
+            fill_opacity=0.6,
+            tooltip=f"{cluster.Sites:,} site(s) - zoom in for details",
+        ).add_to(layer)
+    return layer
+
+
+def clean_sites(db_full):
+    """Map page rows of db_full: GICL sites dropped, coordinates numeric, IDs and names stripped."""
+    # Copy-on-write: the column assignments below never touch the shared frame
+    db_full = db_full[db_full["Project"].str.strip() != "GICL"]
+    db_full["Latitude"] = pd.to_numeric(db_full["Latitude"], errors="coerce")
+    db_full["Longitude"] = pd.to_numeric(db_full["Longitude"], errors="coerce")
+
+    for col in ["IHS Site ID", "Tenant ID", "Tenant Name", "Zone", "Region", "State"]:
+        db_full[col] = db_full[col].astype(str).str.strip()
+
+    return db_full[~db_full["IHS Site ID"].isin(["", "nan", "None", "<NA>"])]
+
+
+class MapData:
+    """
+    What the Map page derives from a dataset's db_full, built once per dataset
+    (on first use, see registry.Dataset.map_data) and shared by all sessions.
+
+    - db_full: the cleaned rows (clean_sites), or None when db_full lacks some
+      of REQUIRED_COLUMNS (listed in `missing`).
+    - spatial_grid, filter_index and rollup over those rows.
+    - The last MAP_CACHE populated maps (site_map), so reruns and tab switches
+      reuse the same map object.
+
+    `on_resize` is called whenever a map is cached or dropped, so the dataset
+    registry can re-check its memory limit.
+    """
+
+    def __init__(self, db_full, on_resize=None):
+        self.missing = [col for col in REQUIRED_COLUMNS if col not in db_full.columns]
+        self.db_full = self.spatial_grid = self.filter_index = self.rollup = None
+        self.on_resize = on_resize
+        self._maps = OrderedDict()  # key -> (map, approximate bytes)
+        self._lock = threading.Lock()
+        self._base_nbytes = 0
+        if self.missing:
+            return
+
+        self.db_full = clean_sites(db_full)
+        # Spatial index over the row positions, for the map's viewport mode
+        self.spatial_grid = SpatialGrid(self.db_full["Latitude"], self.db_full["Longitude"])
+        # Per-value row indexes for the sidebar filters
+        self.filter_index = FilterIndex(self.db_full, FILTER_COLUMNS)
+        # Site and tenant counts per filter cell, for the KPI cards and charts
+        self.rollup = SiteRollup(self.db_full)
+        self._base_nbytes = (
+            int(self.db_full.memory_usage(deep=True).sum())
+            + self.spatial_grid.nbytes + self.filter_index.nbytes + self.rollup.nbytes
+        )
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return self._base_nbytes + sum(size for _, size in self._maps.values())
+
+    def site_map(self, key, sites, tenants, zoom):
+        """build_map(sites, tenants, zoom), cached under `key` (e.g. filter key and search)."""
+        with self._lock:
+            if key in self._maps:
+                self._maps.move_to_end(key)
+                return self._maps[key][0]
+
+        m = base_map(sites, zoom)
+        markers = add_markers(m, sites, tenants)
+        # The marker rows are what the map holds per site
+        size = sum(sys.getsizeof(value) for row in markers.data for value in row)
+        with self._lock:
+            self._maps[key] = (m, size)
+            while len(self._maps) > MAP_CACHE:
+                self._maps.popitem(last=False)
+        if self.on_resize is not None:
+            self.on_resize()
+        return m
@@ -0,0 +1,119 @@
+# site_rollup.py
+import numpy as np
+import pandas as pd
+
+# Site attributes the Map page filters and groups on (one value per site)
+DIMENSIONS = ["Zone", "Region", "State", "Site Operational Status", "EFS Name", "RTO Name", "SBC"]
+
+
+class SiteRollup:
+    """
+    Site and tenant counts of the Map page's cleaned db_full, built once per dataset.
+
+    - tenant_rows: tenant rows per DIMENSIONS x Tenant Name cell.
+    - sites: sites per DIMENSIONS x tenant set cell, for the sites whose
+      tenant rows all agree on DIMENSIONS. The tenant set is a bitmask over
+      `tenants`, so a tenant filter keeps the sites having any selected tenant.
+    - mixed_rows: the distinct tenant rows of the other sites (e.g. one tenant
+      row On Air and another Off Air). Under a filter each of these sites
+      counts once, with the attributes of its first matching row.
+
+    Together they give what a row filter followed by
+    drop_duplicates("IHS Site ID") gave. The sidebar filters select cells,
+    and the KPI cards, status pie and tenant bar are sums over the selected
+    cells (a few hundred rows at most), never scans of the tenant rows.
+    """
+
+    def __init__(self, db_full):
+        self.tenant_rows = (
+            db_full.groupby(DIMENSIONS + ["Tenant Name"], observed=True, dropna=False, sort=False)
+            .size().rename("Rows").reset_index()
+        )
+
+        site_ids = db_full["IHS Site ID"]
+        distinct = db_full.drop_duplicates(["IHS Site ID"] + DIMENSIONS)["IHS Site ID"]
+        mixed = site_ids.isin(distinct[distinct.duplicated()])
+        self.mixed_rows = db_full.loc[mixed, ["IHS Site ID", *DIMENSIONS, "Tenant Name"]].drop_duplicates()
+
+        constant = db_full[~mixed]
+        first = constant.drop_duplicates("IHS Site ID")
+        presence = pd.crosstab(constant["IHS Site ID"], constant["Tenant Name"]).reindex(first["IHS Site ID"]) > 0
+        self.tenants = presence.columns
+        # Python ints, so any number of tenants fits in the mask
+        weights = np.array([1 << i for i in range(len(self.tenants))], dtype=object)
+        tenant_set = presence.to_numpy().astype(object) @ weights if len(self.tenants) else 0
+
+        self.sites = (
+            first[DIMENSIONS]
+            .assign(**{"Tenant Set": tenant_set})
+            .groupby(DIMENSIONS + ["Tenant Set"], observed=True, dropna=False, sort=False)
+            .size().rename("Sites").reset_index()
+        )
+
+        # Unfiltered, so every site is described by its first row
+        first = db_full.drop_duplicates("IHS Site ID")
+        self._zone_summary = (
+            first[["Zone"]].assign(
+                Total_Sites=1,
+                On_Air_Sites=(first["Site Operational Status"] == "On Air").to_numpy(),
+                MTN_Sites=(first["Tenant Name"] == "MTN NG").to_numpy(),
+                Airtel_Sites=(first["Tenant Name"] == "Airtel NG").to_numpy(),
+            )
+            .groupby("Zone").sum().astype("int64").reset_index()
+        )
+
+    @property
+    def nbytes(self):
+        frames = [self.tenant_rows, self.sites, self.mixed_rows, self._zone_summary]
+        return sum(int(df.memory_usage(deep=True).sum()) for df in frames)
+
+    def _cells(self, cells, filters, tenant_set=False):
+        """Cells matching filters (column -> selected values; empty selections are skipped)."""
+        mask = np.ones(len(cells), dtype=bool)
+        for col, values in filters.items():
+            if not len(values):
+                continue
+            if col == "Tenant Name" and tenant_set:
+                values = set(values)
+                selected = sum(1 << i for i, tenant in enumerate(self.tenants) if tenant in values)
+                mask &= np.bitwise_and(cells["Tenant Set"].to_numpy(), selected) != 0
+            else:
+                mask &= cells[col].isin(values).to_numpy()
+        return cells[mask]
+
+    def _site_cells(self, filters):
+        """Sites per DIMENSIONS cell under filters (each site once)."""
+        sites = self._cells(self.sites, filters, tenant_set=True)
+        if len(self.mixed_rows):
+            # First matching row of each mixed site
+            rows = self._cells(self.mixed_rows, filters).drop_duplicates("IHS Site ID")
+            sites = pd.concat([sites[DIMENSIONS + ["Sites"]], rows[DIMENSIONS].assign(Sites=1)], ignore_index=True)
+        return sites
+
+    def kpis(self, filters):
+        """Total sites, MTN and Airtel tenant rows, and On Air sites under filters."""
+        sites = self._site_cells(filters)
+        rows = self._cells(self.tenant_rows, filters)
+        tenant_rows = rows.groupby("Tenant Name", observed=True)["Rows"].sum()
+        return (
+            int(sites["Sites"].sum()),
+            int(tenant_rows.get("MTN NG", 0)),
+            int(tenant_rows.get("Airtel NG", 0)),
+            int(sites.loc[sites["Site Operational Status"] == "On Air", "Sites"].sum()),
+        )
+
+    def status_counts(self, filters):
+        """Sites per operational status under filters, most first."""
+        sites = self._site_cells(filters)
+        counts = sites.groupby("Site Operational Status", observed=True, sort=False)["Sites"].sum()
+        return counts.sort_values(ascending=False, kind="stable").rename_axis("Status").reset_index(name="Count")
+
+    def tenant_counts(self, filters):
+        """Tenant rows per tenant under filters, most first."""
+        rows = self._cells(self.tenant_rows, filters)
+        counts = rows.groupby("Tenant Name", observed=True, sort=False)["Rows"].sum()
+        return counts.sort_values(ascending=False, kind="stable").rename_axis("Tenant").reset_index(name="Records")
+
+    def zone_summary(self):
+        """Sites, On Air sites and sites whose first tenant is MTN / Airtel, per zone (all sites)."""
+        return self._zone_summary.copy()
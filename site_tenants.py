@@ -0,0 +1,39 @@
+# site_tenants.py
+
+
+class SiteTenantIndex:
+    """
+    Bidirectional IHS Site ID <-> tenant_and_id lookup over db_full, built once per dataset.
+
+    - tenants_of: site -> its tenant_and_id values, in db_full row order.
+    - sites_of: tenant_and_id -> the sites it appears on, in db_full row order.
+
+    The Site Info selectboxes, their callbacks and the page header resolve a
+    selection with dict lookups instead of filtering db_full each time.
+    """
+
+    def __init__(self, db_full):
+        pairs = db_full[["IHS Site ID", "tenant_and_id"]].dropna()
+        tenants_of, sites_of = {}, {}
+        for site, tenant in zip(pairs["IHS Site ID"].tolist(), pairs["tenant_and_id"].tolist()):
+            tenants_of.setdefault(site, []).append(tenant)
+            sites_of.setdefault(tenant, []).append(site)
+        self.tenants_of = {site: tuple(tenants) for site, tenants in tenants_of.items()}
+        self.sites_of = {tenant: tuple(sites) for tenant, sites in sites_of.items()}
+
+    def tenants(self, site_id, listed=None):
+        """tenant_and_id values of site_id (none if it is not in the `listed` sites)."""
+        if listed is not None and site_id not in listed:
+            return ()
+        return self.tenants_of.get(site_id, ())
+
+    def site(self, tenant_id, listed=None):
+        """First site of tenant_id (among the `listed` sites), or None."""
+        for site in self.sites_of.get(tenant_id, ()):
+            if listed is None or site in listed:
+                return site
+        return None
+
+    def tenant_options(self, site_ids):
+        """Sorted distinct tenant_and_id values of site_ids."""
+        return sorted({tenant for site in site_ids for tenant in self.tenants_of.get(site, ())})
@@ -0,0 +1,267 @@
+# storage.py
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from schema import ID
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, concurrent builds just race
+    fcntl = None
+
+# Where cleaned datasets are persisted between uploads / server restarts
+SNAPSHOT_DIR = os.environ.get("PA_SNAPSHOT_DIR", os.path.join(".cache", "snapshots"))
+
+# Bump whenever the cleaning in calcs.clean_sheets changes, so stale snapshots are ignored
+SNAPSHOT_VERSION = 9
+
+# Partition of rows without a date in partitioned tables
+NO_PARTITION = "none"
+
+
+def file_bytes(file):
+    """Returns the raw bytes of an uploaded file, file-like object or path."""
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    if hasattr(file, "read"):
+        file.seek(0)
+        data = file.read()
+        file.seek(0)
+        return data
+    with open(file, "rb") as f:
+        return f.read()
+
+
+def content_hash(data):
+    """Content hash of a workbook, used as the snapshot key."""
+    digest = hashlib.sha256()
+    digest.update(f"v{SNAPSHOT_VERSION}:".encode())
+    digest.update(data)
+    return digest.hexdigest()[:32]
+
+
+def snapshot_path(key):
+    return os.path.join(SNAPSHOT_DIR, key)
+
+
+def has_snapshot(key):
+    return os.path.exists(os.path.join(snapshot_path(key), "meta.json"))
+
+
+def _arrow_safe(df):
+    """
+    Makes a DataFrame writable to Arrow.
+
+    Excel sheets often mix numbers and text in one column (e.g. "Tenant ID"),
+    which Arrow refuses to store. Such columns are stored as strings, keeping NaN.
+    """
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+@contextlib.contextmanager
+def snapshot_lock(key):
+    """
+    Exclusive lock around building snapshot `key`.
+
+    Several server processes share SNAPSHOT_DIR; the first one to take the
+    lock parses the workbook while the others wait and then find the snapshot.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, f".{key}.lock"), "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_table(file, columns=None):
+    table = feather.read_table(file, memory_map=True)
+    if columns is not None:
+        # Unselected columns are never paged in; the stored index is kept
+        index = [c for c in (table.schema.pandas_metadata or {}).get("index_columns", []) if isinstance(c, str)]
+        table = table.select([c for c in [*columns, *index] if c in table.column_names])
+    # Strings come back Arrow-backed (schema.ID) instead of as Python objects
+    return table.to_pandas(split_blocks=True, types_mapper={pa.string(): ID, pa.large_string(): ID}.get)
+
+
+def _write_table(path, name, value):
+    if isinstance(value, np.ndarray):
+        np.save(os.path.join(path, f"{name}.npy"), value)
+    else:
+        feather.write_feather(_arrow_safe(value), os.path.join(path, f"{name}.arrow"), compression="uncompressed")
+
+
+def _link(src, dst):
+    """Hard-links a file of an (immutable) snapshot into another, copying where links are unsupported."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _link_table(base, path, name):
+    for extension in (".arrow", ".npy"):
+        src = os.path.join(snapshot_path(base), name + extension)
+        if os.path.exists(src):
+            _link(src, os.path.join(path, name + extension))
+
+
+def _write_partitions(path, name, frame, column):
+    """Writes `frame` as one file per calendar month of its date `column`, plus an empty schema file."""
+    os.makedirs(os.path.join(path, name))
+    _write_table(os.path.join(path, name), "_schema", frame.iloc[0:0])
+
+    months = frame[column].dt.strftime("%Y-%m").fillna(NO_PARTITION)
+    for month, rows in frame.groupby(months.to_numpy(), sort=True):
+        _write_table(os.path.join(path, name), month, rows)
+    return sorted(months.unique())
+
+
+def save_snapshot(key, frames, meta=None, partition_by=None, base=None):
+    """
+    Persists the cleaned tables of a dataset.
+
+    DataFrames are written as uncompressed Arrow IPC files and numpy arrays
+    as .npy files, so load_snapshot can memory-map them. Tables named in
+    `partition_by` ({name: date column}) are split into year/month files
+    instead, read back with load_partitions.
+
+    With `base` (the key of an existing snapshot), only what changed has to be
+    passed: tables missing from `frames`, and the partitions of base months
+    a partitioned frame has no rows for, are hard-linked from `base`.
+
+    `meta` holds extra JSON-serialisable details stored next to the tables,
+    e.g. the parent snapshot of an incremental update.
+
+    Files are written to a temporary directory first and moved into place,
+    so a concurrent reader never sees a half-written snapshot.
+    """
+    partition_by = partition_by or {}
+    base_meta = load_meta(base) if base is not None else {"tables": [], "partitions": {}}
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp_path = os.path.join(SNAPSHOT_DIR, f".{key}.{uuid.uuid4().hex}")
+    os.makedirs(tmp_path)
+    try:
+        tables = []
+        for name, value in frames.items():
+            if name not in partition_by:
+                _write_table(tmp_path, name, value)
+                tables.append(name)
+        for name in base_meta["tables"]:
+            if name not in frames:
+                _link_table(base, tmp_path, name)
+                tables.append(name)
+
+        partitions = {}
+        for name in dict.fromkeys([*(name for name in frames if name in partition_by), *base_meta["partitions"]]):
+            if name in frames:
+                months = _write_partitions(tmp_path, name, frames[name], partition_by[name])
+            else:
+                months = []
+                os.makedirs(os.path.join(tmp_path, name))
+                _link_table(base, tmp_path, os.path.join(name, "_schema"))
+            for month in base_meta["partitions"].get(name, []):
+                if month not in months:
+                    _link_table(base, tmp_path, os.path.join(name, month))
+            partitions[name] = sorted({*months, *base_meta["partitions"].get(name, [])})
+
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({
+                **(meta or {}), "key": key, "version": SNAPSHOT_VERSION,
+                "tables": tables, "partitions": partitions,
+            }, f)
+        os.replace(tmp_path, snapshot_path(key))
+    except OSError:
+        # Another process published the same snapshot first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not has_snapshot(key):
+            raise
+
+
+def load_snapshot(key):
+    """
+    Loads the tables of a snapshot written by save_snapshot, memory-mapped.
+
+    Arrays and the numeric/date columns of the frames point straight into the
+    mapped files (read-only), so every server process attached to the same
+    snapshot shares one copy in the OS page cache; only text columns are
+    decoded per process.
+    """
+    path = snapshot_path(key)
+    tables = {}
+    for name in load_meta(key)["tables"]:
+        file = os.path.join(path, name)
+        if os.path.exists(f"{file}.npy"):
+            tables[name] = np.load(f"{file}.npy", mmap_mode="r")
+        else:
+            tables[name] = _read_table(f"{file}.arrow")
+    return tables
+
+
+def load_partitions(key, name, months=None, columns=None):
+    """
+    Reads the given year/month partitions ("YYYY-MM", default all) of a
+    partitioned table, memory-mapped, in their original row order.
+
+    A single partition is returned as read (still backed by the mapped file);
+    several are concatenated, and only re-sorted if their rows interleave.
+    """
+    path = os.path.join(snapshot_path(key), name)
+    if months is None:
+        months = load_meta(key)["partitions"][name]
+
+    parts = [
+        _read_table(os.path.join(path, f"{month}.arrow"), columns)
+        for month in (months or ["_schema"])
+    ]
+    if len(parts) == 1:
+        return parts[0]
+    frame = pd.concat(_same_categories(parts))
+    return frame if frame.index.is_monotonic_increasing else frame.sort_index()
+
+
+def _same_categories(parts):
+    """
+    Gives each categorical column the same categories in every part, so they
+    stay categorical when concatenated (partitions written by an incremental
+    update can have categories the others lack).
+    """
+    for col in parts[0].columns:
+        dtypes = [part[col].dtype for part in parts if col in part.columns]
+        if not all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+        categories = dtypes[0].categories
+        if all(dtype.categories.equals(categories) for dtype in dtypes):
+            continue
+        for dtype in dtypes[1:]:
+            categories = categories.append(dtype.categories[~dtype.categories.isin(categories)])
+        parts = [
+            part.assign(**{col: part[col].cat.set_categories(categories)}) if col in part.columns else part
+            for part in parts
+        ]
+    return parts
+
+
+def load_meta(key):
+    """Metadata stored with a snapshot (see save_snapshot)."""
+    with open(os.path.join(snapshot_path(key), "meta.json")) as f:
+        return json.load(f)
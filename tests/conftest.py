@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+import calcs
+import storage
+
+# As the app entry point (Homepage) does for the server process
+pd.set_option("mode.copy_on_write", True)
+
+SITES = ["IHS_S0001B", "IHS_S0002B", "IHS_S0003B"]
+
+
+def outage_rows(rows):
+    """Outage sheet rows from (site, date, duration, root cause) tuples."""
+    dates = pd.to_datetime([date for _, date, _, _ in rows])
+    return pd.DataFrame({
+        "Date": dates,
+        "IHS Site ID": [site for site, _, _, _ in rows],
+        "Outage Count": 1,
+        "Duration": [duration for _, _, duration, _ in rows],
+        "Root Cause Type": [cause for _, _, _, cause in rows],
+        "Year": dates.year,
+        "Month": dates.month_name(),
+        "Week": dates.isocalendar().week.to_numpy(),
+    })
+
+
+def db_rows(sites):
+    return pd.DataFrame([
+        {
+            "IHS Site ID": site, "Tenants On Site": "MTN NG", "IHS Site Priority": "P1",
+            "Zone": "South", "Region": "Rivers", "State": "Rivers State", "EFS Name": "EFS1",
+            "RTO Name": "RTO1", "Head, Field Service": "HFS", "SBC": "SBC1",
+            "Tenant Name": "MTN NG", "Tenant ID": f"T{i}", "Site Address": f"{i} Road",
+            "Site Operational Status": "On Air", "Latitude": 4.5, "Longitude": 7.0, "Project": "Core",
+        }
+        for i, site in enumerate(sites)
+    ])
+
+
+def pa_rows(sites, dates, value=99.0):
+    pa = pd.DataFrame({"Site ID": sites})
+    for date in pd.to_datetime(dates):
+        pa[date.to_pydatetime()] = value
+    return pa
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    """Snapshots go to a temporary directory; workbooks are read serially."""
+    monkeypatch.setattr(storage, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(calcs, "INGEST_WORKERS", 1)
+    return tmp_path
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Writes the given sheets to an .xlsx file and returns its path."""
+    counter = iter(range(1000))
+
+    def write(**sheets):
+        path = tmp_path / f"workbook{next(counter)}.xlsx"
+        with pd.ExcelWriter(path) as writer:
+            for name, frame in sheets.items():
+                frame.to_excel(writer, sheet_name=name, index=False)
+        return str(path)
+    return write
@@ -0,0 +1,163 @@
+import datetime
+
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import calcs
+from calcs import outage_kpis, parse_durations, read_workbook
+from conftest import SITES, db_rows, outage_rows, pa_rows
+
+
+def durations(*values):
+    return parse_durations(pd.Series(values, dtype=object)).tolist()
+
+
+def test_parse_durations_clock_times():
+    assert durations(datetime.time(0, 52, 40), datetime.time(23, 59, 59)) == [
+        pd.Timedelta("00:52:40"), pd.Timedelta("23:59:59"),
+    ]
+
+
+def test_parse_durations_clock_strings():
+    assert durations("01:30:00", "00:00:05") == [pd.Timedelta("01:30:00"), pd.Timedelta("00:00:05")]
+
+
+def test_parse_durations_day_fractions():
+    # Excel stores durations as fractions of a day
+    assert durations(0.25, 1, "0.5") == [pd.Timedelta(hours=6), pd.Timedelta(days=1), pd.Timedelta(hours=12)]
+
+
+def test_parse_durations_numeric_column():
+    result = parse_durations(pd.Series([0.5, np.nan]))
+    assert result.dtype == "timedelta64[ns]"
+    assert result[0] == pd.Timedelta(hours=12)
+    assert pd.isna(result[1])
+
+
+def test_parse_durations_timedeltas():
+    assert durations(pd.Timedelta(hours=2), datetime.timedelta(minutes=5), "1 days 02:00:00") == [
+        pd.Timedelta(hours=2), pd.Timedelta(minutes=5), pd.Timedelta(hours=26),
+    ]
+
+
+def test_parse_durations_timedelta_column_passes_through():
+    values = pd.Series(pd.to_timedelta(["1h", "30min"]))
+    pd.testing.assert_series_equal(parse_durations(values), values)
+
+
+def test_parse_durations_excel_epoch_datetimes():
+    # Durations over 24h come back from openpyxl as datetimes after the epoch
+    assert durations(datetime.datetime(1900, 1, 1, 2, 0, 0)) == [pd.Timedelta(hours=26)]
+
+
+def test_parse_durations_missing_and_garbage_become_nat():
+    result = parse_durations(pd.Series([np.nan, None, "garbage", "", "01:00:00"], dtype=object))
+    assert result.dtype == "timedelta64[ns]"
+    assert result[:4].isna().all()
+    assert result[4] == pd.Timedelta(hours=1)
+
+
+def test_parse_durations_mixed_column_keeps_positions():
+    result = parse_durations(pd.Series(
+        ["garbage", datetime.time(1, 0), 0.5, np.nan, "02:00:00"], index=[10, 11, 12, 13, 14], dtype=object,
+    ))
+    assert result.index.tolist() == [10, 11, 12, 13, 14]
+    assert pd.isna(result[10]) and pd.isna(result[13])
+    assert result[[11, 12, 14]].tolist() == [pd.Timedelta(hours=1), pd.Timedelta(hours=12), pd.Timedelta(hours=2)]
+
+
+def outage_days(counts_by_date):
+    """outage_days-shaped frame (sheet and ISO calendar keys) from {date: outage count}."""
+    dates = pd.DatetimeIndex(list(counts_by_date), name="Date")
+    iso = dates.isocalendar()
+    return pd.DataFrame({
+        "Year": dates.year,
+        "Week": iso["week"].to_numpy(),
+        "Month": dates.month_name(),
+        "iso_year": iso["year"].to_numpy(),
+        "iso_week": iso["week"].to_numpy(),
+        "rows": 1,
+        "outage_count": list(counts_by_date.values()),
+    }, index=dates)
+
+
+def test_outage_kpis_current_period_is_limited_to_the_latest_year():
+    days = outage_days({
+        "2025-10-13": 10,  # 2025 week 42, October 2025
+        "2025-10-20": 10,  # 2025 week 43, October 2025
+        "2026-10-05": 4,   # 2026 week 41
+        "2026-10-12": 5,   # 2026 week 42
+        "2026-09-30": 8,   # September 2026
+    })
+    kpis = outage_kpis(days, 2026, 42, 10)
+    assert kpis["current_week_count"] == 5
+    assert kpis["weekly_outage_gain"] == 25
+    assert kpis["current_month_count"] == 9
+    assert kpis["monthly_outage_gain"] == 12.5
+
+
+def test_outage_kpis_compare_across_the_year_boundary():
+    days = outage_days({
+        "2025-12-22": 4,  # ISO 2025-W52, December 2025
+        "2026-01-01": 2,  # ISO 2026-W01, January 2026
+        "2025-01-01": 9,  # ISO 2025-W01, January 2025
+    })
+    kpis = outage_kpis(days, 2026, 1, 1, week_col="iso_week", week_year=2026)
+    assert kpis["current_week_count"] == 2
+    assert kpis["weekly_outage_gain"] == -50
+    assert kpis["current_month_count"] == 2
+    assert kpis["monthly_outage_gain"] == -50
+
+
+def test_outage_kpis_iso_week_in_the_previous_calendar_year():
+    # 2025-12-29 is in ISO week 1 of 2026
+    days = outage_days({"2025-12-29": 3, "2025-12-22": 6})
+    kpis = outage_kpis(days, 2025, 1, 12, week_col="iso_week", week_year=2026)
+    assert kpis["current_week_count"] == 3
+    assert kpis["weekly_outage_gain"] == -50
+
+
+@pytest.fixture
+def workbook_bytes(workbook):
+    path = workbook(
+        outages=outage_rows([(SITES[0], "2024-01-01", "01:00:00", "Grid"), (SITES[1], "2024-01-02", 0.5, "Power")]),
+        db=db_rows(SITES),
+        pa=pa_rows(SITES, ["2024-01-01", "2024-01-02"]),
+    )
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def no_pool(data):
+    raise AssertionError("the process pool should not be used")
+
+
+@pytest.mark.parametrize("enabled, min_bytes, workers", [(False, 0, 4), (True, 2**30, 4), (True, 0, 1)])
+def test_read_workbook_is_serial_unless_enabled_large_and_multicore(workbook_bytes, monkeypatch, enabled, min_bytes, workers):
+    monkeypatch.setattr(calcs, "PARALLEL_INGEST", enabled)
+    monkeypatch.setattr(calcs, "PARALLEL_MIN_BYTES", min_bytes)
+    monkeypatch.setattr(calcs, "INGEST_WORKERS", workers)
+    monkeypatch.setattr(calcs, "_read_workbook_parallel", no_pool)
+    assert list(read_workbook(workbook_bytes)) == calcs.SHEETS
+
+
+def test_read_workbook_falls_back_to_serial_with_a_warning(workbook_bytes, monkeypatch):
+    def broken_pool(data):
+        raise BrokenProcessPool("worker died")
+
+    monkeypatch.setattr(calcs, "INGEST_WORKERS", 2)
+    monkeypatch.setattr(calcs, "_read_workbook_parallel", broken_pool)
+    with pytest.warns(RuntimeWarning, match="worker died"):
+        sheets = read_workbook(workbook_bytes, parallel=True)
+    assert sheets["db"].equals(read_workbook(workbook_bytes, parallel=False)["db"])
+
+
+def test_parallel_read_matches_serial(workbook_bytes, monkeypatch):
+    monkeypatch.setattr(calcs, "INGEST_WORKERS", 2)
+    serial = read_workbook(workbook_bytes, parallel=False)
+    parallel = read_workbook(workbook_bytes, parallel=True)
+    for sheet in calcs.SHEETS:
+        pd.testing.assert_frame_equal(parallel[sheet], serial[sheet])
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import AggregateCube, outage_dates, outage_site_days
+from pa_store import PAStore
+
+N_SITES = 20
+
+
+@pytest.fixture(scope="module")
+def outages():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2025-12-20", "2026-01-20")
+    n = 400
+    outages = pd.DataFrame({
+        "site_key": rng.integers(-1, N_SITES, n).astype("int32"),
+        "Date": rng.choice(dates, n),
+        "Outage Count": rng.integers(1, 3, n),
+    })
+    outages.loc[::37, "Date"] = pd.NaT
+    outages["Year"] = outages["Date"].dt.year
+    outages["Week"] = outages["Date"].dt.isocalendar().week
+    outages["Month"] = outages["Date"].dt.month_name()
+    return outages
+
+
+@pytest.fixture(scope="module")
+def cube(outages):
+    db = pd.DataFrame({"IHS Site ID": [f"S{i}" for i in range(N_SITES)]})
+    pa_store = PAStore(np.full((N_SITES, 3), 99.0), db["IHS Site ID"], pd.date_range("2026-01-01", periods=3))
+    return AggregateCube(outage_site_days(outages), outage_dates(outages), pa_store, db)
+
+
+def expected_rows(outages, site_keys, start, end):
+    rows = outages[outages["site_key"].isin(site_keys) & outages["Date"].notna()]
+    if start is not None:
+        rows = rows[rows["Date"] >= start]
+    if end is not None:
+        rows = rows[rows["Date"] <= end]
+    return rows
+
+
+RANGES = [(None, None), (pd.Timestamp("2025-12-28"), pd.Timestamp("2026-01-05")), (pd.Timestamp("2027-01-01"), None)]
+SELECTIONS = [np.arange(N_SITES), np.array([0, 3, 7]), np.array([], dtype="int64"), np.array([N_SITES - 1])]
+
+
+def test_outage_site_days_is_sparse_and_sorted(outages):
+    site_days = outage_site_days(outages)
+    assert not site_days.duplicated(["site_key", "Date"]).any()
+    assert (site_days["site_key"] >= 0).all() and site_days["Date"].notna().all()
+    assert site_days.equals(site_days.sort_values(["site_key", "Date"]))
+    assert site_days["rows"].sum() == len(expected_rows(outages, range(N_SITES), None, None))
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+@pytest.mark.parametrize("site_keys", SELECTIONS)
+def test_outage_days_match_group_by(cube, outages, site_keys, start, end):
+    rows = expected_rows(outages, site_keys, start, end)
+    expected = rows.groupby("Date")["Outage Count"].agg(["size", "sum"])
+
+    days = cube.outage_days(site_keys, start, end)
+    assert days.index.tolist() == expected.index.tolist()
+    assert days["rows"].tolist() == expected["size"].tolist()
+    assert days["outage_count"].tolist() == expected["sum"].astype(float).tolist()
+    assert days["Week"].tolist() == days.index.isocalendar().week.tolist()
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+@pytest.mark.parametrize("site_keys", SELECTIONS)
+def test_outage_by_site_matches_group_by(cube, outages, site_keys, start, end):
+    expected = expected_rows(outages, site_keys, start, end).groupby("site_key")["Outage Count"].sum()
+
+    by_site = cube.outage_by_site(site_keys, start, end)
+    assert by_site.index.tolist() == expected.index.tolist()
+    assert by_site.tolist() == expected.astype(float).tolist()
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+def test_active_sites(cube, outages, start, end):
+    active = expected_rows(outages, range(N_SITES), start, end)["site_key"].unique()
+    assert np.flatnonzero(cube.active_sites(start, end)).tolist() == sorted(active)
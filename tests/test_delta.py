@@ -0,0 +1,139 @@
+import os
+
+import pandas as pd
+import pytest
+
+import calcs
+import storage
+from conftest import SITES, db_rows, outage_rows, pa_rows
+
+BASE_OUTAGES = [
+    ("IHS_S0001B", "2026-01-05", "01:00:00", "Grid"),
+    ("IHS_S0001B", "2026-01-05", "01:00:00", "Grid"),  # a genuine repeat
+    ("IHS_S0002B", "2026-01-06", "00:30:00", "Grid"),
+    ("IHS_S0002B", "2026-02-10", "02:00:00", "Grid"),
+    ("IHS_S0003B", "2026-02-11", "00:10:00", "Grid"),
+    ("IHS_S0003B", "2026-03-01", "00:20:00", "Grid"),
+]
+
+
+@pytest.fixture
+def base_key(snapshot_dir, workbook):
+    return calcs.ingest(workbook(
+        outages=outage_rows(BASE_OUTAGES), db=db_rows(SITES), pa=pa_rows(SITES, ["2026-03-01", "2026-03-02"]),
+    ))
+
+
+def site_day_totals(key):
+    """Outage rows per (site, day) in the aggregates saved with snapshot `key`."""
+    site_days = storage.load_partitions(key, "outage_site_days")
+    return sorted(zip(site_days["site_key"].tolist(), site_days["Date"], site_days["rows"].tolist()))
+
+
+def test_new_outage_rows_keep_base_repeats(base_key, workbook):
+    delta = outage_rows([
+        ("IHS_S0001B", "2026-01-07", "01:00:00", "Rectifier"),
+        ("IHS_S0002B", "2026-04-02", "00:05:00", "Grid"),
+    ])
+    key = calcs.apply_delta(base_key, workbook(outages=delta))
+
+    outages = calcs.load_outages(key)
+    assert len(outages) == len(BASE_OUTAGES) + 2
+    repeated = outages[(outages["IHS Site ID"] == "IHS_S0001B") & (outages["Date"] == "2026-01-05")]
+    assert len(repeated) == 2
+    # Delta rows come after the base rows
+    assert outages["Date"].iloc[-2:].dt.strftime("%Y-%m-%d").tolist() == ["2026-01-07", "2026-04-02"]
+    assert outages["Root Cause Type"].dtype == "category"
+
+
+def rows_of(outages, site, date):
+    return outages[(outages["IHS Site ID"] == site) & (outages["Date"] == date)]
+
+
+def test_reexported_outage_rows_replace_their_base_copies(base_key, workbook):
+    delta = outage_rows([("IHS_S0003B", "2026-02-11", "00:10:00", "Grid")])
+    delta["Outage Count"] = 2
+    key = calcs.apply_delta(base_key, workbook(outages=delta))
+
+    outages = calcs.load_outages(key)
+    assert len(outages) == len(BASE_OUTAGES)
+    assert rows_of(outages, "IHS_S0003B", "2026-02-11")["Outage Count"].tolist() == [2]
+
+
+def test_outages_with_another_root_cause_are_kept(base_key, workbook):
+    delta = outage_rows([("IHS_S0003B", "2026-02-11", "00:10:00", "Rectifier")])
+    key = calcs.apply_delta(base_key, workbook(outages=delta))
+
+    outages = calcs.load_outages(key)
+    assert len(outages) == len(BASE_OUTAGES) + 1
+    assert rows_of(outages, "IHS_S0003B", "2026-02-11")["Root Cause Type"].tolist() == ["Grid", "Rectifier"]
+
+
+@pytest.mark.parametrize("copies", [1, 2, 3])
+def test_reexported_repeats_replace_one_base_copy_each(base_key, workbook, copies):
+    # The base has the S0001 outage of 2026-01-05 twice
+    delta = outage_rows([("IHS_S0001B", "2026-01-05", "01:00:00", "Grid")] * copies)
+    key = calcs.apply_delta(base_key, workbook(outages=delta))
+
+    outages = calcs.load_outages(key)
+    assert len(rows_of(outages, "IHS_S0001B", "2026-01-05")) == max(2, copies)
+    assert len(outages) == len(BASE_OUTAGES) + max(0, copies - 2)
+
+
+def test_outage_delta_only_rewrites_touched_months(base_key, workbook):
+    delta = outage_rows([("IHS_S0002B", "2026-02-20", "00:05:00", "Grid")])
+    key = calcs.apply_delta(base_key, workbook(outages=delta))
+
+    def file(snapshot, *parts):
+        return os.path.join(storage.snapshot_path(snapshot), *parts)
+
+    for table in ["df_init", "outage_site_days"]:
+        assert os.path.samefile(file(base_key, table, "2026-01.arrow"), file(key, table, "2026-01.arrow"))
+        assert not os.path.samefile(file(base_key, table, "2026-02.arrow"), file(key, table, "2026-02.arrow"))
+    assert os.path.samefile(file(base_key, "db_full.arrow"), file(key, "db_full.arrow"))
+    assert os.path.samefile(file(base_key, "pa_values.npy"), file(key, "pa_values.npy"))
+
+
+def test_partial_aggregates_match_a_full_rebuild(base_key, workbook):
+    delta = outage_rows([
+        ("IHS_S0001B", "2026-01-05", "01:00:00", "Grid"),
+        ("IHS_S0003B", "2026-03-01", "00:20:00", "Grid"),
+        ("IHS_S0002B", "2026-05-01", "00:20:00", "Grid"),
+    ])
+    key = calcs.apply_delta(base_key, workbook(outages=delta))
+
+    outages = calcs.load_outages(key)
+    expected = outages.groupby(["site_key", "Date"]).size()
+    assert site_day_totals(key) == sorted((k, d, n) for (k, d), n in expected.items())
+
+
+def test_db_delta_rekeys_every_month(base_key, workbook):
+    key = calcs.apply_delta(base_key, workbook(
+        db=db_rows(["IHS_S0000B"]),
+        outages=outage_rows([("IHS_S0000B", "2026-01-09", "00:05:00", "Grid")]),
+    ))
+
+    dataset = calcs.load_dataset(key)
+    outages = calcs.load_outages(key)
+    assert len(outages) == len(BASE_OUTAGES) + 1
+    site_keys = pd.Series(dataset.db.index, index=dataset.db["IHS Site ID"])
+    assert (outages["site_key"].to_numpy() == site_keys[outages["IHS Site ID"]].to_numpy()).all()
+
+
+def test_pa_delta_keeps_outages(base_key, workbook):
+    key = calcs.apply_delta(base_key, workbook(pa=pa_rows(SITES[:1], ["2026-03-03"], value=50.0)))
+
+    dataset = calcs.load_dataset(key)
+    assert dataset.pa_store.dates[-1] == pd.Timestamp("2026-03-03")
+    assert len(calcs.load_outages(key)) == len(BASE_OUTAGES)
+
+
+def test_delta_missing_a_key_column_is_rejected(base_key, workbook):
+    delta = outage_rows([("IHS_S0001B", "2026-01-07", "01:00:00", "Grid")]).drop(columns="Duration")
+    with pytest.raises(ValueError, match="Duration"):
+        calcs.apply_delta(base_key, workbook(outages=delta))
+
+
+def test_delta_without_known_sheets_is_rejected(base_key, workbook):
+    with pytest.raises(ValueError, match="none of the sheets"):
+        calcs.apply_delta(base_key, workbook(notes=pd.DataFrame({"a": [1]})))
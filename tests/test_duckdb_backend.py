@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+import duckdb_backend
+from cube import AggregateCube, outage_dates, outage_site_days
+from pa_store import PAStore
+
+N_SITES = 30
+
+
+@pytest.fixture(scope="module")
+def source():
+    """Outage rows, PA store and site table the engines are built from."""
+    rng = np.random.default_rng(2)
+    n = 600
+    dates = pd.date_range("2025-12-01", "2026-02-28")
+    outages = pd.DataFrame({
+        "site_key": rng.integers(-1, N_SITES, n).astype("int32"),
+        "Date": rng.choice(dates, n),
+        "Outage Count": rng.integers(1, 4, n),
+    })
+    outages["Year"] = outages["Date"].dt.year
+    outages["Week"] = outages["Date"].dt.isocalendar().week
+    outages["Month"] = outages["Date"].dt.month_name()
+
+    db = pd.DataFrame({
+        "IHS Site ID": [f"S{i}" for i in range(N_SITES)],
+        "Zone": rng.choice(["South", "North"], N_SITES),
+    })
+    # PA for most sites (plus one not in db), with gaps
+    values = rng.uniform(90, 100, (N_SITES - 4 + 1, 40))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    pa_sites = [f"S{i}" for i in range(4, N_SITES)] + ["S999"]
+    pa_store = PAStore(values, pa_sites, pd.date_range("2026-01-10", periods=40))
+    return outages, pa_store, db
+
+
+@pytest.fixture(scope="module")
+def facts(source):
+    outages, pa_store, db = source
+    return outage_site_days(outages), outage_dates(outages), pa_store, db
+
+
+@pytest.fixture(scope="module")
+def cube(facts):
+    return AggregateCube(*facts)
+
+
+@pytest.fixture(scope="module")
+def engine(facts, tmp_path_factory):
+    db_dir = tmp_path_factory.mktemp("duckdb")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(duckdb_backend, "DB_DIR", str(db_dir))
+        yield duckdb_backend.DuckEngine("test", *facts)
+
+
+SELECTIONS = {
+    "all sites": np.arange(N_SITES),
+    "no sites": np.arange(0),
+    "sites without PA": np.arange(4),
+    "sample": np.array([1, 5, 6, 12, 17, 29]),
+}
+RANGES = {
+    "everything": (None, None),
+    "last week": (pd.Timestamp("2026-02-22"), pd.Timestamp("2026-02-28")),
+    "open start": (None, pd.Timestamp("2026-01-15")),
+    "open end": (pd.Timestamp("2026-02-01"), None),
+    "no data": (pd.Timestamp("2027-01-01"), pd.Timestamp("2027-01-31")),
+}
+
+
+@pytest.fixture(params=list(SELECTIONS))
+def site_keys(request):
+    return SELECTIONS[request.param]
+
+
+@pytest.fixture(params=list(RANGES))
+def date_range(request):
+    return RANGES[request.param]
+
+
+@pytest.mark.parametrize("method", ["outage_days", "pa_days"])
+def test_daily_frames_match_the_cube(cube, engine, method, site_keys, date_range):
+    expected = getattr(cube, method)(site_keys, *date_range)
+    actual = getattr(engine, method)(site_keys, *date_range)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9, check_freq=False)
+
+
+def test_outage_by_site_matches_the_cube(cube, engine, site_keys, date_range):
+    pd.testing.assert_series_equal(
+        engine.outage_by_site(site_keys, *date_range), cube.outage_by_site(site_keys, *date_range),
+        check_exact=False, rtol=1e-9,
+    )
+
+
+def test_active_sites_match_the_cube(cube, engine, date_range):
+    np.testing.assert_array_equal(engine.active_sites(*date_range), cube.active_sites(*date_range))
+
+
+# --- Both engines against the row-level pandas results they replace ---
+
+def in_range(frame, column, start, end):
+    if start is not None:
+        frame = frame[frame[column] >= start]
+    if end is not None:
+        frame = frame[frame[column] <= end]
+    return frame
+
+
+@pytest.fixture(params=["cube", "engine"])
+def any_engine(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_outage_measures_match_a_group_by_over_rows(any_engine, source, site_keys, date_range):
+    outages, _, _ = source
+    rows = in_range(outages[outages["site_key"].isin(site_keys)], "Date", *date_range)
+
+    expected = rows.groupby("Date").agg(
+        Year=("Year", "first"), rows=("Outage Count", "size"), outage_count=("Outage Count", "sum"),
+    )
+    days = any_engine.outage_days(site_keys, *date_range)
+    assert days.index.tolist() == expected.index.tolist()
+    assert days["Year"].tolist() == expected["Year"].tolist()
+    assert days["rows"].tolist() == expected["rows"].tolist()
+    assert days["outage_count"].tolist() == expected["outage_count"].astype(float).tolist()
+
+    expected = rows.groupby("site_key")["Outage Count"].sum()
+    by_site = any_engine.outage_by_site(site_keys, *date_range)
+    assert by_site.index.tolist() == expected.index.tolist()
+    assert by_site.tolist() == expected.astype(float).tolist()
+
+
+def test_pa_days_match_the_melted_sheet(any_engine, source, site_keys, date_range):
+    _, pa_store, db = source
+    wide = pd.DataFrame(pa_store.values, columns=pa_store.dates).assign(**{"IHS Site ID": pa_store.sites})
+    pa = wide.melt(id_vars="IHS Site ID", var_name="Date", value_name="PA")
+    pa = in_range(pa[pa["IHS Site ID"].isin(db["IHS Site ID"].iloc[site_keys])], "Date", *date_range)
+
+    days = any_engine.pa_days(site_keys, *date_range)
+    if pa.empty:
+        assert days.empty
+        return
+    expected = pa.groupby("Date")["PA"].agg(["sum", "count"])
+    assert days.index.tolist() == expected.index.tolist()
+    np.testing.assert_allclose(days["pa_sum"], expected["sum"], rtol=1e-6)
+    assert days["pa_count"].tolist() == expected["count"].tolist()
@@ -0,0 +1,62 @@
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import schema
+from export import CHUNK_ROWS, FORMATS, to_bytes, write_csv, write_parquet
+
+
+def frame(rows):
+    """Frame with the column types the pages export (see schema.py)."""
+    i = np.arange(rows)
+    return pd.DataFrame({
+        "IHS Site ID": pd.Series([f"IHS_S{n:04d}B" for n in i], dtype=schema.ID),
+        "Zone": pd.Categorical(np.where(i % 3, "South", "North, East")),
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(i % 400, unit="D"),
+        "Outage Count": (i % 7).astype("int8"),
+        "PA": np.where(i % 5, i / 7, np.nan).astype("float32"),
+        "Remarks": np.where(i % 11, 'said "ok"', None),
+    }, index=i + 1000)
+
+
+def parquet_frame(data):
+    return pd.read_parquet(io.BytesIO(data))
+
+
+@pytest.fixture(params=[0, 1, 7, CHUNK_ROWS, 2 * CHUNK_ROWS + 3], ids=lambda rows: f"{rows} rows")
+def df(request):
+    return frame(request.param)
+
+
+def test_csv_equals_to_csv(df):
+    assert to_bytes(df, "CSV") == df.to_csv(index=False).encode()
+
+
+def test_gzip_csv_equals_to_csv(df):
+    assert gzip.decompress(to_bytes(df, "CSV (gzip)")) == df.to_csv(index=False).encode()
+
+
+def test_parquet_equals_to_parquet(df):
+    pd.testing.assert_frame_equal(parquet_frame(to_bytes(df, "Parquet")), parquet_frame(df.to_parquet(index=False)))
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 4, 10])
+def test_chunk_boundaries_do_not_change_the_output(chunk_rows):
+    df = frame(10)
+    stream = io.BytesIO()
+    write_csv(df, stream, chunk_rows=chunk_rows)
+    assert stream.getvalue() == df.to_csv(index=False).encode()
+
+    stream = io.BytesIO()
+    write_parquet(df, stream, chunk_rows=chunk_rows)
+    pd.testing.assert_frame_equal(parquet_frame(stream.getvalue()), parquet_frame(df.to_parquet(index=False)))
+    assert pq.ParquetFile(io.BytesIO(stream.getvalue())).num_row_groups == -(-10 // chunk_rows)
+
+
+def test_every_format_has_a_writer():
+    for fmt in FORMATS:
+        assert to_bytes(frame(3), fmt)
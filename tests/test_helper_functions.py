@@ -0,0 +1,158 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from helper_functions import FilterIndex, _column_mask, apply_filters, filter_key, filter_mask, frame_view
+
+
+@pytest.fixture(scope="module")
+def sites():
+    rng = np.random.default_rng(1)
+    n = 300
+    sites = pd.DataFrame({
+        "IHS Site ID": [f"IHS_S{i:04d}B" for i in range(n)],
+        "Zone": rng.choice(["South", "North", "East", None], n),
+        "Priority": pd.Categorical(rng.choice(["P1", "P2", "P3"], n)),
+        "Tenants": rng.integers(1, 5, n),
+        "Date": rng.choice(pd.date_range("2026-01-01", "2026-03-31"), n),
+    })
+    sites.loc[::23, "Date"] = pd.NaT
+    return sites
+
+
+@pytest.fixture(scope="module")
+def index(sites):
+    return FilterIndex(sites, ["Zone", "Priority", "Tenants"], date_column="Date")
+
+
+@pytest.mark.parametrize("col, val", [
+    ("Zone", ["South", "East"]),
+    ("Zone", ["Nowhere"]),
+    ("Priority", ["P3", "P1", "P3"]),
+    ("Tenants", [2, 4, 4]),
+    ("Tenants", 3),
+    ("Date", (pd.Timestamp("2026-02-01"), pd.Timestamp("2026-02-28"))),
+    ("Date", (pd.Timestamp("2026-01-15"), pd.Timestamp("2026-01-15"))),
+    ("Date", (pd.Timestamp("2027-01-01"), pd.Timestamp("2027-12-31"))),
+])
+def test_index_mask_matches_column_mask(sites, index, col, val):
+    assert index.handles(col, val)
+    np.testing.assert_array_equal(index.mask(col, val), _column_mask(sites, col, val))
+
+
+@pytest.mark.parametrize("col, val", [
+    ("Zone", "sou"),  # text contains
+    ("Priority", "P2"),  # strings are always text contains
+    ("Tenants", [2, 4]),  # two numbers are a (min, max) range
+    ("IHS Site ID", ["IHS_S0001B"]),  # not indexed
+])
+def test_index_leaves_other_filters_to_the_column(index, col, val):
+    assert not index.handles(col, val)
+
+
+def test_value_rows_skips_missing_values(sites, index):
+    mask = index.value_rows("Zone", [None, "South"])
+    np.testing.assert_array_equal(mask, (sites["Zone"] == "South").to_numpy())
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"Zone": ["South"], "Priority": "P1"},
+    {"Zone": [], "Priority": None, "IHS Site ID": ""},
+    {"Zone": "sou", "Tenants": (2, 3), "Priority": ["P2", "P3"]},
+    {"Date": (pd.Timestamp("2026-03-01"), pd.Timestamp("2026-03-31")), "Tenants": [1]},
+])
+def test_apply_filters_with_index_matches_without(sites, index, filters):
+    np.testing.assert_array_equal(filter_mask(sites, filters, index), filter_mask(sites, filters))
+    pd.testing.assert_frame_equal(apply_filters(sites, filters, index), apply_filters(sites, filters))
+
+
+@pytest.mark.parametrize("mask, shared", [
+    (np.ones(300, dtype=bool), True),
+    (np.arange(300) < 120, True),
+    ((np.arange(300) >= 50) & (np.arange(300) < 60), True),
+    (np.arange(300) % 2 == 0, False),
+])
+def test_frame_view_shares_contiguous_rows(sites, mask, shared):
+    view = frame_view(sites, mask)
+    pd.testing.assert_frame_equal(view, sites[mask])
+    assert np.shares_memory(view["Tenants"].to_numpy(), sites["Tenants"].to_numpy()) == shared
+
+
+def test_frame_view_of_no_rows_keeps_columns(sites):
+    view = frame_view(sites, np.zeros(len(sites), dtype=bool))
+    assert view.empty and list(view.columns) == list(sites.columns)
+
+
+def test_edits_to_a_view_do_not_write_through(sites):
+    before = sites.copy()
+    view = frame_view(sites, np.ones(len(sites), dtype=bool))
+    view["Tenants"] = 0
+    view.loc[view.index[0], "Zone"] = "Moved"
+    view["Extra"] = 1
+    pd.testing.assert_frame_equal(sites, before)
+
+
+def test_filter_key_drops_empty_selections():
+    assert filter_key({"Zone": [], "Region": None, "State": "", "SBC": ()}) == ()
+    assert filter_key({"Zone": ["South"], "Region": []}) == filter_key({"Zone": ["South"]})
+
+
+def test_filter_key_ignores_insertion_order_and_list_type():
+    a = filter_key({"Zone": ["South"], "Region": ["Rivers", "Delta"], "Tenants On Site": "MTN NG"})
+    b = filter_key({"Tenants On Site": "MTN NG", "Region": ("Rivers", "Delta"), "Zone": ("South",)})
+    assert a == b
+    assert hash(a) == hash(b)
+
+
+def test_filter_key_keeps_values_that_filter_differently():
+    assert filter_key({"Zone": ["South"]}) != filter_key({"Zone": "South"})
+    assert filter_key({"Zone": ["South"]}) != filter_key({"Region": ["South"]})
+    date_range = (pd.Timestamp("2026-01-01"), pd.Timestamp("2026-01-31"))
+    assert filter_key({"Date": date_range}) == (("Date", date_range),)
+
+
+def peak_allocation(run):
+    """Peak bytes allocated (tracemalloc) while run() executes."""
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture(scope="module")
+def outages():
+    rng = np.random.default_rng(4)
+    n = 200_000
+    return pd.DataFrame({
+        "Date": np.sort(rng.choice(pd.date_range("2025-01-01", "2026-06-30").to_numpy(), n)),
+        "Zone": pd.Categorical(rng.choice(["South", "North", "East"], n)),
+        "site_key": rng.integers(0, 2000, n).astype("int32"),
+        "Outage Count": rng.integers(1, 3, n).astype("float64"),
+    })
+
+
+def test_rerun_filtering_allocates_a_fraction_of_defensive_copies(outages):
+    """Per-rerun allocation of a page's filter steps, before and after the copy removal."""
+    date_range = (pd.Timestamp("2026-01-01"), pd.Timestamp("2026-03-31"))
+    index = FilterIndex(outages, ["Zone"], date_column="Date")
+
+    def before():
+        # Clone the session frame, then filter by zone and date with a copy after each step
+        df = outages.copy()
+        df = df[df["Zone"] == "South"].copy()
+        df = df[(df["Date"] >= date_range[0]) & (df["Date"] <= date_range[1])].copy()
+        df["Outage Count"] = df["Outage Count"].fillna(0)
+
+    def after():
+        df = apply_filters(outages, {"Zone": ["South"], "Date": date_range}, index)
+        df["Outage Count"] = df["Outage Count"].fillna(0)
+
+    copies, views = peak_allocation(before), peak_allocation(after)
+    print(f"per-rerun peak allocation: {copies / 2**20:.1f} MB with copies, {views / 2**20:.1f} MB with views")
+    assert copies > outages.memory_usage().sum()
+    assert views < copies / 4
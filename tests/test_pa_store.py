@@ -0,0 +1,110 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SITES
+from pa_store import PAStore
+
+DATES = pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"])
+
+
+def store(values, sites=SITES, dates=DATES):
+    return PAStore(values, sites, dates)
+
+
+def cells(pa_store):
+    """{(site, date): PA} of the non-missing cells."""
+    long = pa_store.to_long()
+    long = long[long["PA"].notna()]
+    return dict(zip(zip(long["IHS Site ID"].astype(str), long["Date"]), long["PA"].tolist()))
+
+
+def test_from_wide_keeps_the_first_row_of_a_site_and_drops_missing_ids():
+    sheet = pd.DataFrame({
+        "Site ID": [SITES[0], None, SITES[1], SITES[0], np.nan],
+        datetime.datetime(2024, 1, 1): [99.0, 50.0, 98.5, 10.0, 20.0],
+    })
+    pa_store = PAStore.from_wide(sheet)
+    assert pa_store.sites.tolist() == SITES[:2]
+    assert pa_store.values[:, 0].tolist() == [99.0, 98.5]
+
+
+def test_from_wide_sorts_dates_and_coerces_missing_days():
+    sheet = pd.DataFrame({
+        "Site ID": SITES[:2],
+        datetime.datetime(2024, 1, 2): ["-", 97.0],
+        datetime.datetime(2024, 1, 1): [99.123, 98.0],
+        "Remarks": ["x", "y"],
+    })
+    pa_store = PAStore.from_wide(sheet)
+    assert pa_store.dates.tolist() == list(DATES[:2])
+    np.testing.assert_array_equal(pa_store.values, np.array([[99.12, np.nan], [98.0, 97.0]], dtype="float32"))
+
+
+# pandas infers the day-first format from the first header, and says so
+@pytest.mark.filterwarnings("ignore:Parsing dates in %d/%m/%Y format")
+def test_from_wide_parses_day_first_string_headers():
+    sheet = pd.DataFrame({"Site ID": SITES[:1], "14/01/2024": [97.0], "13/01/2024": [99.0]})
+    pa_store = PAStore.from_wide(sheet)
+    assert pa_store.dates.tolist() == list(pd.to_datetime(["2024-01-13", "2024-01-14"]))
+    assert pa_store.values.tolist() == [[99.0, 97.0]]
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ("2024-01-02", "2024-01-03", DATES[1:]),
+    ("2023-12-01", "2024-01-01", DATES[:1]),
+    ("2024-01-02", "2024-01-02", DATES[1:2]),
+    ("2024-02-01", "2024-02-28", DATES[:0]),
+])
+def test_slice_dates_is_inclusive(start, end, expected):
+    values = np.arange(9, dtype="float32").reshape(3, 3)
+    sliced = store(values).slice_dates(start, end)
+    assert sliced.dates.tolist() == list(expected)
+    positions = DATES.get_indexer(expected)
+    np.testing.assert_array_equal(sliced.values, values[:, positions])
+    assert sliced.sites.equals(store(values).sites)
+
+
+def test_slice_sites_keeps_store_order_and_ignores_unknown_sites():
+    values = np.arange(9, dtype="float32").reshape(3, 3)
+    sliced = store(values).slice_sites([SITES[2], "IHS_UNKNOWN", SITES[0]])
+    assert sliced.sites.tolist() == [SITES[0], SITES[2]]
+    np.testing.assert_array_equal(sliced.values, values[[0, 2]])
+    assert store(values).slice_sites([]).empty
+
+
+def test_combine_adds_new_sites_and_dates_and_the_delta_wins():
+    base = store([[90.0, 91.0], [80.0, 81.0]], SITES[:2], DATES[:2])
+    delta = store([[95.0, 96.0], [np.nan, 70.0]], [SITES[1], SITES[2]], DATES[1:])
+    combined = base.combine(delta)
+
+    assert combined.sites.tolist() == SITES
+    assert combined.dates.tolist() == list(DATES)
+    assert cells(combined) == {
+        (SITES[0], DATES[0]): 90.0, (SITES[0], DATES[1]): 91.0,
+        (SITES[1], DATES[0]): 80.0, (SITES[1], DATES[1]): 95.0, (SITES[1], DATES[2]): 96.0,
+        (SITES[2], DATES[2]): 70.0,
+    }
+
+
+def test_combine_keeps_base_cells_where_the_delta_is_missing():
+    base = store([[90.0]], SITES[:1], DATES[:1])
+    combined = base.combine(store([[np.nan]], SITES[:1], DATES[:1]))
+    assert combined.values.tolist() == [[90.0]]
+
+
+def test_to_long_matches_melting_the_sheet():
+    sheet = pd.DataFrame({"Site ID": [SITES[2], SITES[0], SITES[1]]})
+    for i, date in enumerate(DATES):
+        sheet[date.to_pydatetime()] = [90.0 + i, np.nan, 70.5 + i]
+
+    melted = (
+        sheet.melt(id_vars="Site ID", var_name="Date", value_name="PA")
+        .rename(columns={"Site ID": "IHS Site ID"})
+        .astype({"IHS Site ID": "category", "Date": "datetime64[ns]", "PA": "float32"})
+    )
+    long = PAStore.from_wide(sheet).to_long()
+    pd.testing.assert_frame_equal(long, melted, check_categorical=False)
+    assert long["IHS Site ID"].cat.categories.tolist() == sorted(SITES)
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from conftest import db_rows, outage_rows, pa_rows
+
+ROOT = Path(__file__).resolve().parent.parent
+SITE_IDS = [f"IHS_S{i:04d}B" for i in range(12)]
+
+pytestmark = pytest.mark.filterwarnings("ignore:CartoDB tiles")
+
+
+@pytest.fixture
+def upload(snapshot_dir, workbook):
+    """Workbook where every site has one outage in December and January and two in February."""
+    rows = [
+        (site, day, "01:30:00", cause)
+        for site in SITE_IDS
+        for day, cause in [("2025-12-05", "Grid"), ("2026-01-10", "Grid"), ("2026-02-10", "Rectifier"), ("2026-02-20", "Grid")]
+    ]
+    return workbook(
+        outages=outage_rows(rows),
+        db=db_rows(SITE_IDS),
+        pa=pa_rows(SITE_IDS, pd.date_range("2026-01-22", "2026-02-20")),
+    )
+
+
+def run_page(page, upload, **state):
+    """Runs a page as a logged-in session that has uploaded `upload`."""
+    at = AppTest.from_file(str(ROOT / page), default_timeout=120)
+    at.session_state["logged_in"] = True
+    at.session_state["file_uploaded"] = True
+    at.session_state["file"] = upload
+    for name, value in state.items():
+        at.session_state[name] = value
+    at.run()
+    assert not at.exception, [e.message for e in at.exception]
+    assert not at.error, [e.value for e in at.error]
+    return at
+
+
+def metrics(at):
+    return {metric.label: (metric.value, metric.delta) for metric in at.metric}
+
+
+def test_homepage(upload):
+    at = run_page("🏠 Homepage.py", upload)
+    assert at.session_state["dataset_key"]
+    result = metrics(at)
+    assert result["February Outage Count"] == ("24", "100.00%")
+    assert result["⚠️ Week 8 Outage Count"] == ("12", "0.00%")
+    assert result["February PA"] == ("99.00%", "0.00%")
+    assert at.selectbox[0].label == "Customer"
+    assert at.selectbox[0].options == ["Select Customer", "MTN NG", "Airtel NG"]
+
+
+def test_site_info(upload):
+    key = run_page("🏠 Homepage.py", upload).session_state["dataset_key"]
+    at = run_page("pages/2_🗼_Site_Info.py", upload, dataset_key=key)
+    sites = at.selectbox[0]
+    assert sites.options == ["Select Site"] + SITE_IDS
+    site = sites.value
+    assert site in SITE_IDS
+    assert at.selectbox[1].value == f"MTN NG_T{SITE_IDS.index(site)}"
+
+    result = metrics(at)
+    assert result["February Outage Count"] == ("2", "100.00%")
+    assert result["⚠️ Week 8 Outage Count"] == ("1", "0.00%")
+    assert result["February PA"] == ("99.00%", "0.00%")
+    # The site's outages in the default date range, and one PA row per day
+    outages, pa = (frame.value for frame in at.dataframe)
+    assert outages["Date"].tolist() == list(pd.to_datetime(["2026-02-20", "2026-02-10"]))
+    assert set(outages["IHS Site ID"]) == {site}
+    assert len(pa) == 30 and set(pa["IHS Site ID"]) == {site}
+
+
+def test_map(upload):
+    key = run_page("🏠 Homepage.py", upload).session_state["dataset_key"]
+    at = run_page("pages/5_📍_Map.py", upload, dataset_key=key)
+    result = metrics(at)
+    assert result["Total Sites"][0] == "12"
+    assert result["MTN Sites"] == ("12", "100.0%")
+    assert result["Airtel Sites"] == ("0", "0.0%")
+    assert result["On Air Sites"] == ("12", "100.0%")
+    assert len(at.dataframe[0].value) == 12
@@ -0,0 +1,112 @@
+import timeit
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+
+from query import Query
+
+DATASET = types.SimpleNamespace(key="0ea4217b8823e9813f3d3553a5c1c743")
+
+
+def homepage_query(start="2026-01-01", end="2026-01-31", zone="South", region=None):
+    """Query as the Homepage sidebar builds it on each rerun."""
+    query = Query(DATASET).between(start, end).where("Zone", [zone])
+    if region is not None:
+        query = query.where("Region", [region])
+    return query
+
+
+@pytest.fixture
+def cached_section():
+    """A section cached like the Homepage ones, counting how often it runs."""
+    calls = []
+
+    @st.cache_data(show_spinner=False, max_entries=64)
+    def section(query_key, _query):
+        calls.append(query_key)
+        return len(calls)
+
+    yield section, calls
+    section.clear()
+
+
+def test_reruns_with_the_same_filters_hit_the_cache(cached_section):
+    section, calls = cached_section
+    first = homepage_query(region="Rivers")
+    # A rerun builds a new Query (and new Timestamps) from the same widgets
+    rerun = homepage_query(region="Rivers")
+
+    assert section(first.key, first) == section(rerun.key, rerun) == 1
+    assert len(calls) == 1
+
+
+def test_changed_filters_or_dates_miss_the_cache(cached_section):
+    section, calls = cached_section
+    queries = [
+        homepage_query(),
+        homepage_query(region="Rivers"),
+        homepage_query(zone="North"),
+        homepage_query(end="2026-02-28"),
+        Query(types.SimpleNamespace(key="another snapshot")).between("2026-01-01", "2026-01-31").where("Zone", ["South"]),
+    ]
+    for query in queries:
+        section(query.key, query)
+    assert len(calls) == len(queries)
+
+    # Going back to an earlier selection is answered from the cache
+    section(homepage_query().key, homepage_query())
+    assert len(calls) == len(queries)
+
+
+def test_key_ignores_where_order_and_empty_filters():
+    a = Query(DATASET).between("2026-01-01", "2026-01-31").where("Zone", ["South"]).where("Region", ["Rivers"])
+    b = Query(DATASET).where("Region", ("Rivers",)).where("State", []).where("Zone", ("South",)).between(
+        "2026-01-01", "2026-01-31")
+    assert a.key == b.key
+    assert hash(a.key) == hash(b.key)
+
+
+def test_key_tracks_the_selected_columns():
+    query = homepage_query()
+    assert query.select(["Date", "Duration"]).key == query.select(("Date", "Duration")).key
+    assert query.select(["Date"]).key != query.key
+    # Later where() calls replace the earlier value of the same column
+    assert query.where("Zone", ["North"]).key == homepage_query(zone="North").key
+
+
+def lookup_seconds(section, *args, repeat=5, number=20):
+    """Best time of `number` cache hits of section(*args)."""
+    section(*args)
+    return min(timeit.repeat(lambda: section(*args), repeat=repeat, number=number)) / number
+
+
+def test_handle_lookup_is_cheaper_than_hashing_frames():
+    rng = np.random.default_rng(5)
+    n = 100_000
+    db_full = pd.DataFrame({
+        "IHS Site ID": [f"IHS_S{i:06d}B" for i in range(n)],
+        "Zone": rng.choice(["South", "North", "East"], n),
+        "Tenant Name": rng.choice(["MTN NG", "Airtel NG"], n),
+        "Latitude": rng.uniform(4, 13, n),
+    })
+    query = homepage_query(region="Rivers")
+
+    @st.cache_data(show_spinner=False)
+    def by_frame(df):
+        return len(df)
+
+    @st.cache_data(show_spinner=False)
+    def by_handle(query_key, _df):
+        return len(_df)
+
+    try:
+        frame = lookup_seconds(by_frame, db_full)
+        handle = lookup_seconds(by_handle, query.key, db_full)
+    finally:
+        by_frame.clear()
+        by_handle.clear()
+    print(f"cache hit: {frame * 1e3:.2f} ms hashing the frame, {handle * 1e3:.3f} ms with the query key")
+    assert handle < frame / 5
@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+import calcs
+from conftest import SITES, db_rows, outage_rows, pa_rows
+from registry import DatasetRegistry
+
+MONTHS = ["2026-01", "2026-02", "2026-03", "2026-04", "2026-05", "2026-06"]
+
+
+class FakeDataset:
+    def __init__(self, key, nbytes):
+        self.key = key
+        self.nbytes = nbytes
+        self.on_resize = None
+
+    def grow(self, nbytes):
+        self.nbytes += nbytes
+        self.on_resize()
+
+
+@pytest.fixture
+def registry():
+    return DatasetRegistry(max_bytes=100)
+
+
+def load(loaded, nbytes=40):
+    def loader(key):
+        loaded.append(key)
+        return FakeDataset(key, nbytes)
+    return loader
+
+
+def test_datasets_are_loaded_once(registry):
+    loaded = []
+    first = registry.get("a", load(loaded))
+    assert registry.get("a", load(loaded)) is first
+    assert loaded == ["a"]
+
+
+def test_least_recently_used_is_evicted_first(registry):
+    loaded = []
+    for key in ["a", "b", "a", "c"]:
+        registry.get(key, load(loaded))
+    assert [key for key, _ in registry.stats()] == ["a", "c"]
+    assert registry.nbytes == 80
+
+
+def test_the_most_recent_dataset_is_kept_even_over_the_limit(registry):
+    registry.get("a", load([]))
+    registry.get("big", load([], nbytes=500))
+    assert [key for key, _ in registry.stats()] == ["big"]
+
+
+def test_growing_caches_trigger_eviction(registry):
+    a = registry.get("a", load([]))
+    b = registry.get("b", load([]))
+    b.grow(30)
+    assert [key for key, _ in registry.stats()] == ["b"]
+    assert a.on_resize is None
+
+
+@pytest.fixture
+def dataset(snapshot_dir, workbook):
+    rows = [(site, f"{month}-10", "01:00:00", "Grid") for month in MONTHS for site in SITES]
+    key = calcs.ingest(workbook(outages=outage_rows(rows), db=db_rows(SITES), pa=pa_rows(SITES, ["2026-01-01"])))
+    return calcs.load_dataset(key)
+
+
+def test_dataset_size_follows_its_caches(dataset):
+    resized = []
+    dataset.on_resize = lambda: resized.append(dataset.nbytes)
+    loaded = dataset.nbytes
+
+    for month in MONTHS:
+        start = pd.Timestamp(f"{month}-01")
+        dataset.outages(start, start + pd.offsets.MonthEnd())
+    assert len(resized) == len(MONTHS)
+    assert resized[0] > loaded
+    # Only the last OUTAGE_RANGES ranges stay cached
+    assert resized[-1] == resized[dataset.OUTAGE_RANGES - 1]
+
+    dataset.search_index
+    dataset.search_index
+    assert len(resized) == len(MONTHS) + 1
+    assert resized[-1] > resized[-2]
+
+
+@pytest.mark.filterwarnings("ignore:CartoDB tiles")
+def test_map_data_is_built_once_and_counted(dataset):
+    resized = []
+    dataset.on_resize = lambda: resized.append(dataset.nbytes)
+    loaded = dataset.nbytes
+
+    map_data = dataset.map_data
+    assert dataset.map_data is map_data
+    assert map_data.missing == [] and len(map_data.db_full) == len(SITES)
+    assert len(resized) == 1 and resized[0] > loaded
+
+    sites = map_data.db_full
+    first = map_data.site_map(("filters", ""), sites, {}, 8)
+    assert map_data.site_map(("filters", ""), sites, {}, 8) is first
+    assert len(resized) == 2 and resized[1] > resized[0]
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+import calcs
+import schema
+from conftest import SITES, db_rows, outage_rows, pa_rows
+
+
+def test_enforce_casts_declared_columns():
+    df = pd.DataFrame({"IHS Site ID": SITES, "Zone": "South", "Year": 2024, "Other": 1.5})
+    result = schema.enforce(df, schema.OUTAGES)
+    assert result["Zone"].dtype == "category"
+    assert result["Year"].dtype == "int16"
+    assert result["Other"].dtype == "float64"
+
+
+def test_enforce_warns_and_keeps_a_column_that_cannot_be_cast():
+    df = pd.DataFrame({"Year": ["2024", "unknown"], "Zone": ["South", "North"]})
+    with pytest.warns(UserWarning, match="keeping column 'Year' as object"):
+        result = schema.enforce(df, schema.OUTAGES)
+    assert result["Year"].tolist() == ["2024", "unknown"]
+    assert result["Zone"].dtype == "category"
+
+
+@pytest.mark.parametrize("trace", [False, True])
+def test_memory_report_is_printed_only_when_traced(snapshot_dir, workbook, monkeypatch, capsys, trace):
+    monkeypatch.setattr(calcs, "TRACE_MEMORY", trace)
+    path = workbook(
+        outages=outage_rows([(SITES[0], "2024-01-01", "01:00:00", "Grid")]),
+        db=db_rows(SITES),
+        pa=pa_rows(SITES, ["2024-01-01"]),
+    )
+    with open(path, "rb") as f:
+        calcs.ingest(f)
+    assert ("[memory]" in capsys.readouterr().out) == trace
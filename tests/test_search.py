@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from search import EXACT, FUZZY, PREFIX, SUBSTRING, WORD_PREFIX, SiteSearchIndex, normalize
+
+
+def sites(*rows):
+    return pd.DataFrame(rows, columns=["IHS Site ID", "Site Address", "Tenant Name", "Tenant ID"])
+
+
+@pytest.fixture
+def index():
+    return SiteSearchIndex(sites(
+        ("IHS_LAG_0001A", "12 Marina Road, Lagos", "MTN NG", "T100"),        # 0
+        ("IHS_LAG_0002A", "4 Broad Street, Lagos", "Airtel", "T200"),        # 1
+        ("IHS_ABJ_0003B", "Plot 9, Garki  Kabala Abuja", "MTN NG", "T300"),          # 2
+        ("IHS_KAN_0004C", "Old Marina Market, Kano", "9mobile", None),        # 3
+        ("IHS_PHC_0005D", "Aba Road, Port Harcourt", "Glo", "T500"),          # 4
+        ("IHS_ABA_0006D", "Marina", "Glo", "T600"),                           # 5
+    ))
+
+
+def test_ranks_exact_before_prefix_before_word_prefix_before_substring(index):
+    # "marina": exact (5), prefix (0), word prefix (3)
+    assert index.search("marina").tolist() == [5, 0, 3]
+    assert index.search("Aba").tolist() == [4, 5, 2]
+    # "aba": prefix, then substrings ("_" is a word character), shorter first
+    ranked = [index.values[i] for i in index.matches("aba")]
+    assert ranked == ["aba road, port harcourt", "ihs_aba_0006d", "plot 9, garki kabala abuja"]
+
+
+def test_rank_of_each_kind_of_match(index):
+    rank = index._ranker("lagos")
+    assert [rank(value) for value in ["lagos", "lagos island", "12 marina road, lagos", "xlagos"]] == [
+        EXACT, PREFIX, WORD_PREFIX, SUBSTRING,
+    ]
+    assert EXACT < PREFIX < WORD_PREFIX < SUBSTRING < FUZZY
+
+
+def test_shorter_values_first_within_a_rank(index):
+    assert [index.values[i] for i in index.matches("t")][:2] == ["t100", "t200"]
+
+
+def test_queries_are_normalised(index):
+    assert normalize("  Garki \t ABUJA ") == "garki abuja"
+    assert index.search("  GARKI   kabala").tolist() == [2]
+    assert index.search("   ").tolist() == []
+
+
+@pytest.mark.parametrize("query", ["9", "gl", "t3", "0", "d"])
+def test_queries_shorter_than_a_trigram_scan_the_values(index, query):
+    expected = {i for i, value in enumerate(index.values) if query in value}
+    assert set(index.matches(query)) == expected
+
+
+def test_substring_matches_equal_a_scan_over_the_rows():
+    rng = np.random.default_rng(3)
+    words = np.array(["lagos", "abuja", "road", "street", "ikeja", "mtn", "glo", "airtel", "market"])
+    df = sites(*[
+        (f"IHS_S{n:04d}", " ".join(rng.choice(words, 3)), rng.choice(words), f"T{rng.integers(100)}")
+        for n in range(300)
+    ])
+    index = SiteSearchIndex(df)
+    text = df.apply(lambda col: col.str.lower())
+    for query in ["lag", "road str", "t4", "s00", "glo", "ket", "os ab", "nowhere"]:
+        expected = np.flatnonzero(text.apply(lambda col: col.str.contains(query, regex=False)).any(axis=1))
+        assert sorted(index.search(query, fuzzy=False)) == expected.tolist()
+
+
+def test_each_row_is_returned_once_and_limit_applies(index):
+    rows = index.search("mtn")
+    assert sorted(rows.tolist()) == [0, 2]
+    assert len(index.search("ihs_", limit=3)) == 3
+    assert len(index.search("ihs_")) == 6
+
+
+def test_fuzzy_fallback_only_when_nothing_contains_the_query(index):
+    # typos of "marina" and "harcourt"
+    assert index.search("marnia").tolist() == [5, 0, 3]
+    assert index.search("port harcort").tolist() == [4]
+    assert index.search("marnia", fuzzy=False).tolist() == []
+    # "abuj" is contained in a value, so close words ("abj", "aba") are not added
+    assert index.search("abuj").tolist() == [2]
+
+
+def test_fuzzy_needs_a_close_word_for_every_query_word(index):
+    assert index.search("marnia xqzwvk").tolist() == []
+    assert index.search("zzzzzz").tolist() == []
+
+
+def test_missing_columns_and_values_are_skipped():
+    df = pd.DataFrame({"IHS Site ID": ["IHS_1", None], "Other": ["lagos", "lagos"]})
+    index = SiteSearchIndex(df)
+    assert index.search("ihs").tolist() == [0]
+    assert index.search("lagos").tolist() == []
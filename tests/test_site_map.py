@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from site_map import SpatialGrid
+
+
+def brute_force(lat, lon, south, west, north, east):
+    with np.errstate(invalid="ignore"):
+        return np.flatnonzero((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east))
+
+
+@pytest.fixture
+def sites():
+    rng = np.random.default_rng(7)
+    lat = rng.uniform(4.0, 13.0, 2000)
+    lon = rng.uniform(3.0, 14.0, 2000)
+    # Sites exactly on cell edges, and sites without coordinates
+    lat[:50] = np.round(lat[:50], 1)
+    lon[:50] = np.round(lon[:50], 1)
+    lat[50:60] = np.nan
+    lon[55:65] = np.nan
+    return lat, lon
+
+
+@pytest.mark.parametrize("cell_deg", [0.1, 0.35, 5.0])
+def test_rows_in_matches_a_scan_over_random_boxes(sites, cell_deg):
+    lat, lon = sites
+    grid = SpatialGrid(lat, lon, cell_deg=cell_deg)
+    rng = np.random.default_rng(11)
+    for _ in range(300):
+        south, north = np.sort(rng.uniform(3.0, 14.0, 2))
+        west, east = np.sort(rng.uniform(2.0, 15.0, 2))
+        expected = brute_force(lat, lon, south, west, north, east)
+        np.testing.assert_array_equal(grid.rows_in(south, west, north, east), expected)
+        np.testing.assert_array_equal(np.flatnonzero(grid.mask(south, west, north, east)), expected)
+
+
+def test_boxes_bounded_by_cell_edges_include_sites_on_them(sites):
+    lat, lon = sites
+    grid = SpatialGrid(lat, lon)
+    for south, west, north, east in [(5.0, 5.0, 5.1, 5.1), (6.3, 7.2, 6.3, 9.9), (4.0, 3.0, 13.0, 14.0)]:
+        np.testing.assert_array_equal(
+            grid.rows_in(south, west, north, east), brute_force(lat, lon, south, west, north, east),
+        )
+
+
+@pytest.mark.parametrize("box", [
+    (20.0, 20.0, 21.0, 21.0),  # outside the grid
+    (-5.0, -5.0, 0.0, 0.0),  # outside, below the origin
+    (8.0, 8.0, 7.0, 9.0),  # south above north
+    (8.0, 9.0, 9.0, 8.0),  # west past east
+    (8.00001, 8.00001, 8.00002, 8.00002),  # inside one cell, no site in it
+])
+def test_empty_boxes(sites, box):
+    lat, lon = sites
+    grid = SpatialGrid(lat, lon)
+    assert len(grid.rows_in(*box)) == 0
+    assert not grid.mask(*box).any()
+
+
+def test_negative_coordinates_and_a_grid_without_sites():
+    lat = np.array([-1.05, -0.05, 0.05, 1.05])
+    lon = np.array([-2.0, 0.0, -0.01, 2.0])
+    grid = SpatialGrid(lat, lon)
+    assert grid.rows_in(-0.1, -0.1, 0.1, 0.1).tolist() == [1, 2]
+    assert grid.rows_in(-2.0, -3.0, 2.0, 3.0).tolist() == [0, 1, 2, 3]
+
+    empty = SpatialGrid([np.nan], [np.nan])
+    assert len(empty.rows_in(-90, -180, 90, 180)) == 0
+    assert empty.mask(-90, -180, 90, 180).tolist() == [False]
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from helper_functions import apply_filters
+from site_rollup import DIMENSIONS, SiteRollup
+
+TENANTS = ["MTN NG", "Airtel NG", "Glo", "9mobile"]
+STATUSES = ["On Air", "Off Air", "Decommissioned"]
+
+
+@pytest.fixture(scope="module")
+def db_full():
+    rng = np.random.default_rng(3)
+    rows = []
+    for i in range(120):
+        site = {
+            "IHS Site ID": f"IHS_S{i:04d}B", "Zone": rng.choice(["South", "North", "East"]),
+            "Region": rng.choice(["R1", "R2"]), "State": rng.choice(["S1", "S2", "S3"]),
+            "Site Operational Status": rng.choice(STATUSES), "EFS Name": rng.choice(["E1", "E2"]),
+            "RTO Name": rng.choice(["T1", "T2"]), "SBC": rng.choice(["B1", "B2"]),
+        }
+        for tenant in rng.choice(TENANTS, rng.integers(1, 4), replace=False):
+            row = dict(site, **{"Tenant Name": tenant})
+            # Every fifth site has tenant rows that disagree on an attribute
+            if i % 5 == 0 and rng.random() < 0.6:
+                row[rng.choice(["Site Operational Status", "Zone", "SBC"])] = rng.choice(["On Air", "West", "B3"])
+            rows.append(row)
+    return pd.DataFrame(rows).sample(frac=1, random_state=0, ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def rollup(db_full):
+    return SiteRollup(db_full)
+
+
+def random_filters(rng, db_full):
+    filters = {}
+    for col in ["Tenant Name", *DIMENSIONS]:
+        values = db_full[col].unique()
+        filters[col] = [] if rng.random() < 0.5 else list(rng.choice(values, rng.integers(1, len(values) + 1)))
+    return filters
+
+
+def test_only_sites_with_differing_rows_are_kept_as_rows(db_full, rollup):
+    varying = db_full.groupby("IHS Site ID")[DIMENSIONS].nunique(dropna=False).gt(1).any(axis=1)
+    assert set(rollup.mixed_rows["IHS Site ID"]) == set(varying.index[varying])
+    assert rollup.sites["Sites"].sum() == (~varying).sum()
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_counts_match_row_filtering(db_full, rollup, seed):
+    filters = random_filters(np.random.default_rng(seed), db_full)
+    filtered = apply_filters(db_full, filters)
+    unique_sites = filtered.drop_duplicates("IHS Site ID")
+
+    assert rollup.kpis(filters) == (
+        len(unique_sites),
+        int((filtered["Tenant Name"] == "MTN NG").sum()),
+        int((filtered["Tenant Name"] == "Airtel NG").sum()),
+        int((unique_sites["Site Operational Status"] == "On Air").sum()),
+    )
+    expected = unique_sites["Site Operational Status"].value_counts()
+    assert rollup.status_counts(filters).set_index("Status")["Count"].to_dict() == expected.to_dict()
+    expected = filtered["Tenant Name"].value_counts()
+    assert rollup.tenant_counts(filters).set_index("Tenant")["Records"].to_dict() == expected.to_dict()
+
+
+def test_status_filter_finds_a_site_by_any_tenant_row():
+    db_full = pd.DataFrame({
+        "IHS Site ID": ["IHS_S0001B", "IHS_S0001B", "IHS_S0002B"],
+        "Zone": "South", "Region": "R1", "State": "S1", "EFS Name": "E1", "RTO Name": "T1", "SBC": "B1",
+        "Site Operational Status": ["On Air", "Off Air", "On Air"],
+        "Tenant Name": ["MTN NG", "Airtel NG", "MTN NG"],
+    })
+    rollup = SiteRollup(db_full)
+    assert rollup.kpis({"Site Operational Status": ["Off Air"]}) == (1, 0, 1, 0)
+    assert rollup.kpis({}) == (2, 2, 1, 2)
+    assert rollup.status_counts({}).set_index("Status")["Count"].to_dict() == {"On Air": 2}
+
+
+def test_zone_summary_uses_each_sites_first_row(db_full, rollup):
+    first = db_full.drop_duplicates("IHS Site ID")
+    expected = first.groupby("Zone").agg(
+        Total_Sites=("IHS Site ID", "count"),
+        On_Air_Sites=("Site Operational Status", lambda x: (x == "On Air").sum()),
+        MTN_Sites=("Tenant Name", lambda x: (x == "MTN NG").sum()),
+        Airtel_Sites=("Tenant Name", lambda x: (x == "Airtel NG").sum()),
+    ).reset_index()
+    pd.testing.assert_frame_equal(rollup.zone_summary(), expected, check_dtype=False)
+    # The page adds columns to the summary it gets
+    summary = rollup.zone_summary()
+    summary["Operational %"] = 0
+    assert "Operational %" not in rollup.zone_summary()
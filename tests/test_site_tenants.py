@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from site_tenants import SiteTenantIndex
+
+
+@pytest.fixture
+def db_full():
+    rng = np.random.default_rng(5)
+    n = 400
+    sites = pd.Series(rng.choice([f"IHS_S{i:03d}B" for i in range(60)], n), dtype=object)
+    tenants = pd.Series([f"{name}_T{i}" for name, i in zip(rng.choice(["MTN NG", "Airtel", "Glo"], n), rng.integers(0, 80, n))])
+    sites[rng.random(n) < 0.05] = None
+    tenants[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({"IHS Site ID": sites, "tenant_and_id": tenants})
+
+
+@pytest.fixture(params=["all", "listed"])
+def listed(request, db_full):
+    """The Site Info page's site list: every site, or the sites left by its filters."""
+    site_ids = db_full["IHS Site ID"].dropna().sort_values().unique().tolist()
+    return site_ids if request.param == "all" else site_ids[::3]
+
+
+def test_tenants_match_the_db_filtered_lookup(db_full, listed):
+    index = SiteTenantIndex(db_full)
+    db_filtered = db_full[db_full["IHS Site ID"].isin(listed)]
+    for site in [*db_full["IHS Site ID"].dropna().unique(), "IHS_UNKNOWN"]:
+        expected = db_filtered.loc[db_filtered["IHS Site ID"] == site, "tenant_and_id"].dropna().tolist()
+        assert list(index.tenants(site, set(listed))) == expected
+
+
+def test_site_is_the_first_matching_site_in_db_full_order(db_full, listed):
+    index = SiteTenantIndex(db_full)
+    db_filtered = db_full[db_full["IHS Site ID"].isin(listed)]
+    for tenant in [*db_full["tenant_and_id"].dropna().unique(), "Glo_T999"]:
+        matching = db_filtered.loc[db_filtered["tenant_and_id"] == tenant, "IHS Site ID"].dropna()
+        expected = matching.iloc[0] if not matching.empty else None
+        assert index.site(tenant, set(listed)) == expected
+
+
+def test_tenant_options_match_the_db_filtered_list(db_full, listed):
+    db_filtered = db_full[db_full["IHS Site ID"].isin(listed)]
+    expected = db_filtered["tenant_and_id"].dropna().sort_values().unique().tolist()
+    assert SiteTenantIndex(db_full).tenant_options(listed) == expected
+
+
+def test_a_tenant_on_several_sites_resolves_to_the_first_listed_one():
+    db_full = pd.DataFrame({
+        "IHS Site ID": ["IHS_B", "IHS_A", "IHS_C", "IHS_A"],
+        "tenant_and_id": ["MTN NG_T1", "MTN NG_T1", "Glo_T2", "Glo_T3"],
+    })
+    index = SiteTenantIndex(db_full)
+    assert index.site("MTN NG_T1") == "IHS_B"
+    assert index.site("MTN NG_T1", {"IHS_A", "IHS_C"}) == "IHS_A"
+    assert index.site("MTN NG_T1", {"IHS_C"}) is None
+    assert index.tenants("IHS_A") == ("MTN NG_T1", "Glo_T3")
+    assert index.tenants("IHS_A", {"IHS_B"}) == ()
@@ -1,17 +1,24 @@
 import streamlit as st
-import random
-import numpy as np
 import pandas as pd
 import json
 import altair as alt
-import plotly.express as px
-import plotly.graph_objects as go
-import datetime
 import time
 import calendar
 
 import calcs
-from helper_functions import human_format, apply_filters, get_valid_date_range
+import export
+from query import Query
+from helper_functions import human_format
+from helper_functions import log_timing, timed
+
+# The datasets are shared read-only by every session and page. With
+# copy-on-write, filtered frames and column assignments never write through
+# to them, so the pages work on views instead of taking defensive copies.
+# Set here, at the app entry point, as it changes pandas for the whole server
+# process; the other pages send sessions here first (login).
+pd.set_option("mode.copy_on_write", True)
+
+run_started = time.perf_counter()
 
 
 # if st.session_state.file_uploaded:
@@ -166,26 +173,40 @@ else:
         # Sidebar: Filters
         # ----------------------------
         # Load and store processed data in session_state
-        if "df_init" not in st.session_state:
-            df1, pa_df1, db1, db_full1 = calcs.get_sheets(st.session_state.file)
-            st.session_state["df_init"] = df1
-            st.session_state["pa_init"] = pa_df1
-            st.session_state["db"] = db1
-            st.session_state["db_full"] = db_full1
-        else:
-            df1 = st.session_state["df_init"]
-            pa_df1 = st.session_state["pa_init"]
-            db1 = st.session_state["db"]
+        if "dataset_key" not in st.session_state:
+            st.session_state["dataset_key"] = calcs.ingest(st.session_state.file)
+
+        # ---- Daily update: merge a delta file into the current dataset ----
+        with st.sidebar.expander("Daily update"):
+            delta_file = st.file_uploader(
+                "New outage / PA / db rows",
+                type=["xlsx"],
+                key="delta_file",
+            )
+            if delta_file is not None and st.button("Apply update"):
+                try:
+                    st.session_state["dataset_key"] = calcs.apply_delta(
+                        st.session_state["dataset_key"], delta_file
+                    )
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.success("Update merged into the dataset.")
+
+        # The session only keeps the dataset key; the frames, cube and filter
+        # indexes live in the process-wide registry, shared by all sessions
+        dataset = calcs.get_dataset(st.session_state["dataset_key"])
+        pa_store = dataset.pa_store
+        db1 = dataset.db
         # def load_sheets():
         #     df1, pa_df1, db1 = calcs.get_sheets(st.session_state.file)
         #     return df1, pa_df1, db1
         # df1, pa_df1, db1 = load_sheets()
 
-        df = df1.copy()
-        db = db1.copy()
-        pa_df = pa_df1.copy()
-
-        pa_df = pd.merge(pa_df, db, on="IHS Site ID", how="left")
+        # Dataset frames are read-only; filters below return views (copy-on-write).
+        # The latest year/week/month come from the dates of the whole outage history.
+        df = dataset.outage_dates
+        db = db1
 
 
 
@@ -195,8 +216,8 @@ else:
         max_week = latest_year_df['Week'].max()
         min_week = df["Week"].min()
 
-        # Filter DataFrame for that week
-        week_df = df[df['Week'] == max_week]
+        # Filter DataFrame for that week (of the latest year)
+        week_df = latest_year_df[latest_year_df['Week'] == max_week]
 
         # Get min and max dates
         max_wk_min_date = week_df['Date'].min()
@@ -205,26 +226,27 @@ else:
         max_month =  max_date = df["Date"].max().month
 
 
-        def is_week_complete(df_fxn):
+        def is_week_complete(dates):
             # Ensure date column is datetime
-            df_fxn['Date'] = pd.to_datetime(df_fxn['Date'])
+            dates = pd.Series(pd.to_datetime(dates))
 
             # Get all Mondays to define weeks
-            df_fxn['Week Start'] = df_fxn['Date'] - pd.to_timedelta(df_fxn['Date'].dt.weekday, unit='d')
+            week_start = dates - pd.to_timedelta(dates.dt.weekday, unit='d')
 
             # Count number of distinct dates in each week
-            week_counts = df_fxn.groupby('Week Start')['Date'].nunique().reset_index(name='days_present')
+            week_counts = dates.groupby(week_start).nunique()
 
             # Check if all weeks have 7 days
-            return week_counts['days_present'].eq(7).all()
+            return week_counts.eq(7).all()
 
 
         # Sidebar: Date range input
         # Sidebar: Date range input
+        filters_started = time.perf_counter()
         st.sidebar.header("Filters")
 
         try:
-            min_date, max_date = get_valid_date_range(pa_df, "Date")
+            min_date, max_date = pa_store.date_range()
         except ValueError as e:
             st.error(str(e))
             st.stop()
@@ -247,22 +269,21 @@ else:
         start_datetime = pd.to_datetime(start_date)
         end_datetime = pd.to_datetime(end_date)
 
-        pa_df = pa_df[(pa_df["Date"] >= start_datetime) & 
-                    (pa_df["Date"] <= end_datetime)].copy()
-        df = df[(df["Date"] >= start_datetime) & 
-                (df["Date"] <= end_datetime)].copy()
+        # Site filters are composed into a lazy query: they are resolved on the
+        # site dimension (db, one row per site) and the date range is pushed down
+        # to the partitions, PA store and cube, so nothing is scanned until a
+        # result is needed. Option lists only offer values of sites with
+        # outages in the date range.
+        query = Query(dataset).between(start_datetime, end_datetime)
 
         # Zone Filter
-        df = df[df["Zone"] == zone].copy()
-        pa_df = pa_df[pa_df["Zone"] == zone].copy()
+        query = query.where("Zone", [zone])
 
         # Customer Filter
         customer = st.sidebar.selectbox("Customer", ["Select Customer"] + CUSTOMERS)
 
         if customer and customer != "Select Customer":
-            df = df[df["Tenants On Site"].str.contains(customer, case=False, na=False)]
-            pa_df = pa_df[pa_df["Tenants On Site"].str.contains(customer, case=False, na=False)]
-            # pa_df = pa_df[pa_df["Tenants On Site"] == customer]
+            query = query.where("Tenants On Site", customer)
 
         if customer == "MTN NG":
             st.markdown(mtn_css, unsafe_allow_html=True)
@@ -270,235 +291,162 @@ else:
             st.markdown(airtel_css, unsafe_allow_html=True)
 
         # Region Filter
-        region = st.sidebar.selectbox("Region", ["Select Region"] + df["Region"].dropna().sort_values().unique().tolist())
+        region = st.sidebar.selectbox("Region", ["Select Region"] + query.options("Region"))
 
         if region and region != "Select Region":
-            df = df[df["Region"] == region]
-            pa_df = pa_df[pa_df["Region"] == region]
+            query = query.where("Region", [region])
 
         # State Filter
-        state = st.sidebar.selectbox("State", ["Select State"] + df["State"].dropna().sort_values().unique().tolist())
+        state = st.sidebar.selectbox("State", ["Select State"] + query.options("State"))
 
         if state and state != "Select State":
-            df = df[df["State"] == state]
-            pa_df = pa_df[pa_df["State"] == state]
+            query = query.where("State", [state])
 
         # RTO Filter
-        rto = st.sidebar.selectbox("RTO", ["Select RTO"] + df["RTO Name"].dropna().sort_values().unique().tolist())
+        rto = st.sidebar.selectbox("RTO", ["Select RTO"] + query.options("RTO Name"))
 
         if rto and rto != "Select RTO":
-            df = df[df["RTO Name"] == rto]
-            pa_df = pa_df[pa_df["RTO Name"] == rto]
+            query = query.where("RTO Name", [rto])
 
         # FSE Filter
-        fse = st.sidebar.selectbox("FSE", ["Select FSE"] + df["EFS Name"].dropna().sort_values().unique().tolist())
+        fse = st.sidebar.selectbox("FSE", ["Select FSE"] + query.options("EFS Name"))
 
         if fse and fse != "Select FSE":
-            df = df[df["EFS Name"] == fse]
-            pa_df = pa_df[pa_df["EFS Name"] == fse]
+            query = query.where("EFS Name", [fse])
 
 
         # SBC Filter
-        sbc = st.sidebar.selectbox("SBC", ["Select SBC"] + df["SBC"].dropna().sort_values().unique().tolist())
+        sbc = st.sidebar.selectbox("SBC", ["Select SBC"] + query.options("SBC"))
 
         if sbc and sbc != "Select SBC":
-            df = df[df["SBC"] == sbc]
-            pa_df = pa_df[pa_df["SBC"] == sbc]
-
-
-        
-
+            query = query.where("SBC", [sbc])
 
-        col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 2, 2])
+        log_timing("Homepage: filters", filters_started)
 
         # ----------------------------
-        # Calculate Gains/Percentage Changes
+        # Cached sections
         # ----------------------------
-
-        # 1. OVERALL OUTAGE COUNT - No comparison needed for homepage, just show total
-        total_outage_count = sum(df["Outage Count"])
-        # Get all sites' outage counts
-        all_sites_outage_counts = df.groupby("IHS Site ID")["Outage Count"].sum()
-        avg_outage_all_sites = all_sites_outage_counts.mean()
-
-        # 2. WEEKLY OUTAGE COUNT GAIN (compared to previous week)
-        current_week_count = sum(df[df['Week'] == max_week]["Outage Count"])
-
-        # Handle week 1 - get last week of previous year
-        if max_week == 1:
-            prev_year = max_year - 1
-            prev_week_df = df[(df['Year'] == prev_year)]
-            if not prev_week_df.empty:
-                prev_week = prev_week_df['Week'].max()
-                prev_week_count = sum(df[(df['Year'] == prev_year) & (df['Week'] == prev_week)]["Outage Count"])
-            else:
-                prev_week_count = 0
-        else:
-            prev_week = max_week - 1
-            prev_week_count = sum(df[(df['Year'] == max_year) & (df['Week'] == prev_week)]["Outage Count"])
-
-        # Calculate percentage change (lower is better, so negative change is good)
-        if prev_week_count > 0:
-            weekly_outage_gain = ((current_week_count - prev_week_count) / prev_week_count) * 100
-        else:
-            weekly_outage_gain = 0 if current_week_count == 0 else 100
-
-        # 3. MONTHLY OUTAGE COUNT GAIN (compared to previous month)
-        current_month_count = sum(df[df['Month'] == calendar.month_name[max_month]]["Outage Count"])
-
-        # Handle January - get December of previous year
-        if max_month == 1:
-            prev_year = max_year - 1
-            prev_month = 12
-            prev_month_count = sum(df[(df['Year'] == prev_year) & (df['Month'] == calendar.month_name[prev_month])]["Outage Count"])
-        else:
-            prev_month = max_month - 1
-            prev_month_count = sum(df[(df['Year'] == max_year) & (df['Month'] == calendar.month_name[prev_month])]["Outage Count"])
-
-        # Calculate percentage change (lower is better, so negative is good)
-        if prev_month_count > 0:
-            monthly_outage_gain = ((current_month_count - prev_month_count) / prev_month_count) * 100
-        else:
-            monthly_outage_gain = 0 if current_month_count == 0 else 100
-
-        # 4. MONTHLY PA GAIN (compared to previous month)
-        pa_df_calc = pa_df.copy()
-        pa_df_calc['Datetime'] = pd.to_datetime(pa_df_calc['Date'], errors='coerce')
-        pa_df_calc['Year'] = pa_df_calc['Datetime'].dt.year
-        pa_df_calc['Month'] = pa_df_calc['Datetime'].dt.month
-
-        latest_year = pa_df_calc['Year'].max()
-        latest_month = pa_df_calc[pa_df_calc['Year'] == latest_year]['Month'].max()
-        latest_month_df = pa_df_calc[(pa_df_calc['Year'] == latest_year) & (pa_df_calc['Month'] == latest_month)]
-        monthly_avg_pa = pd.to_numeric(latest_month_df['PA'], errors='coerce').mean().round(2)
-
-        # Handle January - get December of previous year
-        if latest_month == 1:
-            prev_year_pa = latest_year - 1
-            prev_month_pa = 12
-            prev_month_df = pa_df_calc[(pa_df_calc['Year'] == prev_year_pa) & (pa_df_calc['Month'] == prev_month_pa)]
-        else:
-            prev_month_pa = latest_month - 1
-            prev_month_df = pa_df_calc[(pa_df_calc['Year'] == latest_year) & (pa_df_calc['Month'] == prev_month_pa)]
-
-        prev_monthly_avg_pa = pd.to_numeric(prev_month_df['PA'], errors='coerce').mean()
-
-        # Calculate percentage change (higher is better, so positive change is good)
-        if prev_monthly_avg_pa > 0 and not pd.isna(prev_monthly_avg_pa):
-            monthly_pa_gain = ((monthly_avg_pa - prev_monthly_avg_pa) / prev_monthly_avg_pa) * 100
-        else:
-            monthly_pa_gain = 0
-
-        # 5. WEEKLY PA GAIN (compared to previous week)
-        pa_df_calc['Week'] = pa_df_calc['Datetime'].dt.isocalendar().week
-        pa_df_calc['ISO_Year'] = pa_df_calc['Datetime'].dt.isocalendar().year
-
-        latest_iso_year = pa_df_calc['ISO_Year'].max()
-        latest_week = pa_df_calc[pa_df_calc['ISO_Year'] == latest_iso_year]['Week'].max()
-        latest_week_df = pa_df_calc[(pa_df_calc['ISO_Year'] == latest_iso_year) & (pa_df_calc['Week'] == latest_week)]
-        weekly_avg_pa = pd.to_numeric(latest_week_df['PA'], errors='coerce').mean().round(2)
-
-        # Handle week 1 - get last week of previous year
-        if latest_week == 1:
-            prev_iso_year = latest_iso_year - 1
-            prev_week_pa_df = pa_df_calc[pa_df_calc['ISO_Year'] == prev_iso_year]
-            if not prev_week_pa_df.empty:
-                prev_week_pa = prev_week_pa_df['Week'].max()
-                prev_week_df_pa = pa_df_calc[(pa_df_calc['ISO_Year'] == prev_iso_year) & (pa_df_calc['Week'] == prev_week_pa)]
-            else:
-                prev_week_df_pa = pd.DataFrame()
-        else:
-            prev_week_pa = latest_week - 1
-            prev_week_df_pa = pa_df_calc[(pa_df_calc['ISO_Year'] == latest_iso_year) & (pa_df_calc['Week'] == prev_week_pa)]
-
-        prev_weekly_avg_pa = pd.to_numeric(prev_week_df_pa['PA'], errors='coerce').mean()
-
-        # Calculate percentage change (higher is better, so positive change is good)
-        if prev_weekly_avg_pa > 0 and not pd.isna(prev_weekly_avg_pa):
-            weekly_pa_gain = ((weekly_avg_pa - prev_weekly_avg_pa) / prev_weekly_avg_pa) * 100
-        else:
-            weekly_pa_gain = 0
+        # Cards and chart data are cached on the query's key (dataset content
+        # hash, date range and filter key), never on frames, so finding the
+        # cache entry hashes a short tuple. A rerun whose filters have not
+        # changed (or that comes back to an earlier selection) only re-renders them.
+        @st.cache_data(show_spinner=False, max_entries=64)
+        def kpi_cards(query_key, _query, max_year, max_week, max_month):
+            # All cards are answered from the aggregate engine: per-day sums over
+            # the filtered sites, grouped by the precomputed calendar keys
+            outage_days = _query.outage_days()
+            return {
+                # 1. OVERALL OUTAGE COUNT - No comparison needed for homepage, just show total
+                "total_outage_count": outage_days["outage_count"].sum(),
+                # Get all sites' outage counts
+                "avg_outage_all_sites": _query.outage_by_site().mean(),
+                "week_complete": is_week_complete(outage_days.index),
+                # 2./3. WEEKLY and MONTHLY OUTAGE COUNT GAIN (compared to previous week/month)
+                "outage_stats": calcs.outage_kpis(outage_days, max_year, max_week, max_month),
+                # 4./5. MONTHLY and WEEKLY PA GAIN (compared to previous month/week)
+                "pa_stats": calcs.pa_kpis(_query.pa_days(), decimals=2),
+            }
+
+        @st.cache_data(show_spinner=False, max_entries=64)
+        def weekly_outage_chart_data(query_key, _query):
+            # Weekly outage counts, labelled e.g. "2024-W52" and sorted by Year then Week
+            return calcs.weekly_outage_counts(_query.outage_days())
+
+        @st.cache_data(show_spinner=False, max_entries=64)
+        def weekly_pa_chart_data(query_key, _query):
+            # Average Weekly PA per ISO week, labelled e.g. "2025-W01"
+            return calcs.weekly_pa(_query.pa_days())
 
         # ----------------------------
         # Metric Cards with Calculated Gains
         # ----------------------------
-        with col1:
-            with st.container(border=True):
-                st.metric(
-                    label="Outage Count", 
-                    value=human_format(total_outage_count), 
-                    delta=f"{avg_outage_all_sites:.2f}%",
-                    delta_color="inverse" if avg_outage_all_sites > 2 else "normal"  # Red for positive (bad), green for negative (good)
-                )
-            
-
-        # ----------------------------
-        # Weekly
-        # ----------------------------
-        with col2:
-            with st.container(border=True):
-                week_count = sum(df[df['Week'] == max_week]["Outage Count"])
-                if is_week_complete(df) == False:
+        with timed("Homepage: KPI cards"):
+            kpis = kpi_cards(query.key, query, max_year, max_week, max_month)
+            total_outage_count = kpis["total_outage_count"]
+            avg_outage_all_sites = kpis["avg_outage_all_sites"]
+
+            outage_stats = kpis["outage_stats"]
+            current_month_count = outage_stats["current_month_count"]
+            weekly_outage_gain = outage_stats["weekly_outage_gain"]
+            monthly_outage_gain = outage_stats["monthly_outage_gain"]
+
+            pa_stats = kpis["pa_stats"]
+            monthly_avg_pa = pa_stats["monthly_avg_pa"]
+            monthly_pa_gain = pa_stats["monthly_pa_gain"]
+            latest_week = pa_stats["latest_week"]
+            weekly_avg_pa = pa_stats["weekly_avg_pa"]
+            weekly_pa_gain = pa_stats["weekly_pa_gain"]
+
+            col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 2, 2])
+
+            with col1:
+                with st.container(border=True):
                     st.metric(
-                        label=f"⚠️ Week {max_week} Outage Count", 
-                        value=human_format(week_count), 
-                        delta=f"{weekly_outage_gain:.2f}%",
-                        delta_color="inverse"  # Red for positive (bad), green for negative (good)
+                        label="Outage Count", 
+                        value=human_format(total_outage_count), 
+                        delta=f"{avg_outage_all_sites:.2f}%",
+                        delta_color="inverse" if avg_outage_all_sites > 2 else "normal"  # Red for positive (bad), green for negative (good)
                     )
-                else:
+                
+
+            # ----------------------------
+            # Weekly
+            # ----------------------------
+            with col2:
+                with st.container(border=True):
+                    week_count = outage_stats["current_week_count"]
+                    if kpis["week_complete"] == False:
+                        st.metric(
+                            label=f"⚠️ Week {max_week} Outage Count", 
+                            value=human_format(week_count), 
+                            delta=f"{weekly_outage_gain:.2f}%",
+                            delta_color="inverse"  # Red for positive (bad), green for negative (good)
+                        )
+                    else:
+                        st.metric(
+                            label=f"Week {max_week} Outage Count", 
+                            value=human_format(week_count), 
+                            delta=f"{weekly_outage_gain:.2f}%",
+                            delta_color="inverse"
+                        )
+
+
+            # ----------------------------
+            # Monthly
+            # ----------------------------
+            with col3:
+                with st.container(border=True):
                     st.metric(
-                        label=f"Week {max_week} Outage Count", 
-                        value=human_format(week_count), 
-                        delta=f"{weekly_outage_gain:.2f}%",
-                        delta_color="inverse"
+                        label=f"{calendar.month_name[max_month]} Outage Count",
+                        value=human_format(current_month_count),
+                        delta=f"{monthly_outage_gain:.2f}%",
+                        delta_color="inverse"  # Red for positive (bad), green for negative (good)
                     )
 
+            with col4:
+                with st.container(border=True):
+                    st.metric(
+                        label=f"{calendar.month_name[max_month]} PA", 
+                        value=f"{monthly_avg_pa:.2f}%" if not pd.isna(monthly_avg_pa) else "N/A", 
+                        delta=f"{monthly_pa_gain:.2f}%",
+                        delta_color="normal"  # Green for positive (good), red for negative (bad)
+                    )
+                
 
-        # ----------------------------
-        # Monthly
-        # ----------------------------
-        with col3:
-            with st.container(border=True):
-                st.metric(
-                    label=f"{calendar.month_name[max_month]} Outage Count",
-                    value=human_format(current_month_count),
-                    delta=f"{monthly_outage_gain:.2f}%",
-                    delta_color="inverse"  # Red for positive (bad), green for negative (good)
-                )
-
-        with col4:
-            with st.container(border=True):
-                st.metric(
-                    label=f"{calendar.month_name[max_month]} PA", 
-                    value=f"{monthly_avg_pa:.2f}%" if not pd.isna(monthly_avg_pa) else "N/A", 
-                    delta=f"{monthly_pa_gain:.2f}%",
-                    delta_color="normal"  # Green for positive (good), red for negative (bad)
-                )
-            
-
-        with col5:
-            with st.container(border=True):
-                st.metric(
-                    label=f"Week {latest_week} PA", 
-                    value=f"{weekly_avg_pa:.2f}%" if not pd.isna(weekly_avg_pa) else "N/A", 
-                    delta=f"{weekly_pa_gain:.2f}%",
-                    delta_color="normal"  # Green for positive (good), red for negative (bad)
-                )
+            with col5:
+                with st.container(border=True):
+                    st.metric(
+                        label=f"Week {latest_week} PA", 
+                        value=f"{weekly_avg_pa:.2f}%" if not pd.isna(weekly_avg_pa) else "N/A", 
+                        delta=f"{weekly_pa_gain:.2f}%",
+                        delta_color="normal"  # Green for positive (good), red for negative (bad)
+                    )
             
 
         chart_col1, chart_col2 = st.columns(2)
 
-        with chart_col1:
-            # Step 1: Group by Year and Week to get weekly outage counts
-            weekly_counts = df.groupby(['Year', 'Week']).size().reset_index(name='Outage Count')
-
-            # Step 2: Create a combined label to show in chart, e.g. "2024-W52"
-            weekly_counts['Week_Label'] = (
-                weekly_counts['Year'].astype(str) + '-W' + weekly_counts['Week'].astype(str).str.zfill(2)
-            )
-
-            # Step 3: Sort by Year then Week
-            weekly_counts = weekly_counts.sort_values(['Year', 'Week'])
+        with chart_col1, timed("Homepage: weekly outage chart"):
+            weekly_counts = weekly_outage_chart_data(query.key, query)
 
             # Base bar chart
             bars = alt.Chart(weekly_counts).mark_bar().encode(
@@ -531,30 +479,13 @@ else:
 
 
 
-        with chart_col2:
+        with chart_col2, timed("Homepage: weekly PA chart"):
             # st.subheader("Total Orders")
             # orders_df = pd.DataFrame({"Month": months, "Orders": order_values})
             # orders_df = orders_df.set_index("Month")
             # st.bar_chart(orders_df)
 
-            # Average Weekly PA
-            # Ensure 'Date' column is in datetime format
-            pa_df['Datetime'] = pd.to_datetime(pa_df['Date'])
-
-            # Step 1: Create 'Year' and 'Week' columns
-            pa_df['Year'] = pa_df['Datetime'].dt.isocalendar().year
-            pa_df['Week'] = pa_df['Datetime'].dt.isocalendar().week
-
-            # Step 2: Group by Year and Week to calculate average PA
-            pa_df['PA'] = pd.to_numeric(pa_df['PA'], errors='coerce')  # Convert to float, non-numeric → NaN
-
-            weekly_pa = pa_df.groupby(['Year', 'Week'])['PA'].mean().reset_index()
-
-            # Step 3: Create a combined label, e.g. "2025-W01"
-            weekly_pa['Week_Label'] = weekly_pa['Year'].astype(str) + '-W' + weekly_pa['Week'].astype(str).str.zfill(2)
-
-            # Step 4: Sort the data by Year then Week
-            weekly_pa = weekly_pa.sort_values(['Year', 'Week'])
+            weekly_pa = weekly_pa_chart_data(query.key, query)
 
             # Calculate dynamic y-axis range
             min_pa = weekly_pa['PA'].min()
@@ -578,50 +509,27 @@ else:
 
 
 
-
-
-        
-
-
-
-
-
-
-
-
-
-
-
-
-        
-
-        # ----- Download Updates -----
         # ----- Download Updates -----
-        st.subheader("Download CSV Files")
-        col1, col2 = st.columns(2)
-
-        # Convert DataFrames to CSV
-        df_csv = df.to_csv(index=False)
-        pa_df_csv = pa_df.to_csv(index=False)
-
-        with col1:
-            st.download_button(
-                label="Download Outage DF",
-                data=df_csv,
-                file_name="outage_data.csv",
-                mime="text/csv",
-                icon="📥",
-            )
-
-        with col2:
-            st.download_button(
-                label="Download PA DF",
-                data=pa_df_csv,
-                file_name="pa_data.csv",
-                mime="text/csv",
-                icon="📥",
-            )
+        # Files are only built when requested, once per filter state and format
+        with timed("Homepage: downloads"):
+            st.subheader("Download Data")
+            col1, col2 = st.columns(2)
+
+            with col1:
+                export.download_panel(
+                    "Download Outage DF", "outage_data", query.key,
+                    # Fact rows of the resolved sites
+                    lambda query=query: query.outages().drop(columns="site_key"),
+                    key="home_outages",
+                )
 
+            with col2:
+                export.download_panel(
+                    "Download PA DF", "pa_data", query.key,
+                    # Site attributes are only attached to the PA rows that survive the filters
+                    lambda query=query: query.pa(),
+                    key="home_pa",
+                )
 
         # # ----- Charts -----
         # months = [
@@ -655,12 +563,4 @@ else:
 
         # # From Site Info
 
-        
-        
-
-
-
-
-
-
-
+log_timing("Homepage run", run_started)